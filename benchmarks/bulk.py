@@ -0,0 +1,98 @@
+"""
+Measure the bulk product registration.
+
+Start the server and run this script against it:
+
+    uvicorn server:app
+    python benchmarks/bulk.py --products 100000
+
+The script generates `products` new codes and uploads them to
+`POST /products/bulk` in every format supported, streaming the body, then
+reports the time taken and the summary returned by the server.
+"""
+from argparse import ArgumentParser
+from csv import writer
+from io import StringIO
+from json import dumps
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List
+from uuid import uuid4
+
+import requests
+from throughput import authenticate
+
+
+def as_json(codes: List[str]) -> Iterator[bytes]:
+    """Stream the products as a JSON array."""
+    yield b"["
+    for index, code in enumerate(codes):
+        separator = "," if index else ""
+        yield f"{separator}{dumps({'code': code, 'summary': code})}".encode()
+    yield b"]"
+
+
+def as_ndjson(codes: List[str]) -> Iterator[bytes]:
+    """Stream the products as newline delimited JSON."""
+    for code in codes:
+        yield f"{dumps({'code': code, 'summary': code})}\n".encode()
+
+
+def as_csv(codes: List[str]) -> Iterator[bytes]:
+    """Stream the products as CSV."""
+    yield b"code,summary\n"
+    for code in codes:
+        row = StringIO()
+        writer(row).writerow((code, code))
+        yield row.getvalue().encode()
+
+
+formats: Dict[str, Callable[[List[str]], Iterator[bytes]]] = {
+    "application/json": as_json,
+    "application/x-ndjson": as_ndjson,
+    "text/csv": as_csv,
+}
+
+
+def chunked(body: Iterator[bytes], size: int = 64 * 1024) -> Iterator[bytes]:
+    """Group the body pieces in larger chunks."""
+    chunk = b""
+    for piece in body:
+        chunk += piece
+        if len(chunk) >= size:
+            yield chunk
+            chunk = b""
+    if chunk:
+        yield chunk
+
+
+def main():
+    """Parse the arguments and run the benchmark."""
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", default="ps_user")
+    parser.add_argument("--password", default="ps_pass")
+    parser.add_argument("--products", type=int, default=100_000)
+    args = parser.parse_args()
+
+    headers = authenticate(args.url, args.username, args.password)
+    for media_type, encode in formats.items():
+        codes = [f"bulk-{uuid4()}" for _ in range(args.products)]
+
+        started = perf_counter()
+        response = requests.post(
+            f"{args.url}/products/bulk",
+            data=chunked(encode(codes)),
+            headers={**headers, "Content-Type": media_type},
+        )
+        elapsed = perf_counter() - started
+        response.raise_for_status()
+
+        print(
+            f"{media_type:<22} products={args.products:<7} "
+            f"seconds={elapsed:>6.2f} "
+            f"products/s={args.products / elapsed:>9.1f} {response.json()}"
+        )
+
+
+if __name__ == "__main__":
+    main()
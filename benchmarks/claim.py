@@ -0,0 +1,110 @@
+"""
+Stress the claim endpoint with concurrent clients.
+
+Start the server against a database without available products and run
+this script against it:
+
+    uvicorn server:app --workers 4
+    python benchmarks/claim.py --products 2000 --concurrency 1 2 4 8
+
+For every concurrency level the script registers `products` new products,
+then keeps `concurrency` clients calling `POST /orders/claim` until there
+is nothing left to claim. It fails if any product is claimed twice or if
+any product is left behind, and reports the claims per second.
+"""
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from threading import local
+from time import perf_counter
+from typing import Dict, List
+from uuid import uuid4
+
+import requests
+from throughput import authenticate
+
+clients = local()
+
+ORDER = {
+    "mod_id": "benchmark",
+    "mod_display_name": "benchmark",
+    "owner_display_name": "benchmark",
+}
+
+
+def session() -> requests.Session:
+    """Get the HTTP session of the current thread."""
+    if not hasattr(clients, "session"):
+        clients.session = requests.Session()
+    return clients.session
+
+
+def register(url: str, headers: Dict[str, str], count: int) -> List[str]:
+    """Register `count` new products and return their codes."""
+    codes = [f"claim-{uuid4()}" for _ in range(count)]
+    for code in codes:
+        session().post(
+            f"{url}/products/",
+            json={"code": code, "summary": "benchmark"},
+            headers=headers,
+        ).raise_for_status()
+    return codes
+
+
+def claim(url: str, headers: Dict[str, str]) -> List[str]:
+    """Claim products until there are no more and return their codes."""
+    codes = []
+    while True:
+        response = session().post(
+            f"{url}/orders/claim", json=ORDER, headers=headers
+        )
+        if response.status_code == 404:
+            return codes
+        response.raise_for_status()
+        codes.append(response.json()["product"]["code"])
+
+
+def run(url: str, headers: Dict[str, str], products: int, concurrency: int):
+    """Run a single round with the concurrency specified."""
+    registered = register(url, headers, products)
+
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        rounds = [
+            executor.submit(claim, url, headers) for _ in range(concurrency)
+        ]
+        claimed = Counter(code for r in rounds for code in r.result())
+    elapsed = perf_counter() - started
+
+    duplicated = [code for code, count in claimed.items() if count > 1]
+    missing = set(registered) - set(claimed)
+    print(
+        f"concurrency={concurrency:<3} "
+        f"claims={sum(claimed.values()):<6} "
+        f"claims/s={sum(claimed.values()) / elapsed:>8.1f} "
+        f"duplicated={len(duplicated)} missing={len(missing)}"
+    )
+
+    assert not duplicated, f"Products claimed twice: {duplicated[:10]}"
+    assert not missing, f"Products not claimed: {list(missing)[:10]}"
+
+
+def main():
+    """Parse the arguments and run the benchmark."""
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", default="ps_user")
+    parser.add_argument("--password", default="ps_pass")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 2, 4, 8]
+    )
+    args = parser.parse_args()
+
+    headers = authenticate(args.url, args.username, args.password)
+    for concurrency in args.concurrency:
+        run(args.url, headers, args.products, concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare the CPU time of the listings through the ORM and through Core.
+
+The application runs in this process (against the configured database, that
+must have at least `limit` taken products and orders) and every route is
+called with `CORE_READS` disabled and enabled:
+
+    python benchmarks/hydration.py --limits 50 500 --requests 200
+
+Only the CPU time of this process is measured, so the time spent waiting
+for the database doesn't blur the cost of building the responses. The
+script reports the median and the 95th percentile of every combination.
+"""
+from argparse import ArgumentParser
+from statistics import median, quantiles
+from time import process_time
+from typing import Dict, List
+
+from fastapi.testclient import TestClient
+
+from server import app
+from server.env import env
+
+ROUTES = {
+    "/products/": {"taken": True},
+    "/orders/": {},
+}
+
+
+def authenticate(
+    client: TestClient, username: str, password: str
+) -> Dict[str, str]:
+    """Get the authorization header used on every request."""
+    response = client.post(
+        "/auth/", data={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def measure(
+    client: TestClient,
+    headers: Dict[str, str],
+    route: str,
+    limit: int,
+    requests: int,
+) -> List[float]:
+    """Call the route `requests` times and return the CPU times."""
+    params = {**ROUTES[route], "limit": limit}
+    times = []
+    for _ in range(requests):
+        started = process_time()
+        response = client.get(route, params=params, headers=headers)
+        times.append(process_time() - started)
+
+        response.raise_for_status()
+        items = response.json()[route.strip("/")]
+        assert len(items) == limit, f"Only {len(items)} items on {route}."
+    return times
+
+
+def main():
+    """Parse the arguments and run the benchmark."""
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--username", default="ps_user")
+    parser.add_argument("--password", default="ps_pass")
+    parser.add_argument("--limits", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    headers = authenticate(client, args.username, args.password)
+
+    for route in ROUTES:
+        for limit in args.limits:
+            for core in (False, True):
+                env.CORE_READS = core
+                measure(client, headers, route, limit, 10)  # warm up
+                times = measure(client, headers, route, limit, args.requests)
+                print(
+                    f"route={route:<11} limit={limit:<4} "
+                    f"path={'core' if core else 'orm':<4} "
+                    f"median={median(times) * 1000:>7.2f}ms "
+                    f"p95={quantiles(times, n=100)[94] * 1000:>7.2f}ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Measure the latency of the product and order searches.
+
+The searches run in this process against the configured database (with the
+`011` migration applied, so `pg_trgm` and its indexes are there). The
+database can be filled with `seed` generated orders first, every one with
+its own product, the display names drawn from a small set of words:
+
+    python benchmarks/search.py --seed 1000000 --queries 200
+
+The script reports the median and the 95th percentile of the time spent
+by every search, rotating through a few misspelled queries.
+"""
+from argparse import ArgumentParser
+from statistics import median, quantiles
+from time import perf_counter
+from typing import Callable, Dict, List, NoReturn
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from server.db import SessionLocal
+from server.db.repo.orders import search_orders
+from server.db.repo.products import search_products
+
+# The words the generated summaries and display names are made of.
+WORDS = [
+    "mouse",
+    "keyboard",
+    "legend",
+    "dragon",
+    "shadow",
+    "rocket",
+    "pixel",
+    "falcon",
+    "ember",
+    "quartz",
+]
+
+SEARCHES: Dict[str, Callable] = {
+    "products": lambda db, q: search_products(db=db, query=q),
+    "orders": lambda db, q: search_orders(db=db, query=q),
+    "owners": lambda db, q: search_orders(db=db, query=q, participant="owner"),
+}
+
+QUERIES = ["dragn", "legend pix", "rocketfal", "quarz"]
+
+
+def seed(db: Session, orders: int) -> NoReturn:
+    """Register `orders` taken products, with an order for every one."""
+    words = "array[" + ", ".join(f"'{word}'" for word in WORDS) + "]"
+    pick = f"({words})[1 + (random() * {len(WORDS) - 1})::int]"
+    db.execute(
+        text(
+            "insert into product (uuid, code, summary, taken) "
+            "select gen_random_uuid(), 'search-' || n, "
+            f"{pick} || ' ' || {pick} || ' ' || n, true "
+            "from generate_series(1, :orders) as n"
+        ),
+        {"orders": orders},
+    )
+    db.execute(
+        text(
+            'insert into "order" (uuid, mod_id, mod_display_name, '
+            "owner_display_name, requested_at, product_id) "
+            "select gen_random_uuid(), 'search', "
+            f"{pick} || '_mod', {pick} || {pick} || (id % 1000), "
+            "now() - (id % 100000) * interval '1 minute', id "
+            "from product where code like 'search-%'"
+        )
+    )
+    db.execute(text('analyze product; analyze "order"'))
+    db.commit()
+
+
+def measure(db: Session, search: Callable, queries: int) -> List[float]:
+    """Run the search `queries` times and return the latencies."""
+    times = []
+    for n in range(queries):
+        started = perf_counter()
+        search(db, QUERIES[n % len(QUERIES)])
+        times.append(perf_counter() - started)
+    return times
+
+
+def main():
+    """Parse the arguments and run the benchmark."""
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    if args.seed:
+        seed(db, args.seed)
+
+    for name, search in SEARCHES.items():
+        measure(db, search, len(QUERIES))  # warm up
+        times = measure(db, search, args.queries)
+        print(
+            f"search={name:<9} queries={args.queries:<5} "
+            f"median={median(times) * 1000:>7.2f}ms "
+            f"p95={quantiles(times, n=100)[94] * 1000:>7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Compare the time spent rendering large listings as JSON.
+
+No database is needed, the pages are built in memory both as entities (the
+ORM path) and as dicts (the `CORE_READS` path) and rendered just like the
+routes do, with FastAPI's default validation and encoding and with the
+`FAST_JSON` response:
+
+    python benchmarks/serialization.py --items 1000 --rounds 50
+
+The script reports the median time to render a page for every combination.
+"""
+from argparse import ArgumentParser
+from asyncio import run
+from datetime import datetime, timedelta
+from statistics import median
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Type
+from uuid import uuid4
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import BaseModel
+
+from server.db.entities import Order, Product
+from server.models import schemas
+from server.models.serialization import fast_response
+
+
+def product(number: int) -> Product:
+    """Build a product in memory."""
+    created_at = datetime(2020, 1, 1) + timedelta(seconds=number)
+    return Product(
+        id=number,
+        uuid=uuid4(),
+        code=f"code-{number}",
+        summary=f"The product number {number}.",
+        taken=True,
+        created_at=created_at,
+        updated_at=created_at,
+    )
+
+
+def order(number: int) -> Order:
+    """Build an order, with its product, in memory."""
+    return Order(
+        id=number,
+        uuid=uuid4(),
+        mod_id=str(number),
+        mod_display_name="moderator",
+        owner_display_name=f"owner-{number}",
+        requested_at=datetime(2020, 1, 1) + timedelta(seconds=number),
+        product=product(number),
+    )
+
+
+def as_dict(entity: Any, nested: str = None) -> Dict[str, Any]:
+    """Convert an entity to the dict the Core path would build."""
+    row = {
+        column.key: getattr(entity, column.key)
+        for column in entity.__table__.columns
+    }
+    if nested:
+        row[nested] = as_dict(getattr(entity, nested))
+    return row
+
+
+def default_response(content: Any, schema: Type[BaseModel]) -> bytes:
+    """Render the content just like FastAPI does for a `response_model`."""
+    field = create_response_field(name="benchmark", type_=schema)
+    return JSONResponse(
+        run(serialize_response(field=field, response_content=content))
+    ).body
+
+
+def measure(render: Callable[[], bytes], rounds: int) -> float:
+    """Render the page `rounds` times and return the median time."""
+    times = []
+    for _ in range(rounds):
+        started = perf_counter()
+        render()
+        times.append(perf_counter() - started)
+    return median(times)
+
+
+def pages(items: int) -> Dict[str, Any]:
+    """Build the pages of products and orders, as entities and dicts."""
+    products: List[Product] = [product(n) for n in range(items)]
+    orders: List[Order] = [order(n) for n in range(items)]
+    total = {"all": items, "taken": items, "available": 0}
+    return {
+        "products/orm": (
+            {"total": total, "products": products},
+            schemas.ProductWithTotal,
+        ),
+        "products/core": (
+            {"total": total, "products": [as_dict(p) for p in products]},
+            schemas.ProductWithTotal,
+        ),
+        "orders/orm": (
+            {"total": items, "orders": orders},
+            schemas.OrderWithTotal,
+        ),
+        "orders/core": (
+            {
+                "total": items,
+                "orders": [as_dict(o, nested="product") for o in orders],
+            },
+            schemas.OrderWithTotal,
+        ),
+    }
+
+
+def main():
+    """Parse the arguments and run the benchmark."""
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    for name, (content, schema) in pages(args.items).items():
+        default = measure(
+            lambda: default_response(content, schema), args.rounds
+        )
+        fast = measure(
+            lambda: fast_response(content, schema).body, args.rounds
+        )
+        print(
+            f"page={name:<14} items={args.items:<5} "
+            f"default={default * 1000:>7.2f}ms "
+            f"fast={fast * 1000:>7.2f}ms "
+            f"speedup={default / fast:>5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
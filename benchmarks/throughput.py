@@ -0,0 +1,85 @@
+"""
+Measure the API throughput under concurrent clients.
+
+Start the server (with `DATABASE_ASYNC=false` or `DATABASE_ASYNC=true`)
+and run this script against it, then compare the results of both modes:
+
+    uvicorn server:app --workers 1
+    python benchmarks/throughput.py --concurrency 16 64 256
+
+The script authenticates once and then keeps `concurrency` clients calling
+the same route for `duration` seconds, reporting the requests per second
+and the latency percentiles.
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from threading import local
+from time import perf_counter
+from typing import Dict, List
+
+import requests
+
+clients = local()
+
+
+def authenticate(url: str, username: str, password: str) -> Dict[str, str]:
+    """Get the authorization header used on every request."""
+    response = requests.post(
+        f"{url}/auth/", data={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def hammer(url: str, headers: Dict[str, str], until: float) -> List[float]:
+    """Call the route until the deadline and return the latencies."""
+    if not hasattr(clients, "session"):
+        clients.session = requests.Session()
+
+    latencies = []
+    while (started := perf_counter()) < until:
+        clients.session.get(url, headers=headers).raise_for_status()
+        latencies.append(perf_counter() - started)
+    return latencies
+
+
+def run(url: str, headers: Dict[str, str], concurrency: int, duration: float):
+    """Run a single round with the concurrency specified."""
+    until = perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        rounds = [
+            executor.submit(hammer, url, headers, until)
+            for _ in range(concurrency)
+        ]
+        latencies = sorted(lat for r in rounds for lat in r.result())
+
+    p50, p95, p99 = (quantiles(latencies, n=100)[i] for i in (49, 94, 98))
+    print(
+        f"concurrency={concurrency:<5} "
+        f"rps={len(latencies) / duration:>9.1f} "
+        f"p50={p50 * 1000:.1f}ms p95={p95 * 1000:.1f}ms "
+        f"p99={p99 * 1000:.1f}ms"
+    )
+
+
+def main():
+    """Parse the arguments and run the benchmark."""
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--route", default="/products/?limit=50")
+    parser.add_argument("--username", default="ps_user")
+    parser.add_argument("--password", default="ps_pass")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[16, 64, 256]
+    )
+    args = parser.parse_args()
+
+    headers = authenticate(args.url, args.username, args.password)
+    for concurrency in args.concurrency:
+        run(args.url + args.route, headers, concurrency, args.duration)
+
+
+if __name__ == "__main__":
+    main()
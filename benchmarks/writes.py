@@ -0,0 +1,172 @@
+"""
+Measure the latency of the product writes, before and after the upserts.
+
+The writes run in this process against the configured database. The
+"checked" writes are the ones the routes used to do: a `SELECT` of the
+code (and of the product, for the updates), the ORM flush, the commit and
+the `refresh`. The "single" writes are the `INSERT ... ON CONFLICT` and
+`UPDATE ... WHERE` statements with `RETURNING` of the repository:
+
+    python benchmarks/writes.py --writes 2000
+
+Then an order is created for every product, with the `refresh` of the
+order after the commit, or without it when `EAGER_DEFAULTS` is enabled
+(the generated columns come back with `RETURNING`):
+
+    EAGER_DEFAULTS=true python benchmarks/writes.py --writes 2000
+
+The script reports the median and the 95th percentile of the time spent
+by every write, with the number of statements sent (the commits aside).
+The products and orders it registers are deleted at the end.
+"""
+from argparse import ArgumentParser
+from statistics import median, quantiles
+from time import perf_counter
+from typing import Callable, Dict, List, NoReturn, Tuple
+from uuid import uuid4
+
+from sqlalchemy import delete, event
+from sqlalchemy.orm import Session
+
+from server.db import SessionLocal, engine, entities
+from server.db.repo.orders import create_order_for_product
+from server.db.repo.products import (
+    create_product,
+    get_product_by_code,
+    get_product_by_uuid,
+    update_product,
+)
+from server.env import env
+from server.models import schemas
+
+PREFIX = "writes-"
+
+
+def create_checked(db: Session, code: str) -> entities.Product:
+    """Register a product the way the route used to."""
+    if get_product_by_code(db=db, code=code):
+        raise ValueError(code)
+    product = entities.Product(code=code, summary="summary")
+    db.add(product)
+    db.commit()
+    db.refresh(product)
+    return product
+
+
+def update_checked(db: Session, uuid: str, code: str) -> entities.Product:
+    """Update a product the way the route used to."""
+    product = get_product_by_uuid(db=db, uuid=uuid)
+    if product.taken or get_product_by_code(db=db, code=code):
+        raise ValueError(code)
+    product.code = code
+    db.commit()
+    db.refresh(product)
+    return product
+
+
+def create_single(db: Session, code: str) -> Dict:
+    """Register a product with a single statement."""
+    product = schemas.ProductCreation(code=code, summary="summary")
+    return create_product(db=db, product=product)
+
+
+def update_single(db: Session, uuid: str, code: str) -> Dict:
+    """Update a product with a single statement."""
+    product = schemas.ProductUpdate(code=code)
+    return update_product(db=db, uuid=uuid, product=product)
+
+
+WRITES: Dict[str, Tuple[Callable, Callable]] = {
+    "checked": (create_checked, update_checked),
+    "single": (create_single, update_single),
+}
+
+
+def report(
+    name: str, kind: str, times: List[float], statements: List[str]
+) -> NoReturn:
+    """Print the latencies and the statements sent per write."""
+    print(
+        f"writes={name:<8} {kind:<15} count={len(times):<5} "
+        f"statements={len(statements) / len(times):<4.1f} "
+        f"median={median(times) * 1000:>6.2f}ms "
+        f"p95={quantiles(times, n=100)[94] * 1000:>6.2f}ms"
+    )
+
+
+def measure(
+    db: Session, name: str, writes: int, statements: List[str]
+) -> NoReturn:
+    """Register and then update `writes` products, printing the latencies."""
+    create, update = WRITES[name]
+    codes = [f"{PREFIX}{uuid4().hex[:8]}-{n}" for n in range(writes)]
+
+    times, uuids = [], []
+    statements.clear()
+    for code in codes:
+        started = perf_counter()
+        product = create(db, code)
+        times.append(perf_counter() - started)
+        uuids.append(
+            str(product["uuid"] if isinstance(product, dict) else product.uuid)
+        )
+    report(name, "create", times, statements)
+
+    times = []
+    statements.clear()
+    for uuid, code in zip(uuids, codes):
+        started = perf_counter()
+        update(db, uuid, f"{code}-updated")
+        times.append(perf_counter() - started)
+    report(name, "update", times, statements)
+
+    times = []
+    statements.clear()
+    order = schemas.OrderCreation(
+        mod_id=PREFIX, mod_display_name="mod", owner_display_name="owner"
+    )
+    for uuid in uuids:
+        product = get_product_by_uuid(db=db, uuid=uuid)
+        started = perf_counter()
+        created = create_order_for_product(db=db, product=product, order=order)
+        schemas.Order.from_orm(created)
+        times.append(perf_counter() - started)
+        statements.pop(0)  # the product, loaded before the timing.
+    mode = "eager" if env.EAGER_DEFAULTS else "refresh"
+    report(name, f"order ({mode})", times, statements)
+
+
+def main():
+    """Parse the arguments and run the benchmark."""
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writes", type=int, default=1000)
+    args = parser.parse_args()
+
+    statements: List[str] = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(connection, cursor, statement, *_):
+        statements.append(statement)
+
+    db = SessionLocal()
+    try:
+        for name in WRITES:
+            measure(db, name, args.writes, statements)
+    finally:
+        db.rollback()
+        db.execute(
+            delete(entities.Order)
+            .where(entities.Order.mod_id == PREFIX)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            delete(entities.Product)
+            .where(entities.Product.code.startswith(PREFIX))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,15 @@
 from fastapi import FastAPI
 
+from server.db.partitions import prepare_partitions
 from server.env import env
+from server.models.responses import listen, unlisten
+from server.routes.archive import router as archive
 from server.routes.auth import router as auth
 from server.routes.heartbeat import router as heartbeat
+from server.routes.metrics import router as metrics
 from server.routes.orders import router as orders
 from server.routes.products import router as products
+from server.routes.stats import router as stats
 
 app = FastAPI(
     title="MiceBot",
@@ -17,4 +22,10 @@ app = FastAPI(
 app.include_router(auth, prefix="/auth", tags=["authentication"])
 app.include_router(products, prefix="/products", tags=["products"])
 app.include_router(orders, prefix="/orders", tags=["orders"])
+app.include_router(stats, prefix="/stats", tags=["statistics"])
+app.include_router(archive, prefix="/archive", tags=["archive"])
 app.include_router(heartbeat, prefix="/hb", tags=["heartbeat"])
+app.include_router(metrics, prefix="/metrics", tags=["metrics"])
+app.add_event_handler("startup", prepare_partitions)
+app.add_event_handler("startup", listen)
+app.add_event_handler("shutdown", unlisten)
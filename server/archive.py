@@ -0,0 +1,136 @@
+"""
+Archive the old orders and taken products into compressed files.
+
+The orders requested more than `--days` ago are moved, with their products,
+to gzipped NDJSON files in the archive directory, and so are the products
+taken without an order (by hand) and not updated since then:
+
+    poetry run archive --days 365 --batch-size 1000
+
+Every batch is deleted from the database in its own transaction, which is
+only committed once the batch is written (and synced to the disk), so a
+failure only affects the batch in progress. The archive can still be read
+through `GET /archive`.
+"""
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, List, NoReturn
+
+from sqlalchemy import exc
+from sqlalchemy.orm import Session
+
+from server.db import SessionLocal
+from server.db.repo import archive as repo
+from server.env import env
+from server.models.archive import write_archive
+
+
+def archive(
+    db: Session, directory: Path, orders: List[Any], products: List[Any],
+) -> NoReturn:
+    """
+    Delete the orders and products, write them to the archive, then commit.
+
+    Only the products actually deleted are written: the ones still
+    referenced by another order are kept, to be archived with it. The
+    files are removed if the commit fails, so the batch can be archived
+    again.
+
+    Args:
+        - db: the database session, with the entities locked.
+        - directory: the archive directory.
+        - orders: the orders archived.
+        - products: the products archived.
+    """
+    paths = []
+    try:
+        deleted = repo.delete_archived(db=db, orders=orders, products=products)
+        products = [product for product in products if product.id in deleted]
+        for kind, entities in (("orders", orders), ("products", products)):
+            if entities:
+                paths.append(write_archive(directory, kind, entities))
+        if orders:
+            repo.notify_archived(db=db)
+        db.commit()
+    except (exc.SQLAlchemyError, OSError):
+        db.rollback()
+        for path in paths:
+            path.unlink()
+        raise
+
+
+def archive_orders(
+    db: Session, directory: Path, before: datetime, size: int
+) -> int:
+    """Archive a batch of orders, with their products."""
+    orders = repo.get_archivable_orders(db=db, before=before, limit=size)
+    if orders:
+        archive(db, directory, orders, [order.product for order in orders])
+    return len(orders)
+
+
+def archive_products(
+    db: Session, directory: Path, before: datetime, size: int
+) -> int:
+    """Archive a batch of products taken without an order."""
+    products = repo.get_archivable_products(db=db, before=before, limit=size)
+    if products:
+        archive(db, directory, [], products)
+    return len(products)
+
+
+def archive_all(
+    batch: Callable[[Session, Path, datetime, int], int],
+    directory: Path,
+    before: datetime,
+    size: int,
+) -> int:
+    """
+    Archive the batches, each one in its own session, until there is none.
+
+    Args:
+        - batch: `archive_orders` or `archive_products`.
+        - directory: the archive directory.
+        - before: the datetime the entities must be older than.
+        - size: the number of entities per batch.
+
+    Returns:
+        - the number of entities archived.
+    """
+    archived = 0
+    while True:
+        db = SessionLocal()
+        try:
+            if not (count := batch(db, directory, before, size)):
+                return archived
+            archived += count
+        finally:
+            db.close()
+
+
+def main():
+    """Parse the arguments and archive the old orders and products."""
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=env.ARCHIVE_AFTER_DAYS)
+    parser.add_argument(
+        "--batch-size", type=int, default=env.ARCHIVE_BATCH_SIZE
+    )
+    parser.add_argument("--directory", default=env.ARCHIVE_DIRECTORY)
+    args = parser.parse_args()
+
+    directory = Path(args.directory)
+    before = datetime.utcnow() - timedelta(days=args.days)
+    orders = archive_all(archive_orders, directory, before, args.batch_size)
+    products = archive_all(
+        archive_products, directory, before, args.batch_size
+    )
+    print(
+        f"Archived {orders} orders (with their products) and {products} "
+        f"products taken without an order, older than {before:%Y-%m-%d}, "
+        f"into {directory}."
+    )
+
+
+if __name__ == "__main__":
+    main()
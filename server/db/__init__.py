@@ -1,13 +1,136 @@
-from typing import Iterator
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NoReturn,
+    Union,
+)
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql import Select
+from starlette.concurrency import run_in_threadpool
 
+from server.db.pool import InstrumentedAsyncPool, InstrumentedQueuePool
+from server.db.replica import LAG_QUERY, ReplicaGuard
 from server.env import env
 
-engine = create_engine(env.DATABASE_URL)
+# The setting read by the triggers of the listings notifications (see the
+# `016` migration): the writes only pay for the `NOTIFY` when the responses
+# are cached.
+NOTIFY_LISTINGS = "micebot.notify_listings"
 
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+def connect_args(url: Union[str, URL]) -> Dict[str, Any]:
+    """
+    Get the arguments of the connections to the primary database.
+
+    Args:
+        - url: the database URL.
+
+    Returns:
+        - the settings of the connections, for the driver of the URL.
+    """
+    if not env.RESPONSE_CACHE:
+        return {}
+    driver = make_url(url).get_driver_name()
+    if driver == "psycopg2":
+        return {"options": f"-c {NOTIFY_LISTINGS}=on"}
+    if driver == "asyncpg":
+        return {"server_settings": {NOTIFY_LISTINGS: "on"}}
+    return {}
+
+
+pool_options = {
+    "pool_size": env.DATABASE_POOL_SIZE,
+    "max_overflow": env.DATABASE_MAX_OVERFLOW,
+    "pool_timeout": env.DATABASE_POOL_TIMEOUT,
+    "pool_recycle": env.DATABASE_POOL_RECYCLE,
+    "pool_pre_ping": env.DATABASE_POOL_PRE_PING,
+}
+
+engine = create_engine(
+    env.DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    connect_args=connect_args(env.DATABASE_URL),
+    **pool_options,
+)
+engines = {"primary": engine}
+
+# With `EAGER_DEFAULTS`, the entities written already have every value
+# generated by the database (see `entities.Entity`), so the commit doesn't
+# expire them: the routes serialize them without loading them again. The
+# sessions live for a single request, there is nothing else to reload.
+SessionLocal = sessionmaker(
+    bind=engine,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=not env.EAGER_DEFAULTS,
+)
+
+# The read only queries go to the replica (when there is one) while its
+# replication lag stays under `REPLICA_MAX_LAG`.
+replica = ReplicaGuard(env.REPLICA_MAX_LAG, env.REPLICA_LAG_CHECK_INTERVAL)
+ReplicaSessionLocal = AsyncReplicaSessionLocal = None
+
+if env.DATABASE_REPLICA_URL:
+    replica_engine = create_engine(
+        env.DATABASE_REPLICA_URL,
+        poolclass=InstrumentedQueuePool,
+        **pool_options,
+    )
+    engines["replica"] = replica_engine
+
+    ReplicaSessionLocal = sessionmaker(
+        bind=replica_engine, autocommit=False, autoflush=False
+    )
+
+if env.DATABASE_ASYNC:
+    async_url = make_url(env.DATABASE_URL).set(drivername="postgresql+asyncpg")
+    async_engine = create_async_engine(
+        async_url,
+        poolclass=InstrumentedAsyncPool,
+        connect_args=connect_args(async_url),
+        **pool_options,
+    )
+    engines["primary_async"] = async_engine.sync_engine
+
+    AsyncSessionLocal = sessionmaker(
+        bind=async_engine,
+        class_=AsyncSession,
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+    if env.DATABASE_REPLICA_URL:
+        async_replica_engine = create_async_engine(
+            make_url(env.DATABASE_REPLICA_URL).set(
+                drivername="postgresql+asyncpg"
+            ),
+            poolclass=InstrumentedAsyncPool,
+            **pool_options,
+        )
+        engines["replica_async"] = async_replica_engine.sync_engine
+
+        AsyncReplicaSessionLocal = sessionmaker(
+            bind=async_replica_engine,
+            class_=AsyncSession,
+            autocommit=False,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+
+
+def pool_statistics() -> Dict[str, Dict[str, Any]]:
+    """Get the connection pool statistics for each database engine."""
+    return {name: e.pool.statistics() for name, e in engines.items()}
 
 
 def open_session() -> Iterator[Session]:
@@ -17,3 +140,173 @@ def open_session() -> Iterator[Session]:
         yield db
     finally:
         db.close()
+
+
+async def open_async_session() -> AsyncIterator[AsyncSession]:
+    """Get an async session from the database connection (asyncpg)."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def check_replica() -> bool:
+    """
+    Check the replica lag, when it's due.
+
+    Returns:
+        - `True` if the replica can be used.
+    """
+    if replica.should_check():
+        try:
+            with replica_engine.connect() as connection:
+                replica.update(connection.execute(LAG_QUERY).scalar())
+        except (exc.SQLAlchemyError, OSError):
+            replica.update(None, reachable=False)
+    return replica.use_replica()
+
+
+async def check_async_replica() -> bool:
+    """
+    Check the replica lag (with asyncpg), when it's due.
+
+    Returns:
+        - `True` if the replica can be used.
+    """
+    if replica.should_check():
+        try:
+            async with async_replica_engine.connect() as connection:
+                result = await connection.execute(LAG_QUERY)
+                replica.update(result.scalar())
+        except (exc.SQLAlchemyError, OSError):
+            replica.update(None, reachable=False)
+    return replica.use_replica()
+
+
+def open_read_session() -> Iterator[Session]:
+    """
+    Get a session for read only queries.
+
+    The session is connected to the replica, unless there is no replica or
+    it is too stale, then the session is connected to the primary.
+    """
+    session_local = SessionLocal
+    if ReplicaSessionLocal and check_replica():
+        session_local = ReplicaSessionLocal
+
+    db = session_local()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def open_async_read_session() -> AsyncIterator[AsyncSession]:
+    """Get an async session for read only queries (see `open_read_session`)."""
+    session_local = AsyncSessionLocal
+    if AsyncReplicaSessionLocal and await check_async_replica():
+        session_local = AsyncReplicaSessionLocal
+
+    async with session_local() as db:
+        yield db
+
+
+def uses_replica(db: Union[Session, AsyncSession]) -> bool:
+    """Tell if the session is connected to the replica."""
+    bind = db.bind.sync_engine if isinstance(db, AsyncSession) else db.bind
+    return any(
+        bind is replica_engine
+        for name, replica_engine in engines.items()
+        if name.startswith("replica")
+    )
+
+
+@asynccontextmanager
+async def open_primary_session(
+    db: Union[Session, AsyncSession]
+) -> AsyncIterator[Union[Session, AsyncSession]]:
+    """
+    Get a session connected to the primary, of the same kind as `db`.
+
+    For the reads that must see the latest writes, when the read session
+    is connected to the replica.
+    """
+    if isinstance(db, AsyncSession):
+        async with AsyncSessionLocal() as primary:
+            yield primary
+    else:
+        primary = SessionLocal()
+        try:
+            yield primary
+        finally:
+            primary.close()
+
+
+# The session dependencies used by the routes, selected by `DATABASE_ASYNC`.
+get_db = open_async_session if env.DATABASE_ASYNC else open_session
+get_read_db = (
+    open_async_read_session if env.DATABASE_ASYNC else open_read_session
+)
+
+
+async def execute(
+    db: Union[Session, AsyncSession], fn: Callable, **kwargs
+) -> Any:
+    """
+    Call a repository function without blocking the event loop.
+
+    With an async session, the function runs through `run_sync`: the
+    queries are sent by asyncpg and awaited in the event loop, there are no
+    threads involved. With a regular session, the function runs in the
+    threadpool, just like a sync route would.
+
+    Args:
+        - db: the database session (sync or async).
+        - fn: the repository function, it must accept the `db` argument.
+        - kwargs: the other arguments to the function.
+
+    Returns:
+        - the value returned by the function.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda sync_db: fn(db=sync_db, **kwargs))
+    return await run_in_threadpool(fn, db=db, **kwargs)
+
+
+def commit(db: Session) -> NoReturn:
+    """
+    Commit the current transaction.
+
+    For the routes that call several repository functions in a single
+    transaction, through `execute`.
+    """
+    db.commit()
+
+
+async def stream(
+    db: Union[Session, AsyncSession], statement: Select, size: int = 1000
+) -> AsyncIterator[List[Any]]:
+    """
+    Fetch the entities selected through a server side cursor.
+
+    Only `size` entities are fetched (and kept in memory) at a time,
+    whatever the number of entities selected.
+
+    Args:
+        - db: the database session (sync or async).
+        - statement: the select statement.
+        - size: the number of entities fetched at a time.
+
+    Returns:
+        - an iterator with the lists of entities fetched.
+    """
+    statement = statement.execution_options(yield_per=size)
+
+    if isinstance(db, AsyncSession):
+        result = await db.stream(statement)
+        async for partition in result.scalars().partitions():
+            yield partition
+        return
+
+    result = await run_in_threadpool(db.execute, statement)
+    partitions = result.scalars().partitions()
+    while partition := await run_in_threadpool(next, partitions, None):
+        yield partition
@@ -5,9 +5,13 @@ from sqlalchemy import (
     Boolean,
     Column,
     DateTime,
+    FetchedValue,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
+    UniqueConstraint,
     sql,
 )
 from sqlalchemy.dialects.postgresql import UUID
@@ -15,6 +19,7 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 
+from server.env import env
 from server.models.security import pw_context
 
 Base = declarative_base()
@@ -26,9 +31,15 @@ class Entity(Base):
 
     This adds a non nullable integer as primary key for models/entities
     that inherits from `Entity`. A index is also created too.
+
+    With `EAGER_DEFAULTS`, the values generated by the database on the
+    inserts and updates (like `created_at` and `updated_at`) are read back
+    with `RETURNING` by the flush itself, instead of being expired and
+    loaded again by another query.
     """
 
     __abstract__ = True
+    __mapper_args__ = {"eager_defaults": env.EAGER_DEFAULTS}
     id = Column(Integer, nullable=False, primary_key=True, index=True)
 
 
@@ -54,12 +65,32 @@ class Product(Entity):
         nullable=False,
         server_default=sql.func.now(),
         onupdate=sql.func.now(),
+        server_onupdate=FetchedValue(),
     )
 
     def __repr__(self):  # pragma: no cover
         return str(self.__dict__)
 
 
+class ProductCounter(Entity):
+    """
+    Represents a change of the product counters.
+
+    Every statement on the product table adds its changes to one of a
+    fixed number of rows (database triggers), so the concurrent writes
+    don't contend for a single row. The counters are the sum of the rows,
+    so the product statistics cost the same whatever the number of
+    products registered.
+    """
+
+    __tablename__ = "product_counter"
+    total = Column(Integer, nullable=False)
+    taken = Column(Integer, nullable=False)
+
+    def __repr__(self):  # pragma: no cover
+        return str(self.__dict__)
+
+
 class Order(Entity):
     """
     Represents an order entity.
@@ -67,23 +98,147 @@ class Order(Entity):
     Contains information from a code redemption request.
     Consider the information of the moderator who requested the code, the user
     who received it, general date/time information, and the product identifier.
+
+    The product is always serialized with the order, so it's loaded eagerly
+    by default (see `ORDER_PRODUCT_LOADING`). The "select" (lazy) strategy
+    issues one query per order and does not work with `DATABASE_ASYNC`.
+
+    In Postgres, the orders are partitioned by the month they were requested
+    (see `db.partitions`), so the primary key and the uuid unique constraint
+    also include the `requested_at`, as Postgres requires it.
     """
 
     __tablename__ = "order"
-    uuid = Column(
-        UUID(as_uuid=True), nullable=False, unique=True, default=uuid4
+    __table_args__ = (
+        UniqueConstraint("uuid", "requested_at", name="uq_uuid_order"),
+        {"postgresql_partition_by": "RANGE (requested_at)"},
+    )
+    id = Column(
+        Integer,
+        nullable=False,
+        primary_key=True,
+        index=True,
+        autoincrement=True,
     )
+    uuid = Column(UUID(as_uuid=True), nullable=False, default=uuid4)
     mod_id = Column(String, nullable=False)
     mod_display_name = Column(String, nullable=False)
     owner_display_name = Column(String, nullable=False)
-    requested_at = Column(DateTime, nullable=False, default=sql.func.now())
+    requested_at = Column(
+        DateTime,
+        nullable=False,
+        primary_key=True,
+        default=sql.func.now(),
+        server_default=FetchedValue(),
+    )
     product_id = Column(Integer, ForeignKey("product.id"), nullable=False)
-    product = relationship("Product")
+    product = relationship("Product", lazy=env.ORDER_PRODUCT_LOADING)
+
+    def __repr__(self):  # pragma: no cover
+        return str(self.__dict__)
+
+
+# The indexes below match the listing queries (see `db.repo`).
+Index(
+    "ix_product_taken_created_at_id",
+    Product.taken,
+    Product.created_at.desc(),
+    Product.id.desc(),
+)
+Index(
+    "ix_product_available_created_at_id",
+    Product.created_at.desc(),
+    Product.id.desc(),
+    postgresql_where=Product.taken.is_(False),
+)
+Index("ix_order_requested_at_id", Order.requested_at, Order.id)
+Index(
+    "ix_order_mod_display_name_requested_at_id",
+    Order.mod_display_name,
+    Order.requested_at,
+    Order.id,
+)
+Index(
+    "ix_order_owner_display_name_requested_at_id",
+    Order.owner_display_name,
+    Order.requested_at,
+    Order.id,
+)
+Index("ix_order_product_id", Order.product_id)
+Index("ix_product_updated_at", Product.updated_at)
+
+# The trigram indexes match the search queries (see `pg_trgm`).
+Index(
+    "ix_product_summary_trgm",
+    Product.summary,
+    postgresql_using="gin",
+    postgresql_ops={"summary": "gin_trgm_ops"},
+)
+Index(
+    "ix_order_owner_display_name_trgm",
+    Order.owner_display_name,
+    postgresql_using="gin",
+    postgresql_ops={"owner_display_name": "gin_trgm_ops"},
+)
+Index(
+    "ix_order_mod_display_name_trgm",
+    Order.mod_display_name,
+    postgresql_using="gin",
+    postgresql_ops={"mod_display_name": "gin_trgm_ops"},
+)
+
+
+class ModeratorStats(Entity):
+    """
+    Represents the order statistics of a moderator.
+
+    Updated along with every order created (see `repo.stats`), so the
+    leaderboard is read without scanning the orders. The display name is
+    the one of the latest order, since it may change over time.
+    """
+
+    __tablename__ = "moderator_stats"
+    mod_id = Column(String, nullable=False, unique=True)
+    mod_display_name = Column(String, nullable=False)
+    orders = Column(Integer, nullable=False)
+    last_order_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):  # pragma: no cover
+        return str(self.__dict__)
+
+
+class OwnerStats(Entity):
+    """
+    Represents the order statistics of an owner (a viewer).
+
+    Updated along with every order created (see `repo.stats`), so the
+    leaderboard is read without scanning the orders.
+    """
+
+    __tablename__ = "owner_stats"
+    owner_display_name = Column(String, nullable=False, unique=True)
+    orders = Column(Integer, nullable=False)
+    last_order_at = Column(DateTime, nullable=False)
 
     def __repr__(self):  # pragma: no cover
         return str(self.__dict__)
 
 
+# The indexes below match the leaderboards, so the top is read in order.
+Index(
+    "ix_moderator_stats_orders_last_order_at_id",
+    ModeratorStats.orders.desc(),
+    ModeratorStats.last_order_at.desc(),
+    ModeratorStats.id,
+)
+Index(
+    "ix_owner_stats_orders_last_order_at_id",
+    OwnerStats.orders.desc(),
+    OwnerStats.last_order_at.desc(),
+    OwnerStats.id,
+)
+
+
 class Application(Entity):
     """
     Represents an application entity.
@@ -121,3 +276,78 @@ class Application(Entity):
 
     def __repr__(self):  # pragma: no cover
         return str(self.__dict__)
+
+
+class RefreshToken(Entity):
+    """
+    Represents a refresh token entity.
+
+    Refresh tokens are long-lived and can be exchanged for new access
+    tokens without the application password. Only a HMAC of the token is
+    stored, so a leaked table cannot be used to mint access tokens.
+
+    The expired and revoked tokens are deleted whenever the application
+    gets a new one, and so are the oldest ones beyond the limit (see
+    `REFRESH_TOKEN_LIMIT`), so the table doesn't grow with every login.
+    """
+
+    __tablename__ = "refresh_token"
+    token_hash = Column(String, nullable=False, unique=True)
+    application_id = Column(
+        Integer, ForeignKey("application.id"), nullable=False
+    )
+    application = relationship("Application")
+    created_at = Column(
+        DateTime, nullable=False, server_default=sql.func.now()
+    )
+    expires_at = Column(DateTime, nullable=False)
+    revoked = Column(Boolean, nullable=False, default=sql.false())
+
+    def __repr__(self):  # pragma: no cover
+        return str(self.__dict__)
+
+
+# The index below matches the purge of the tokens of an application.
+Index(
+    "ix_refresh_token_application_id_id",
+    RefreshToken.application_id,
+    RefreshToken.id,
+)
+
+
+class IdempotencyKey(Entity):
+    """
+    Represents an idempotency key sent by a client.
+
+    While its request is in progress, the key is inserted but not committed
+    yet (see `repo.idempotency`), so the duplicates wait for it. It's
+    committed with the changes of the request, then the response is kept,
+    until it expires, to answer the duplicates. A key committed without a
+    response had its request done, but the response couldn't be stored.
+
+    The keys are scoped by the application that sent them, so the same key
+    sent by another application is a different request.
+    """
+
+    __tablename__ = "idempotency_key"
+    __table_args__ = (
+        UniqueConstraint(
+            "application_id",
+            "key",
+            name="uq_idempotency_key_application_id_key",
+        ),
+    )
+    application_id = Column(
+        Integer, ForeignKey("application.id"), nullable=False
+    )
+    key = Column(String, nullable=False)
+    request_hash = Column(String, nullable=False)
+    status_code = Column(Integer)
+    body = Column(LargeBinary)
+    created_at = Column(
+        DateTime, nullable=False, server_default=sql.func.now()
+    )
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):  # pragma: no cover
+        return str(self.__dict__)
@@ -0,0 +1,103 @@
+from logging import getLogger
+from select import select
+from threading import Event, Thread
+from typing import Any, Callable, Dict, NoReturn, Optional
+
+import psycopg2
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import NullPool
+
+logger = getLogger(__name__)
+
+
+class Listener:
+    """
+    Listen to a Postgres notification channel, in a background thread.
+
+    The thread keeps a dedicated connection (outside of the pools) and
+    calls the `callback` with the payload of every notification. When the
+    connection is lost, the callback is also called (with `None`), since
+    the notifications sent meanwhile were missed, and the thread connects
+    again.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        channel: str,
+        callback: Callable[[Optional[str]], Any],
+        timeout: float = 5,
+    ):
+        """
+        Create a new listener, it's only started by `start`.
+
+        Args:
+            - url: the database URL (with the psycopg2 driver).
+            - channel: the notification channel.
+            - callback: the function called for every notification.
+            - timeout: the seconds to wait for notifications (or to wait
+            before connecting again), before checking if it was stopped.
+        """
+        self.engine = create_engine(url, poolclass=NullPool)
+        self.channel = channel
+        self.callback = callback
+        self.timeout = timeout
+        self.listening = False
+        self.notifications = 0
+        self.reconnections = 0
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+
+    def start(self) -> NoReturn:
+        """Start listening in a daemon thread."""
+        self._stopped.clear()
+        self._thread = Thread(
+            target=self._run, name=f"listener-{self.channel}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> NoReturn:
+        """Stop listening and wait for the thread."""
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(self.timeout * 2)
+            self._thread = None
+
+    def _run(self) -> NoReturn:
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except (exc.SQLAlchemyError, psycopg2.Error, OSError,) as error:
+                logger.warning("Lost the %s channel: %s", self.channel, error)
+                if self.listening:
+                    self.reconnections += 1
+                    self.callback(None)
+
+            self.listening = False
+            self._stopped.wait(self.timeout)
+
+    def _listen(self) -> NoReturn:
+        connection = self.engine.raw_connection()
+        try:
+            dbapi = connection.connection
+            dbapi.autocommit = True
+            with dbapi.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            self.listening = True
+
+            while not self._stopped.is_set():
+                if select([dbapi], [], [], self.timeout)[0]:
+                    dbapi.poll()
+                    while dbapi.notifies:
+                        self.notifications += 1
+                        self.callback(dbapi.notifies.pop(0).payload)
+        finally:
+            connection.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the listener statistics."""
+        return {
+            "listening": self.listening,
+            "notifications": self.notifications,
+            "reconnections": self.reconnections,
+        }
@@ -0,0 +1,44 @@
+"""Added refresh token table.
+
+Revision ID: 5f2c1d9e7a43
+Revises: 1ba1b384f25c
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "5f2c1d9e7a43"
+down_revision = "1ba1b384f25c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add a new table for the refresh tokens issued to applications."""
+    op.create_table(
+        "refresh_token",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("token_hash", sa.String(), nullable=False),
+        sa.Column("application_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("revoked", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(["application_id"], ["application.id"],),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("token_hash"),
+    )
+    op.create_index(
+        op.f("ix_refresh_token_id"), "refresh_token", ["id"], unique=False
+    )
+
+
+def downgrade():
+    """Drop the refresh token table and the indexes associated."""
+    op.drop_index(op.f("ix_refresh_token_id"), table_name="refresh_token")
+    op.drop_table("refresh_token")
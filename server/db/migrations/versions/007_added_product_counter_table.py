@@ -0,0 +1,86 @@
+"""Added product counter table.
+
+Revision ID: 9d4e6b1f2c87
+Revises: 5f2c1d9e7a43
+Create Date: 2026-10-18 11:02:47.118904
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "9d4e6b1f2c87"
+down_revision = "5f2c1d9e7a43"
+branch_labels = None
+depends_on = None
+
+# The counters are updated once per statement, using the transition tables
+# with the affected rows. So a bulk insert (or COPY) updates them only once.
+COUNTER_FUNCTION = """
+CREATE FUNCTION product_counter_refresh() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE product_counter SET
+            total = total + (SELECT count(*) FROM new_rows),
+            taken = taken + (SELECT count(*) FROM new_rows WHERE taken);
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE product_counter SET
+            total = total - (SELECT count(*) FROM old_rows),
+            taken = taken - (SELECT count(*) FROM old_rows WHERE taken);
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE product_counter SET
+            taken = taken
+                + (SELECT count(*) FROM new_rows WHERE taken)
+                - (SELECT count(*) FROM old_rows WHERE taken);
+    ELSE
+        UPDATE product_counter SET total = 0, taken = 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGERS = {
+    "product_counter_insert": "AFTER INSERT ON product "
+    "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT",
+    "product_counter_delete": "AFTER DELETE ON product "
+    "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT",
+    "product_counter_update": "AFTER UPDATE ON product "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT",
+    "product_counter_truncate": "AFTER TRUNCATE ON product "
+    "FOR EACH STATEMENT",
+}
+
+
+def upgrade():
+    """Add the product counter table and the triggers to maintain it."""
+    op.create_table(
+        "product_counter",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("taken", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_product_counter_id"), "product_counter", ["id"], unique=False
+    )
+    op.execute("LOCK TABLE product IN SHARE MODE")
+    op.execute(
+        "INSERT INTO product_counter (id, total, taken) "
+        "SELECT 1, count(*), count(*) FILTER (WHERE taken) FROM product"
+    )
+    op.execute(COUNTER_FUNCTION)
+    for name, definition in TRIGGERS.items():
+        op.execute(
+            f"CREATE TRIGGER {name} {definition} "
+            "EXECUTE PROCEDURE product_counter_refresh()"
+        )
+
+
+def downgrade():
+    """Drop the product counter triggers and table."""
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER {name} ON product")
+    op.execute("DROP FUNCTION product_counter_refresh()")
+    op.drop_index(op.f("ix_product_counter_id"), table_name="product_counter")
+    op.drop_table("product_counter")
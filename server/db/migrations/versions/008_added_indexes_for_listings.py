@@ -0,0 +1,64 @@
+"""Added indexes for the product and order listings.
+
+Revision ID: 2b7e0c4a9f15
+Revises: 9d4e6b1f2c87
+Create Date: 2026-10-18 11:48:09.562310
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "2b7e0c4a9f15"
+down_revision = "9d4e6b1f2c87"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    (
+        "ix_product_taken_created_at_id",
+        "product",
+        ["taken", sa.text("created_at DESC"), sa.text("id DESC")],
+        {},
+    ),
+    (
+        "ix_product_available_created_at_id",
+        "product",
+        [sa.text("created_at DESC"), sa.text("id DESC")],
+        {"postgresql_where": sa.text("taken = false")},
+    ),
+    ("ix_order_requested_at_id", "order", ["requested_at", "id"], {}),
+    (
+        "ix_order_mod_display_name_requested_at_id",
+        "order",
+        ["mod_display_name", "requested_at", "id"],
+        {},
+    ),
+    (
+        "ix_order_owner_display_name_requested_at_id",
+        "order",
+        ["owner_display_name", "requested_at", "id"],
+        {},
+    ),
+    ("ix_order_product_id", "order", ["product_id"], {}),
+]
+
+
+def upgrade():
+    """
+    Create the indexes matching the listing and lookup queries.
+
+    They are created concurrently (outside of a transaction), so the
+    tables are not locked for writes while the indexes are built.
+    """
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(
+                name, table, columns, postgresql_concurrently=True, **options
+            )
+
+
+def downgrade():
+    """Drop the listing and lookup indexes."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
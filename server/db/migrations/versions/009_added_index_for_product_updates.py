@@ -0,0 +1,40 @@
+"""Added an index for the last product update.
+
+Revision ID: 6c1f3a8d2e47
+Revises: 2b7e0c4a9f15
+Create Date: 2026-10-18 15:02:41.118204
+
+"""
+from alembic import op
+
+revision = "6c1f3a8d2e47"
+down_revision = "2b7e0c4a9f15"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Create the index used to find the last product update.
+
+    The listings validators (the `ETag` and `Last-Modified` headers) read
+    the `max(updated_at)` on every poll. The index is created concurrently,
+    so the table is not locked for writes while it's built.
+    """
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_product_updated_at",
+            "product",
+            ["updated_at"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    """Drop the last product update index."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_product_updated_at",
+            table_name="product",
+            postgresql_concurrently=True,
+        )
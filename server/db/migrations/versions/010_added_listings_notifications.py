@@ -0,0 +1,46 @@
+"""Added notifications for the listings changes.
+
+Revision ID: e3a7b5d91c60
+Revises: 6c1f3a8d2e47
+Create Date: 2026-10-18 15:40:12.734561
+
+"""
+from alembic import op
+
+revision = "e3a7b5d91c60"
+down_revision = "6c1f3a8d2e47"
+branch_labels = None
+depends_on = None
+
+# Every worker listens to this channel to drop its cached responses. The
+# notifications are only delivered when the transaction commits, and the
+# same notification is sent only once per transaction, so a statement
+# changing many rows (or a bulk import) is notified just once.
+NOTIFY_FUNCTION = """
+CREATE FUNCTION listings_changed_notify() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('listings_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TABLES = ["product", "order"]
+
+
+def upgrade():
+    """Notify the changes of the products and orders, once per statement."""
+    op.execute(NOTIFY_FUNCTION)
+    for table in TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_listings_changed "
+            f'AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "{table}" '
+            "FOR EACH STATEMENT EXECUTE PROCEDURE listings_changed_notify()"
+        )
+
+
+def downgrade():
+    """Drop the listings notifications."""
+    for table in TABLES:
+        op.execute(f'DROP TRIGGER {table}_listings_changed ON "{table}"')
+    op.execute("DROP FUNCTION listings_changed_notify()")
@@ -0,0 +1,51 @@
+"""Added trigram indexes for the search.
+
+Revision ID: 4f8d2c6b1a93
+Revises: e3a7b5d91c60
+Create Date: 2026-10-18 16:21:37.402915
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "4f8d2c6b1a93"
+down_revision = "e3a7b5d91c60"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_product_summary_trgm", "product", "summary"),
+    ("ix_order_owner_display_name_trgm", "order", "owner_display_name"),
+    ("ix_order_mod_display_name_trgm", "order", "mod_display_name"),
+]
+
+
+def upgrade():
+    """
+    Create the trigram indexes used by the search.
+
+    The `pg_trgm` extension ships with the Postgres contrib modules. The
+    indexes are created concurrently (outside of a transaction), so the
+    tables are not locked for writes while the indexes are built.
+    """
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.create_index(
+                name,
+                table,
+                [sa.text(f"{column} gin_trgm_ops")],
+                postgresql_using="gin",
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade():
+    """
+    Drop the trigram indexes.
+
+    The extension is kept, since other database objects may use it.
+    """
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,77 @@
+"""Added order statistics tables.
+
+Revision ID: 8a2d5e7c3b14
+Revises: 4f8d2c6b1a93
+Create Date: 2026-10-18 17:05:22.815390
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "8a2d5e7c3b14"
+down_revision = "4f8d2c6b1a93"
+branch_labels = None
+depends_on = None
+
+# The statistics of the orders created so far, the display name of a
+# moderator is the one of their latest order.
+BACKFILL = {
+    "moderator_stats": """
+        INSERT INTO moderator_stats
+            (mod_id, mod_display_name, orders, last_order_at)
+        SELECT
+            mod_id,
+            (array_agg(mod_display_name ORDER BY requested_at DESC))[1],
+            count(*),
+            max(requested_at)
+        FROM "order" GROUP BY mod_id
+    """,
+    "owner_stats": """
+        INSERT INTO owner_stats (owner_display_name, orders, last_order_at)
+        SELECT owner_display_name, count(*), max(requested_at)
+        FROM "order" GROUP BY owner_display_name
+    """,
+}
+
+
+def upgrade():
+    """Add the order statistics tables, with the orders created so far."""
+    op.create_table(
+        "moderator_stats",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("mod_id", sa.String(), nullable=False),
+        sa.Column("mod_display_name", sa.String(), nullable=False),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.Column("last_order_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("mod_id"),
+    )
+    op.create_table(
+        "owner_stats",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("owner_display_name", sa.String(), nullable=False),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.Column("last_order_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("owner_display_name"),
+    )
+    for table in BACKFILL:
+        op.create_index(op.f(f"ix_{table}_id"), table, ["id"], unique=False)
+        op.create_index(
+            f"ix_{table}_orders_last_order_at_id",
+            table,
+            [sa.text("orders DESC"), sa.text("last_order_at DESC"), "id"],
+        )
+
+    # The orders created while migrating would be missed otherwise.
+    op.execute('LOCK TABLE "order" IN SHARE MODE')
+    for statement in BACKFILL.values():
+        op.execute(statement)
+
+
+def downgrade():
+    """Drop the order statistics tables."""
+    for table in BACKFILL:
+        op.drop_index(f"ix_{table}_orders_last_order_at_id", table_name=table)
+        op.drop_index(op.f(f"ix_{table}_id"), table_name=table)
+        op.drop_table(table)
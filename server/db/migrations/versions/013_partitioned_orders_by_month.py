@@ -0,0 +1,183 @@
+"""Partitioned the orders by month.
+
+Revision ID: 5c9e1b7d4a26
+Revises: 8a2d5e7c3b14
+Create Date: 2026-10-18 18:12:40.261837
+
+"""
+from typing import List, NoReturn
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "5c9e1b7d4a26"
+down_revision = "8a2d5e7c3b14"
+branch_labels = None
+depends_on = None
+
+# The orders of every month go to their own partition, e.g. `order_2026_10`.
+# Any order without a partition (in the past, or when the partitions were
+# not created ahead) goes to `order_default`: this function moves those
+# orders to the new partition. A partition is created as a regular table
+# and then attached, so the orders are not locked while it's done.
+PARTITIONS_FUNCTION = """
+CREATE FUNCTION create_order_partitions(since timestamp, until timestamp)
+RETURNS integer AS $$
+DECLARE
+    month timestamp := date_trunc('month', since);
+    partition text;
+    created integer := 0;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('create_order_partitions'));
+    WHILE month < until LOOP
+        partition := 'order_' || to_char(month, 'YYYY_MM');
+        IF to_regclass(quote_ident(partition)) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE "order" INCLUDING DEFAULTS)',
+                partition
+            );
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM order_default '
+                'WHERE requested_at >= %L AND requested_at < %L '
+                'RETURNING *) INSERT INTO %I SELECT * FROM moved',
+                month, month + interval '1 month', partition
+            );
+            EXECUTE format(
+                'ALTER TABLE "order" ATTACH PARTITION %I '
+                'FOR VALUES FROM (%L) TO (%L)',
+                partition, month, month + interval '1 month'
+            );
+            created := created + 1;
+        END IF;
+        month := month + interval '1 month';
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# The months created ahead, the application creates the following ones.
+MONTHS_AHEAD = 3
+
+INDEXES = [
+    ("ix_order_id", ["id"], {}),
+    ("ix_order_requested_at_id", ["requested_at", "id"], {}),
+    (
+        "ix_order_mod_display_name_requested_at_id",
+        ["mod_display_name", "requested_at", "id"],
+        {},
+    ),
+    (
+        "ix_order_owner_display_name_requested_at_id",
+        ["owner_display_name", "requested_at", "id"],
+        {},
+    ),
+    ("ix_order_product_id", ["product_id"], {}),
+    (
+        "ix_order_owner_display_name_trgm",
+        [sa.text("owner_display_name gin_trgm_ops")],
+        {"postgresql_using": "gin"},
+    ),
+    (
+        "ix_order_mod_display_name_trgm",
+        [sa.text("mod_display_name gin_trgm_ops")],
+        {"postgresql_using": "gin"},
+    ),
+]
+
+COLUMNS = (
+    "id, uuid, mod_id, mod_display_name, owner_display_name, requested_at, "
+    "product_id"
+)
+
+
+def replace_order_table(**options) -> str:
+    """
+    Rename the order table, to copy its rows into the new one.
+
+    The indexes and the constraints are dropped, since their names are used
+    by the new table, so are the triggers.
+
+    Returns:
+        - the name of the previous table.
+    """
+    previous = "order_previous"
+    op.execute('LOCK TABLE "order" IN EXCLUSIVE MODE')
+    for name, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name="order")
+    op.drop_constraint("uq_uuid_order", "order")
+    op.drop_constraint("order_pkey", "order")
+    op.execute('DROP TRIGGER order_listings_changed ON "order"')
+    op.execute("ALTER SEQUENCE order_id_seq OWNED BY NONE")
+    op.rename_table("order", previous)
+
+    op.create_table(
+        "order",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('order_id_seq')"),
+            nullable=False,
+        ),
+        sa.Column("uuid", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("mod_id", sa.String(), nullable=False),
+        sa.Column("mod_display_name", sa.String(), nullable=False),
+        sa.Column("owner_display_name", sa.String(), nullable=False),
+        sa.Column("requested_at", sa.DateTime(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["product_id"], ["product.id"], name="order_product_id_fkey"
+        ),
+        **options,
+    )
+    op.execute('ALTER SEQUENCE order_id_seq OWNED BY "order".id')
+    return previous
+
+
+def fill_order_table(previous: str, partition_key: List[str]) -> NoReturn:
+    """Copy the orders to the new table, then add the indexes and triggers."""
+    op.execute(
+        f'INSERT INTO "order" ({COLUMNS}) SELECT {COLUMNS} FROM {previous}'
+    )
+    op.create_primary_key("order_pkey", "order", ["id", *partition_key])
+    op.create_unique_constraint(
+        "uq_uuid_order", "order", ["uuid", *partition_key]
+    )
+    for name, columns, options in INDEXES:
+        op.create_index(name, "order", columns, **options)
+    op.execute(
+        "CREATE TRIGGER order_listings_changed "
+        'AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "order" '
+        "FOR EACH STATEMENT EXECUTE PROCEDURE listings_changed_notify()"
+    )
+    op.drop_table(previous)
+
+
+def upgrade():
+    """
+    Partition the orders by month (of the request).
+
+    The primary key and the uuid unique constraint include the partition
+    key, as Postgres requires it. The table is locked while the orders are
+    copied, so it's better done in a maintenance window.
+    """
+    previous = replace_order_table(
+        postgresql_partition_by="RANGE (requested_at)"
+    )
+    op.execute('CREATE TABLE order_default PARTITION OF "order" DEFAULT')
+    op.execute(PARTITIONS_FUNCTION)
+    op.execute(
+        "SELECT create_order_partitions("
+        "coalesce(min(requested_at), now()::timestamp), "
+        f"(now() + interval '{MONTHS_AHEAD} months')::timestamp"
+        f") FROM {previous}"
+    )
+    fill_order_table(previous, ["requested_at"])
+
+
+def downgrade():
+    """Move the orders back to a single table, dropping the partitions."""
+    previous = replace_order_table()
+    fill_order_table(previous, [])
+    op.execute("DROP FUNCTION create_order_partitions(timestamp, timestamp)")
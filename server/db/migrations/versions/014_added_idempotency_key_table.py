@@ -0,0 +1,53 @@
+"""Added idempotency key table.
+
+Revision ID: 7b3f9a2e6d58
+Revises: 5c9e1b7d4a26
+Create Date: 2026-10-18 19:26:03.547921
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "7b3f9a2e6d58"
+down_revision = "5c9e1b7d4a26"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add a new table for the idempotency keys and their responses."""
+    op.create_table(
+        "idempotency_key",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("request_hash", sa.String(), nullable=False),
+        sa.Column("status_code", sa.Integer(), nullable=True),
+        sa.Column("body", sa.LargeBinary(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("key"),
+    )
+    op.create_index(
+        op.f("ix_idempotency_key_id"), "idempotency_key", ["id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_idempotency_key_expires_at"),
+        "idempotency_key",
+        ["expires_at"],
+        unique=False,
+    )
+
+
+def downgrade():
+    """Drop the idempotency key table and the indexes associated."""
+    op.drop_index(
+        op.f("ix_idempotency_key_expires_at"), table_name="idempotency_key"
+    )
+    op.drop_index(op.f("ix_idempotency_key_id"), table_name="idempotency_key")
+    op.drop_table("idempotency_key")
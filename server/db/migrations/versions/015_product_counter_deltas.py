@@ -0,0 +1,92 @@
+"""Product counter deltas.
+
+Revision ID: 3e8a5c1f9b72
+Revises: 7b3f9a2e6d58
+Create Date: 2026-10-18 22:04:13.652180
+
+"""
+from alembic import op
+
+revision = "3e8a5c1f9b72"
+down_revision = "7b3f9a2e6d58"
+branch_labels = None
+depends_on = None
+
+# Every statement inserts its own row with the changes of the counters,
+# instead of updating the single row: the concurrent writes don't wait on
+# each other's lock. The rows are summed on read (see the `018` migration
+# for the fixed number of rows that replaced them).
+DELTA_FUNCTION = """
+CREATE OR REPLACE FUNCTION product_counter_refresh() RETURNS trigger AS $$
+DECLARE
+    total_delta integer := 0;
+    taken_delta integer := 0;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT count(*), count(*) FILTER (WHERE taken)
+        INTO total_delta, taken_delta FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT -count(*), -count(*) FILTER (WHERE taken)
+        INTO total_delta, taken_delta FROM old_rows;
+    ELSIF TG_OP = 'UPDATE' THEN
+        taken_delta := (SELECT count(*) FROM new_rows WHERE taken)
+            - (SELECT count(*) FROM old_rows WHERE taken);
+    ELSE
+        DELETE FROM product_counter;
+        INSERT INTO product_counter (total, taken) VALUES (0, 0);
+        RETURN NULL;
+    END IF;
+    IF total_delta <> 0 OR taken_delta <> 0 THEN
+        INSERT INTO product_counter (total, taken)
+        VALUES (total_delta, taken_delta);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+SINGLE_ROW_FUNCTION = """
+CREATE OR REPLACE FUNCTION product_counter_refresh() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE product_counter SET
+            total = total + (SELECT count(*) FROM new_rows),
+            taken = taken + (SELECT count(*) FROM new_rows WHERE taken);
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE product_counter SET
+            total = total - (SELECT count(*) FROM old_rows),
+            taken = taken - (SELECT count(*) FROM old_rows WHERE taken);
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE product_counter SET
+            taken = taken
+                + (SELECT count(*) FROM new_rows WHERE taken)
+                - (SELECT count(*) FROM old_rows WHERE taken);
+    ELSE
+        UPDATE product_counter SET total = 0, taken = 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade():
+    """Insert the changes of the product counters as new rows."""
+    # The single row was inserted with an explicit id.
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('product_counter', 'id'), "
+        "(SELECT max(id) FROM product_counter))"
+    )
+    op.execute(DELTA_FUNCTION)
+
+
+def downgrade():
+    """Compact the product counters back into a single row."""
+    op.execute("LOCK TABLE product_counter IN EXCLUSIVE MODE")
+    op.execute(
+        "WITH deltas AS (DELETE FROM product_counter RETURNING total, taken) "
+        "INSERT INTO product_counter (id, total, taken) "
+        "SELECT 1, coalesce(sum(total), 0), coalesce(sum(taken), 0) "
+        "FROM deltas"
+    )
+    op.execute(SINGLE_ROW_FUNCTION)
@@ -0,0 +1,48 @@
+"""Listings notifications setting.
+
+Revision ID: 8c2d6f4a1e93
+Revises: 3e8a5c1f9b72
+Create Date: 2026-10-18 22:31:48.209374
+
+"""
+from alembic import op
+
+revision = "8c2d6f4a1e93"
+down_revision = "3e8a5c1f9b72"
+branch_labels = None
+depends_on = None
+
+# A `NOTIFY` takes a lock for the whole cluster at commit, so it's only
+# sent by the connections with the `micebot.notify_listings` setting: the
+# ones of the app when the responses are cached (see `RESPONSE_CACHE`).
+# The setting can also be enabled for the whole database, with
+# `ALTER DATABASE ... SET micebot.notify_listings = on`.
+NOTIFY_FUNCTION = """
+CREATE OR REPLACE FUNCTION listings_changed_notify() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('micebot.notify_listings', true) = 'on' THEN
+        PERFORM pg_notify('listings_changed', TG_TABLE_NAME);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+ALWAYS_NOTIFY_FUNCTION = """
+CREATE OR REPLACE FUNCTION listings_changed_notify() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('listings_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade():
+    """Only notify the listings changes when the setting is enabled."""
+    op.execute(NOTIFY_FUNCTION)
+
+
+def downgrade():
+    """Notify the listings changes of every connection."""
+    op.execute(ALWAYS_NOTIFY_FUNCTION)
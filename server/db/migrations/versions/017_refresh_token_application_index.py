@@ -0,0 +1,30 @@
+"""Refresh token application index.
+
+Revision ID: 4d7a2c9e5b16
+Revises: 8c2d6f4a1e93
+Create Date: 2026-10-18 23:12:40.581637
+
+"""
+from alembic import op
+
+revision = "4d7a2c9e5b16"
+down_revision = "8c2d6f4a1e93"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Index the refresh tokens by application, for the purge."""
+    op.create_index(
+        "ix_refresh_token_application_id_id",
+        "refresh_token",
+        ["application_id", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    """Drop the index of the refresh tokens by application."""
+    op.drop_index(
+        "ix_refresh_token_application_id_id", table_name="refresh_token"
+    )
@@ -0,0 +1,106 @@
+"""Product counter slots.
+
+Revision ID: 6a1e8d3b9c42
+Revises: 4d7a2c9e5b16
+Create Date: 2026-10-19 09:14:27.305816
+
+"""
+from alembic import op
+
+revision = "6a1e8d3b9c42"
+down_revision = "4d7a2c9e5b16"
+branch_labels = None
+depends_on = None
+
+# The changes of the counters are added to one of a fixed number of rows
+# (the slots), picked by the backend of the connection: the concurrent
+# writes rarely wait on each other's lock, and the table never has more
+# than `SLOTS` rows to sum, however many writes there were.
+SLOTS = 16
+
+SLOTS_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION product_counter_refresh() RETURNS trigger AS $$
+DECLARE
+    total_delta integer := 0;
+    taken_delta integer := 0;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT count(*), count(*) FILTER (WHERE taken)
+        INTO total_delta, taken_delta FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT -count(*), -count(*) FILTER (WHERE taken)
+        INTO total_delta, taken_delta FROM old_rows;
+    ELSIF TG_OP = 'UPDATE' THEN
+        taken_delta := (SELECT count(*) FROM new_rows WHERE taken)
+            - (SELECT count(*) FROM old_rows WHERE taken);
+    ELSE
+        DELETE FROM product_counter;
+        INSERT INTO product_counter (id, total, taken) VALUES (1, 0, 0);
+        RETURN NULL;
+    END IF;
+    IF total_delta <> 0 OR taken_delta <> 0 THEN
+        INSERT INTO product_counter (id, total, taken)
+        VALUES (1 + pg_backend_pid() % {SLOTS}, total_delta, taken_delta)
+        ON CONFLICT (id) DO UPDATE SET
+            total = product_counter.total + excluded.total,
+            taken = product_counter.taken + excluded.taken;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+DELTA_FUNCTION = """
+CREATE OR REPLACE FUNCTION product_counter_refresh() RETURNS trigger AS $$
+DECLARE
+    total_delta integer := 0;
+    taken_delta integer := 0;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT count(*), count(*) FILTER (WHERE taken)
+        INTO total_delta, taken_delta FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT -count(*), -count(*) FILTER (WHERE taken)
+        INTO total_delta, taken_delta FROM old_rows;
+    ELSIF TG_OP = 'UPDATE' THEN
+        taken_delta := (SELECT count(*) FROM new_rows WHERE taken)
+            - (SELECT count(*) FROM old_rows WHERE taken);
+    ELSE
+        DELETE FROM product_counter;
+        INSERT INTO product_counter (total, taken) VALUES (0, 0);
+        RETURN NULL;
+    END IF;
+    IF total_delta <> 0 OR taken_delta <> 0 THEN
+        INSERT INTO product_counter (total, taken)
+        VALUES (total_delta, taken_delta);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# The rows are replaced by their sum, in the first slot.
+COMPACT = (
+    "WITH deltas AS (DELETE FROM product_counter RETURNING total, taken) "
+    "INSERT INTO product_counter (id, total, taken) "
+    "SELECT 1, coalesce(sum(total), 0), coalesce(sum(taken), 0) "
+    "FROM deltas"
+)
+
+
+def upgrade():
+    """Add the changes of the product counters to a fixed set of rows."""
+    op.execute("LOCK TABLE product_counter IN EXCLUSIVE MODE")
+    op.execute(COMPACT)
+    op.execute(SLOTS_FUNCTION)
+
+
+def downgrade():
+    """Insert the changes of the product counters as new rows."""
+    op.execute("LOCK TABLE product_counter IN EXCLUSIVE MODE")
+    op.execute(COMPACT)
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('product_counter', 'id'), "
+        "(SELECT max(id) FROM product_counter))"
+    )
+    op.execute(DELTA_FUNCTION)
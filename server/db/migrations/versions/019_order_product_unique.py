@@ -0,0 +1,50 @@
+"""Order product unique.
+
+Revision ID: 2f9c7e4a1d58
+Revises: 6a1e8d3b9c42
+Create Date: 2026-10-19 10:02:51.774219
+
+"""
+from alembic import op
+
+revision = "2f9c7e4a1d58"
+down_revision = "6a1e8d3b9c42"
+branch_labels = None
+depends_on = None
+
+# A unique constraint on a partitioned table must include the partition key
+# (`requested_at`), so it can't keep a product to a single order. This
+# trigger does instead: the product is locked, so the orders of a product
+# are checked one at a time, across every partition (`ix_order_product_id`).
+UNIQUE_FUNCTION = """
+CREATE FUNCTION order_product_unique() RETURNS trigger AS $$
+BEGIN
+    PERFORM 1 FROM product WHERE id = NEW.product_id FOR UPDATE;
+    IF EXISTS (
+        SELECT 1 FROM "order"
+        WHERE product_id = NEW.product_id AND id <> NEW.id
+    ) THEN
+        RAISE EXCEPTION 'The product % already has an order.', NEW.product_id
+        USING ERRCODE = 'unique_violation',
+            CONSTRAINT = 'uq_order_product_id';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade():
+    """Allow a single order per product."""
+    op.execute(UNIQUE_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER order_product_unique BEFORE INSERT OR UPDATE OF "
+        'product_id ON "order" FOR EACH ROW '
+        "EXECUTE PROCEDURE order_product_unique()"
+    )
+
+
+def downgrade():
+    """Drop the trigger keeping a single order per product."""
+    op.execute('DROP TRIGGER order_product_unique ON "order"')
+    op.execute("DROP FUNCTION order_product_unique()")
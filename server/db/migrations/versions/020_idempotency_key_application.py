@@ -0,0 +1,62 @@
+"""Idempotency key application.
+
+Revision ID: 9e4b2d7c1f35
+Revises: 2f9c7e4a1d58
+Create Date: 2026-10-19 11:26:14.309852
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "9e4b2d7c1f35"
+down_revision = "2f9c7e4a1d58"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Scope the idempotency keys by the application that sent them.
+
+    The keys stored don't tell their application, so they are dropped: a
+    retry sent meanwhile is run again, as if its key had expired.
+    """
+    op.execute("DELETE FROM idempotency_key")
+    op.add_column(
+        "idempotency_key",
+        sa.Column("application_id", sa.Integer(), nullable=False),
+    )
+    op.create_foreign_key(
+        "idempotency_key_application_id_fkey",
+        "idempotency_key",
+        "application",
+        ["application_id"],
+        ["id"],
+    )
+    op.drop_constraint(
+        "idempotency_key_key_key", "idempotency_key", type_="unique"
+    )
+    op.create_unique_constraint(
+        "uq_idempotency_key_application_id_key",
+        "idempotency_key",
+        ["application_id", "key"],
+    )
+
+
+def downgrade():
+    """Make the idempotency keys global again, dropping the ones stored."""
+    op.execute("DELETE FROM idempotency_key")
+    op.drop_constraint(
+        "uq_idempotency_key_application_id_key",
+        "idempotency_key",
+        type_="unique",
+    )
+    op.create_unique_constraint(
+        "idempotency_key_key_key", "idempotency_key", ["key"]
+    )
+    op.drop_constraint(
+        "idempotency_key_application_id_fkey",
+        "idempotency_key",
+        type_="foreignkey",
+    )
+    op.drop_column("idempotency_key", "application_id")
@@ -0,0 +1,62 @@
+from logging import getLogger
+from typing import NoReturn
+
+from sqlalchemy import exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from server.db import SessionLocal
+from server.env import env
+
+logger = getLogger(__name__)
+
+# The `create_order_partitions` function comes with the `013` migration: it
+# creates the monthly partitions of the orders that don't exist yet, and
+# moves to them the orders that went to the default partition meanwhile.
+CREATE_PARTITIONS = text(
+    "SELECT create_order_partitions(now()::timestamp, "
+    "(now() + make_interval(months => :months))::timestamp)"
+)
+
+
+def create_order_partitions(db: Session, months: int) -> int:
+    """
+    Create the order partitions of the current and the upcoming months.
+
+    It's safe to call it from every worker at once, the function waits for
+    the others. While orders of the new month sit in the default partition,
+    attaching it takes an `ACCESS EXCLUSIVE` lock on the orders and scans
+    the default partition, so the partitions are better created ahead. It
+    can also be scheduled in the database, with the same query, for the
+    servers that are rarely restarted.
+
+    Args:
+        - db: the database session.
+        - months: the number of months created ahead.
+
+    Returns:
+        - the number of partitions created.
+    """
+    created = db.execute(CREATE_PARTITIONS, {"months": months}).scalar()
+    db.commit()
+    return created
+
+
+def prepare_partitions() -> NoReturn:
+    """
+    Create the upcoming order partitions, on startup.
+
+    A failure doesn't prevent the startup: the orders without a partition
+    still go to the default one, until the partition is created.
+    """
+    if make_url(env.DATABASE_URL).get_backend_name() != "postgresql":
+        return
+
+    db = SessionLocal()
+    try:
+        created = create_order_partitions(db, env.ORDER_PARTITIONS_AHEAD)
+        logger.info("Created %d order partitions.", created)
+    except exc.SQLAlchemyError as error:
+        logger.warning("Couldn't create the order partitions: %s", error)
+    finally:
+        db.close()
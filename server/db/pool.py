@@ -0,0 +1,89 @@
+from threading import Lock
+from time import perf_counter
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    """The counters collected by an instrumented pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.peak_overflow = 0
+        self._lock = Lock()
+
+    def record(self, wait_time: float, overflow: int, timeout: bool):
+        """
+        Record a connection checkout.
+
+        Args:
+            - wait_time: the seconds spent waiting for the connection.
+            - overflow: the pool overflow after the checkout.
+            - timeout: if the checkout failed by timeout.
+        """
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timeout
+            self.wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+
+class InstrumentedPool:
+    """
+    A mixin that collects statistics from a `QueuePool`.
+
+    It measures how long each checkout waits for a connection (including
+    the time to open a new one and the pre-ping) and counts the timeouts,
+    so we can size the pool and the workers from real data.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        """Checkout a connection, recording the time spent on it."""
+        started = perf_counter()
+        timeout = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timeout = True
+            raise
+        finally:
+            self.stats.record(
+                perf_counter() - started, self.overflow(), timeout
+            )
+
+    def recreate(self):
+        """Recreate the pool, keeping the statistics collected so far."""
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def statistics(self) -> Dict[str, Any]:
+        """Get the current pool state with the collected statistics."""
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "peak_overflow": self.stats.peak_overflow,
+            "checkouts": self.stats.checkouts,
+            "timeouts": self.stats.timeouts,
+            "wait_time": self.stats.wait_time,
+            "max_wait_time": self.stats.max_wait_time,
+        }
+
+
+class InstrumentedQueuePool(InstrumentedPool, QueuePool):
+    """The instrumented pool for the sync (psycopg2) engines."""
+
+
+class InstrumentedAsyncPool(InstrumentedPool, AsyncAdaptedQueuePool):
+    """The instrumented pool for the async (asyncpg) engines."""
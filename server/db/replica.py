@@ -0,0 +1,84 @@
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+# The seconds the replica is behind the primary. It's zero when everything
+# received was already replayed (an idle replica isn't stale) and `NULL`
+# when the database isn't a replica at all.
+LAG_QUERY = text(
+    "SELECT CASE "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) "
+    "END"
+)
+
+
+class ReplicaGuard:
+    """
+    Decide if the read replica is fresh enough to be used.
+
+    The replication lag is checked at most once per `interval`, by a
+    single caller, and the result is shared by all the sessions opened in
+    the meantime. A replica that is too far behind (or that can't be
+    reached) is avoided until the next check, the reads go to the primary.
+    """
+
+    def __init__(self, max_lag: float, interval: float):
+        """
+        Create a new guard.
+
+        Args:
+            - max_lag: the maximum lag (in seconds) tolerated.
+            - interval: the seconds between two lag checks.
+        """
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag: Optional[float] = None
+        self.fresh = True
+        self.fallbacks = 0
+        self._checked_at: Optional[float] = None
+        self._lock = Lock()
+
+    def should_check(self) -> bool:
+        """
+        Claim the next lag check, if it's due.
+
+        Returns:
+            - `True` for the single caller that must check the lag now.
+        """
+        with self._lock:
+            now = monotonic()
+            if self._checked_at and now - self._checked_at < self.interval:
+                return False
+            self._checked_at = now
+            return True
+
+    def update(self, lag: Optional[float], reachable: bool = True):
+        """
+        Record the result of a lag check.
+
+        Args:
+            - lag: the replication lag in seconds, `None` when the database
+            isn't replicating.
+            - reachable: if the replica answered the check.
+        """
+        self.lag = float(lag) if lag is not None else None
+        self.fresh = reachable and (self.lag or 0) <= self.max_lag
+
+    def use_replica(self) -> bool:
+        """Tell if the next session must use the replica."""
+        if not self.fresh:
+            with self._lock:
+                self.fallbacks += 1
+        return self.fresh
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the replica statistics."""
+        return {
+            "lag": self.lag,
+            "max_lag": self.max_lag,
+            "fresh": self.fresh,
+            "fallbacks": self.fallbacks,
+        }
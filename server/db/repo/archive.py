@@ -0,0 +1,125 @@
+from datetime import datetime
+from typing import List, NoReturn, Set
+
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.orm import Session, contains_eager
+
+from server.db import entities
+from server.models.responses import ARCHIVED, CHANNEL
+
+
+def get_archivable_orders(
+    db: Session, before: datetime, limit: int
+) -> List[entities.Order]:
+    """
+    Get the oldest orders requested before a datetime, with their products.
+
+    The orders are locked until the transaction ends (skipping the ones
+    locked by another archival), so they can be deleted once archived.
+
+    Args:
+        - db: the database session.
+        - before: only the orders requested before this datetime.
+        - limit: the maximum number of orders.
+
+    Returns:
+        - the orders, in the order they were requested.
+    """
+    return (
+        db.query(entities.Order)
+        .join(entities.Order.product)
+        .options(contains_eager(entities.Order.product))
+        .filter(entities.Order.requested_at < before)
+        .order_by(entities.Order.requested_at, entities.Order.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True, of=entities.Order)
+        .all()
+    )
+
+
+def get_archivable_products(
+    db: Session, before: datetime, limit: int
+) -> List[entities.Product]:
+    """
+    Get the oldest taken products, without any order, updated before a time.
+
+    The products taken with an order are archived with it, these are the
+    ones marked as taken by hand. They are locked just like the orders.
+
+    Args:
+        - db: the database session.
+        - before: only the products updated before this datetime.
+        - limit: the maximum number of products.
+
+    Returns:
+        - the products, in the order they were updated.
+    """
+    product = entities.Product
+    return (
+        db.query(product)
+        .filter(
+            product.taken.is_(True),
+            product.updated_at < before,
+            ~exists().where(entities.Order.product_id == product.id),
+        )
+        .order_by(product.updated_at, product.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+
+def delete_archived(
+    db: Session,
+    orders: List[entities.Order],
+    products: List[entities.Product],
+) -> Set[int]:
+    """
+    Delete the orders and the products archived, without committing.
+
+    A product still referenced by another order (not archived yet) is kept.
+
+    Args:
+        - db: the database session.
+        - orders: the orders archived.
+        - products: the products archived.
+
+    Returns:
+        - the ids of the products deleted.
+    """
+    if orders:
+        db.execute(
+            delete(entities.Order)
+            .where(entities.Order.id.in_([order.id for order in orders]))
+            .execution_options(synchronize_session=False)
+        )
+
+    if not products:
+        return set()
+
+    product = entities.Product
+    return set(
+        db.execute(
+            delete(product)
+            .where(
+                product.id.in_([p.id for p in products]),
+                ~exists().where(entities.Order.product_id == product.id),
+            )
+            .returning(product.id)
+            .execution_options(synchronize_session=False)
+        ).scalars()
+    )
+
+
+def notify_archived(db: Session) -> NoReturn:
+    """
+    Tell the workers to drop their cached orders, once the batch commits.
+
+    Only Postgres sends the notification, nothing is done with any other
+    database.
+
+    Args:
+        - db: the database session.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_notify(CHANNEL, ARCHIVED)))
@@ -0,0 +1,147 @@
+from datetime import timedelta
+from typing import NoReturn, Optional
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ScalarSelect
+
+from server.db import entities
+
+# The lock timeout of the transaction, so a duplicate only waits a while
+# for the request in progress with the same key, before trying again.
+LOCK_TIMEOUT = text("SELECT set_config('lock_timeout', :timeout, true)")
+
+# Once the key is claimed, the statements of the request wait for their
+# locks as usual.
+DEFAULT_LOCK_TIMEOUT = text("SET LOCAL lock_timeout TO DEFAULT")
+
+
+def application_id(uname: str) -> ScalarSelect:
+    """Get the id of the application with a username, as a subquery."""
+    app = entities.Application
+    return select(app.id).where(app.username == uname).scalar_subquery()
+
+
+def claim_key(
+    db: Session,
+    key: str,
+    uname: str,
+    request_hash: str,
+    ttl: int,
+    wait: float,
+) -> Optional[entities.IdempotencyKey]:
+    """
+    Claim an idempotency key, or get the response already stored for it.
+
+    The key is inserted (or taken over, once expired) without committing,
+    in the session of the request: it's committed with the changes of the
+    request, in the same transaction. The duplicates sent meanwhile wait on
+    its row until the transaction ends, then they find the key committed
+    (or claim the key themselves, when the transaction was rolled back).
+
+    Args:
+        - db: the database session of the request.
+        - key: the idempotency key sent by the client.
+        - uname: the username of the application that sent the key.
+        - request_hash: the fingerprint of the request.
+        - ttl: the number of seconds the response is kept.
+        - wait: the number of seconds a duplicate waits for the lock of the
+        request in progress.
+
+    Returns:
+        - `None` if the key was claimed, with the transaction still open,
+        or the key found, with the response of the first request.
+
+    Raises:
+        - OperationalError: if the lock wasn't released within the `wait`
+        (the transaction must be rolled back to try again).
+    """
+    db.execute(LOCK_TIMEOUT, {"timeout": f"{int(wait * 1000)}ms"})
+
+    key_entity = entities.IdempotencyKey
+    expires_at = func.now() + timedelta(seconds=ttl)
+    statement = insert(key_entity).values(
+        application_id=application_id(uname),
+        key=key,
+        request_hash=request_hash,
+        expires_at=expires_at,
+    )
+    claimed = db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[key_entity.application_id, key_entity.key],
+            set_={
+                "request_hash": statement.excluded.request_hash,
+                "status_code": None,
+                "body": None,
+                "created_at": func.now(),
+                "expires_at": statement.excluded.expires_at,
+            },
+            where=key_entity.expires_at < func.now(),
+        ).returning(key_entity.id)
+    ).scalar()
+
+    if claimed:
+        db.execute(DEFAULT_LOCK_TIMEOUT)
+        return None
+    return db.execute(
+        select(key_entity).where(
+            key_entity.application_id == application_id(uname),
+            key_entity.key == key,
+        )
+    ).scalar_one()
+
+
+def save_response(
+    db: Session,
+    key: str,
+    uname: str,
+    status_code: int,
+    body: bytes,
+    purge: int = 10,
+) -> NoReturn:
+    """
+    Store the response of the request that claimed a key, and commit.
+
+    A few of the expired keys are deleted on the way, so the table only
+    keeps the keys that can still be replayed.
+
+    Args:
+        - db: the database session of the request, with the key claimed.
+        - key: the idempotency key.
+        - uname: the username of the application that sent the key.
+        - status_code: the status code of the response.
+        - body: the body of the response.
+        - purge: the maximum number of expired keys deleted.
+    """
+    key_entity = entities.IdempotencyKey
+    db.query(key_entity).filter(
+        key_entity.application_id == application_id(uname),
+        key_entity.key == key,
+    ).update(
+        {"status_code": status_code, "body": body}, synchronize_session=False,
+    )
+
+    expired = (
+        select(key_entity.id)
+        .where(key_entity.expires_at < func.now())
+        .limit(purge)
+        .with_for_update(skip_locked=True)
+    )
+    db.execute(
+        delete(key_entity)
+        .where(key_entity.id.in_(expired.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def release_key(db: Session) -> NoReturn:
+    """
+    Release a key claimed, without storing any response.
+
+    The duplicates waiting for it claim the key themselves, so the request
+    is tried again. Unless the request committed its changes (then the key
+    was committed with them): the key is kept, without any response.
+    """
+    db.rollback()
@@ -1,9 +1,26 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, or_, select, tuple_
+from sqlalchemy.orm import Query, Session, contains_eager, joinedload
+from sqlalchemy.sql import Select
 
 from server.db import entities
+from server.db.repo import stats
+from server.db.repo.products import PRODUCT_COLUMNS
+from server.env import env
 from server.models import schemas
+from server.models.pagination import Position
+
+# The order columns exposed by the API (and the id, for the cursor).
+ORDER_COLUMNS = (
+    entities.Order.id,
+    entities.Order.uuid,
+    entities.Order.mod_id,
+    entities.Order.mod_display_name,
+    entities.Order.owner_display_name,
+    entities.Order.requested_at,
+)
 
 
 def get_orders(
@@ -13,6 +30,9 @@ def get_orders(
     moderator: str = None,
     owner: str = None,
     desc: bool = True,
+    cursor: Position = None,
+    since: datetime = None,
+    until: datetime = None,
 ) -> Optional[List[entities.Order]]:
     """
     Get the registed orders using filters.
@@ -24,31 +44,247 @@ def get_orders(
         - moderadtor: the moderator name that create the order.
         - owner: the owner name that receive the order.
         - desc: order by request_at datetime.
+        - cursor: the `(requested_at, id)` of the last order seen, only
+        the orders after it are returned (keyset pagination).
+        - since: only the orders requested at or after this datetime.
+        - until: only the orders requested before this datetime.
 
     Returns:
         - the list of orders or `None` if there are no orders to return
         using the filter specified.
     """
+    query = db.query(entities.Order)
+    return paginate_orders(
+        query, skip, limit, moderator, owner, desc, cursor, since, until
+    ).all()
+
+
+def get_orders_rows(
+    db: Session,
+    skip: int = 0,
+    limit: int = 50,
+    moderator: str = None,
+    owner: str = None,
+    desc: bool = True,
+    cursor: Position = None,
+    since: datetime = None,
+    until: datetime = None,
+) -> List[Dict[str, Any]]:
+    """
+    Get the registed orders using filters, as plain dicts.
+
+    The same as `get_orders`, but only the columns exposed by the API are
+    selected (with SQLAlchemy Core, joining the product) and no entity is
+    built. It's meant for the read only listings.
+
+    Args:
+        - db: the database session.
+        - skip: the number of filtered orders to skip.
+        - limit: the number of orders to limit the query.
+        - moderadtor: the moderator name that create the order.
+        - owner: the owner name that receive the order.
+        - desc: order by request_at datetime.
+        - cursor: the `(requested_at, id)` of the last order seen.
+        - since: only the orders requested at or after this datetime.
+        - until: only the orders requested before this datetime.
+
+    Returns:
+        - the list of orders, each one as a dict with the product nested.
+    """
+    statement = select(
+        *ORDER_COLUMNS,
+        *(column.label(f"product_{column.key}") for column in PRODUCT_COLUMNS),
+    ).join_from(entities.Order, entities.Product)
+    statement = paginate_orders(
+        statement, skip, limit, moderator, owner, desc, cursor, since, until
+    )
+
+    orders = []
+    for row in db.execute(statement).mappings():
+        order = {column.key: row[column.key] for column in ORDER_COLUMNS}
+        order["product"] = {
+            column.key: row[f"product_{column.key}"]
+            for column in PRODUCT_COLUMNS
+        }
+        orders.append(order)
+    return orders
+
+
+def paginate_orders(
+    query: Union[Query, Select],
+    skip: int,
+    limit: int,
+    moderator: Optional[str],
+    owner: Optional[str],
+    desc: bool,
+    cursor: Optional[Position],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Union[Query, Select]:
+    """
+    Apply the filters, the order and the page of the orders listing.
+
+    The period (`since` and `until`) limits the partitions of the orders
+    that are read, the others are pruned.
+    """
+    requested_at, id = entities.Order.requested_at, entities.Order.id
     order_by = (
-        entities.Order.requested_at.desc()
+        (requested_at.desc(), id.desc())
         if desc
-        else entities.Order.requested_at.asc()
+        else (requested_at.asc(), id.asc())
     )
 
-    query = db.query(entities.Order).order_by(order_by)
+    query = query.order_by(*order_by)
+
+    if cursor:
+        position = tuple_(requested_at, id)
+        query = query.filter(position < cursor if desc else position > cursor)
 
     if moderator:
-        query = query.filter_by(mod_display_name=moderator)
+        query = query.filter(entities.Order.mod_display_name == moderator)
 
     if owner:
-        query = query.filter_by(owner_display_name=owner)
+        query = query.filter(entities.Order.owner_display_name == owner)
+
+    if since:
+        query = query.filter(requested_at >= since)
 
-    return query.offset(skip).limit(limit).all()
+    if until:
+        query = query.filter(requested_at < until)
 
+    return query.offset(skip).limit(limit)
 
-def get_orders_count(db: Session) -> int:
-    """Return the number of entities from orders table."""
-    return db.query(entities.Order).count()
+
+def select_orders(
+    moderator: str = None,
+    owner: str = None,
+    since: datetime = None,
+    until: datetime = None,
+) -> Select:
+    """
+    Build the statement selecting the orders to be exported.
+
+    Args:
+        - moderator: the moderator name that create the order.
+        - owner: the owner name that receive the order.
+        - since: only the orders requested at or after this datetime.
+        - until: only the orders requested before this datetime.
+
+    Returns:
+        - the statement selecting the orders, with their products, in
+        the order they were requested.
+    """
+    requested_at = entities.Order.requested_at
+    statement = (
+        select(entities.Order)
+        .options(joinedload(entities.Order.product))
+        .order_by(requested_at, entities.Order.id)
+    )
+
+    if moderator:
+        statement = statement.filter_by(mod_display_name=moderator)
+
+    if owner:
+        statement = statement.filter_by(owner_display_name=owner)
+
+    if since:
+        statement = statement.filter(requested_at >= since)
+
+    if until:
+        statement = statement.filter(requested_at < until)
+
+    return statement
+
+
+# The participants of an order that can be searched.
+PARTICIPANTS = {
+    "owner": entities.Order.owner_display_name,
+    "moderator": entities.Order.mod_display_name,
+}
+
+
+def search_orders(
+    db: Session, query: str, limit: int = 20, participant: str = None
+) -> List[Tuple[entities.Order, float]]:
+    """
+    Search the orders by a partial display name, the best matches first.
+
+    An order matches when the display name of a participant is similar
+    enough to the query (see the `word_similarity` of `pg_trgm`), what's
+    answered by the trigram indexes of the display names.
+
+    Args:
+        - db: the database session.
+        - query: the display name searched, or part of it.
+        - limit: the maximum number of orders found.
+        - participant: one of the `PARTICIPANTS` or `None` to search both.
+
+    Returns:
+        - the orders found with their similarity (from 0 to 1), the most
+        recent first when they are as similar.
+    """
+    names = (
+        [PARTICIPANTS[participant]] if participant else PARTICIPANTS.values()
+    )
+    scores = [func.word_similarity(query, name) for name in names]
+    score = func.greatest(*scores) if len(scores) > 1 else scores[0]
+
+    return (
+        db.query(entities.Order, score.label("score"))
+        .options(joinedload(entities.Order.product))
+        .filter(or_(*(name.op("%>")(query) for name in names)))
+        .order_by(
+            score.desc(),
+            entities.Order.requested_at.desc(),
+            entities.Order.id.desc(),
+        )
+        .limit(limit)
+        .all()
+    )
+
+
+def get_orders_version(
+    db: Session,
+) -> Tuple[int, Optional[int], Optional[datetime]]:
+    """
+    Get the validator of the orders listing, with the counter.
+
+    The orders are never changed, but their products may be, so the last
+    product update is part of the validator.
+
+    Returns:
+        - a tuple with the number of orders, the highest id and the last
+        time an order (or its product) was registered or changed.
+    """
+    total, last_id, requested_at, updated_at = (
+        db.query(
+            func.count(),
+            func.max(entities.Order.id),
+            func.max(entities.Order.requested_at),
+            select(func.max(entities.Product.updated_at)).scalar_subquery(),
+        )
+        .select_from(entities.Order)
+        .one()
+    )
+    changes = [time for time in (requested_at, updated_at) if time]
+    return total, last_id, max(changes, default=None)
+
+
+def get_order_by_uuid(db: Session, uuid: str) -> Optional[entities.Order]:
+    """
+    Get an order by its unique ID.
+
+    The uuid doesn't tell the month of the order, so in Postgres every
+    partition is probed (an index scan on each `uq_uuid_order`).
+
+    Args:
+        - db: the database session.
+        - uuid: the order unique ID.
+
+    Returns:
+        - the order if it is found, otherwise `None` is returned.
+    """
+    return db.query(entities.Order).filter_by(uuid=uuid).first()
 
 
 def get_order_by_product_code(
@@ -69,6 +305,7 @@ def get_order_by_product_code(
         db.query(entities.Order)
         .join(entities.Product)
         .filter(entities.Product.code == code)
+        .options(contains_eager(entities.Order.product))
         .first()
     )
 
@@ -79,6 +316,13 @@ def create_order_for_product(
     """
     Create a new order and mark the product as taken.
 
+    The product must be locked (`FOR UPDATE`) and available: it's locked
+    before the statistics, in the same order as every order creation, so
+    two of them never wait on each other's locks.
+    The moderator and owner statistics are updated in the same transaction.
+    With `EAGER_DEFAULTS`, the order and the product are read back by the
+    flush (with `RETURNING`), they aren't refreshed after the commit.
+
     Args:
         - db: the database session.
         - product: the product to be used on order.
@@ -93,6 +337,41 @@ def create_order_for_product(
     db_order = entities.Order(**order.dict())
     db_order.product = product
     db.add(db_order)
+    stats.record_order(db=db, order=order)
     db.commit()
-    db.refresh(db_order)
+    if not env.EAGER_DEFAULTS:
+        db.refresh(db_order)
     return db_order
+
+
+def claim_product(
+    db: Session, order: schemas.OrderCreation
+) -> Optional[entities.Order]:
+    """
+    Create a new order for the oldest available product.
+
+    The product is locked with `FOR UPDATE SKIP LOCKED`, so concurrent
+    claims never wait for each other nor pick the same product: each one
+    takes the next product that isn't being claimed yet.
+
+    Args:
+        - db: the database session.
+        - order: the order schema.
+
+    Returns:
+        - the order created with product marked as taken or `None` if
+        there is no product available.
+    """
+    product = (
+        db.query(entities.Product)
+        .filter(entities.Product.taken.is_(False))
+        .order_by(entities.Product.created_at, entities.Product.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+
+    if not product:
+        return None
+
+    return create_order_for_product(db=db, product=product, order=order)
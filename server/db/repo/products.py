@@ -1,9 +1,33 @@
-from typing import List, NoReturn, Optional, Tuple
+from csv import QUOTE_ALL, writer
+from datetime import datetime
+from io import BytesIO, StringIO
+from typing import Any, Dict, List, NoReturn, Optional, Tuple, Union
+from uuid import uuid4
 
-from sqlalchemy.orm import Session
+from sqlalchemy import exc, func, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql import Select
 
 from server.db import entities
+from server.env import env
 from server.models import schemas
+from server.models.pagination import Position
+
+# The product columns exposed by the API (and the id, for the cursor).
+PRODUCT_COLUMNS = (
+    entities.Product.id,
+    entities.Product.code,
+    entities.Product.summary,
+    entities.Product.uuid,
+    entities.Product.taken,
+    entities.Product.created_at,
+    entities.Product.updated_at,
+)
+
+# Postgres accepts at most 32767 parameters in a statement (asyncpg sends
+# them as-is), so the multi-row inserts are split by the number of columns.
+MAX_PARAMETERS = 32767
 
 
 def get_products(
@@ -12,6 +36,7 @@ def get_products(
     limit: int = 50,
     taken: bool = False,
     desc: bool = True,
+    cursor: Position = None,
 ) -> Optional[List[entities.Product]]:
     """
     Get the registed products using filters.
@@ -22,54 +47,202 @@ def get_products(
         - limit: the number of entities to limit the query.
         - taken: filter by products that have already taken or not.
         - desc: order by descending consdering the `created_at` value.
+        - cursor: the `(created_at, id)` of the last product seen, only
+        the products after it are returned (keyset pagination).
 
     Returns:
         - the list of products or `None` if there are no products to
         return using the filter specified.
     """
-    created_order = (
-        entities.Product.created_at.desc()
+    query = db.query(entities.Product)
+    return paginate_products(query, skip, limit, taken, desc, cursor).all()
+
+
+def get_products_rows(
+    db: Session,
+    skip: int = 0,
+    limit: int = 50,
+    taken: bool = False,
+    desc: bool = True,
+    cursor: Position = None,
+) -> List[Dict[str, Any]]:
+    """
+    Get the registed products using filters, as plain dicts.
+
+    The same as `get_products`, but only the columns exposed by the API
+    are selected (with SQLAlchemy Core) and no entity is built. It's meant
+    for the read only listings, where the entities are never changed.
+
+    Args:
+        - db: the database session.
+        - skip: the number of filtered products to skip.
+        - limit: the number of products to limit the query.
+        - taken: filter by products that have already taken or not.
+        - desc: order by descending consdering the `created_at` value.
+        - cursor: the `(created_at, id)` of the last product seen.
+
+    Returns:
+        - the list of products, each one as a dict.
+    """
+    statement = select(*PRODUCT_COLUMNS)
+    statement = paginate_products(statement, skip, limit, taken, desc, cursor)
+    return [dict(row) for row in db.execute(statement).mappings()]
+
+
+def paginate_products(
+    query: Union[Query, Select],
+    skip: int,
+    limit: int,
+    taken: bool,
+    desc: bool,
+    cursor: Optional[Position],
+) -> Union[Query, Select]:
+    """Apply the filters, the order and the page of the products listing."""
+    created_at, id = entities.Product.created_at, entities.Product.id
+    order_by = (
+        (created_at.desc(), id.desc())
         if desc
-        else entities.Product.created_at.asc()
+        else (created_at.asc(), id.asc())
     )
 
-    return (
-        db.query(entities.Product)
-        .order_by(created_order, entities.Product.id.desc())
-        .filter_by(taken=taken)
-        .offset(skip)
-        .limit(limit)
-        .all()
+    query = query.order_by(*order_by).filter_by(taken=taken)
+
+    if cursor:
+        position = tuple_(created_at, id)
+        query = query.filter(position < cursor if desc else position > cursor)
+
+    return query.offset(skip).limit(limit)
+
+
+def select_products(
+    taken: bool = None, since: datetime = None, until: datetime = None,
+) -> Select:
+    """
+    Build the statement selecting the products to be exported.
+
+    Args:
+        - taken: filter by products that have already taken or not,
+        `None` selects both.
+        - since: only the products created at or after this datetime.
+        - until: only the products created before this datetime.
+
+    Returns:
+        - the statement selecting the products, in the order they were
+        created.
+    """
+    created_at = entities.Product.created_at
+    statement = select(entities.Product).order_by(
+        created_at, entities.Product.id
     )
 
+    if taken is not None:
+        statement = statement.filter_by(taken=taken)
+
+    if since:
+        statement = statement.filter(created_at >= since)
+
+    if until:
+        statement = statement.filter(created_at < until)
 
-def get_products_count(db: Session) -> Tuple[int, int, int]:
+    return statement
+
+
+def search_products(
+    db: Session, query: str, limit: int = 20, taken: bool = None
+) -> List[Tuple[entities.Product, float]]:
     """
-    Get the number of products registered.
+    Search the products by their summary, the best matches first.
+
+    A product matches when a part of its summary is similar enough to the
+    query (see the `word_similarity` of `pg_trgm`), what's answered by the
+    trigram index of the summary.
+
+    Args:
+        - db: the database session.
+        - query: the text searched, part of a title for example.
+        - limit: the maximum number of products found.
+        - taken: filter by products that have already taken or not.
 
     Returns:
-        - a tuple containg the number of products registed, the number of
-        products available for use and the number of products already taken.
+        - the products found with their similarity (from 0 to 1).
     """
+    summary = entities.Product.summary
+    score = func.word_similarity(query, summary)
+
+    search = db.query(entities.Product, score.label("score")).filter(
+        summary.op("%>")(query)
+    )
+    if taken is not None:
+        search = search.filter(entities.Product.taken.is_(taken))
+
     return (
-        db.query(entities.Product).count(),
-        db.query(entities.Product).filter_by(taken=False).count(),
-        db.query(entities.Product).filter_by(taken=True).count(),
+        search.order_by(score.desc(), entities.Product.id).limit(limit).all()
     )
 
 
-def get_product_by_uuid(db: Session, uuid: str) -> Optional[entities.Product]:
+def get_products_version(
+    db: Session,
+) -> Tuple[int, int, int, Optional[int], Optional[datetime]]:
+    """
+    Get the validator of the products listing, with the counters.
+
+    The listing only changes when a product is registered, updated or
+    deleted, so the counters, the last id and the last update time
+    identify its content. They are read in a single query, summed from
+    the `product_counter` table and the indexes when `PRODUCT_COUNTER` is
+    enabled.
+
+    Returns:
+        - a tuple with the number of products registered, available and
+        taken, then the highest id and the last update time.
+    """
+    id, updated_at = entities.Product.id, entities.Product.updated_at
+    last_id = select(func.max(id)).scalar_subquery()
+    last_modified = select(func.max(updated_at)).scalar_subquery()
+
+    if env.PRODUCT_COUNTER:
+        counter = entities.ProductCounter
+        total, taken, *validator = db.query(
+            func.sum(counter.total),
+            func.sum(counter.taken),
+            last_id,
+            last_modified,
+        ).one()
+        if total is not None:
+            return (total, total - taken, taken, *validator)
+
+    taken = entities.Product.taken
+    return tuple(
+        db.query(
+            func.count(),
+            func.count().filter(taken.is_(False)),
+            func.count().filter(taken.is_(True)),
+            func.max(id),
+            func.max(updated_at),
+        )
+        .select_from(entities.Product)
+        .one()
+    )
+
+
+def get_product_by_uuid(
+    db: Session, uuid: str, for_update: bool = False
+) -> Optional[entities.Product]:
     """
     Get a specific product by the code.
 
     Args:
         - db: the database session.
         - uuid: the product unique ID to be used in query.
+        - for_update: lock the product (`FOR UPDATE`) until the commit.
 
     Returns:
         - the product object if it is found, otherwise `None` is returned.
     """
-    return db.query(entities.Product).filter_by(uuid=uuid).first()
+    query = db.query(entities.Product).filter_by(uuid=uuid)
+    if for_update:
+        query = query.with_for_update()
+    return query.first()
 
 
 def get_product_by_code(db: Session, code: str) -> Optional[entities.Product]:
@@ -88,45 +261,76 @@ def get_product_by_code(db: Session, code: str) -> Optional[entities.Product]:
 
 def create_product(
     db: Session, product: schemas.ProductCreation
-) -> entities.Product:
+) -> Optional[Dict[str, Any]]:
     """
-    Persit a new product.
+    Persit a new product, unless its code is already in use.
+
+    The product is inserted and read back by a single statement (`INSERT
+    ... ON CONFLICT DO NOTHING RETURNING`), so the code is checked by the
+    unique index, even between concurrent requests.
 
     Args:
         - db: the database session.
         - product: the product schema.
 
     Returns:
-        - the product object with generated values.
+        - the product created, as a dict with the generated values, or
+        `None` if the code is already in use by another product.
     """
-    db_product = entities.Product(**product.dict())
-    db.add(db_product)
+    statement = (
+        insert(entities.Product)
+        .values(**product.dict())
+        .on_conflict_do_nothing(index_elements=[entities.Product.code])
+        .returning(*PRODUCT_COLUMNS)
+    )
+    created = db.execute(statement).mappings().first()
     db.commit()
-    db.refresh(db_product)
-    return db_product
+    return dict(created) if created else None
 
 
 def update_product(
-    db: Session, product: schemas.ProductUpdate, db_product: entities.Product
-) -> entities.Product:
+    db: Session, uuid: str, product: schemas.ProductUpdate
+) -> Optional[Dict[str, Any]]:
     """
-    Update an existing product.
+    Update an existing product, unless it's already taken.
+
+    The product is updated and read back by a single statement (`UPDATE
+    ... WHERE ... RETURNING`). A product not taken has no order, so there
+    is no cached order to drop.
 
     Args:
         - db: the database session.
+        - uuid: the unique ID of the product.
         - product: the product schema.
-        - db_product: the product to be updated with `product` schema.
 
     Returns:
-        - the updated product.
-    """
-    db_product.code = product.code
+        - the updated product, as a dict, or `None` if there is no product
+        with the uuid or it's already taken.
 
+    Raises:
+        - IntegrityError: if the code is already in use by another
+        product (the transaction is rolled back).
+    """
+    values = {"code": product.code}
     if product.summary:
-        db_product.summary = product.summary
+        values["summary"] = product.summary
 
-    db.commit()
-    return db_product
+    statement = (
+        update(entities.Product)
+        .where(
+            entities.Product.uuid == uuid, entities.Product.taken.is_(False)
+        )
+        .values(**values)
+        .returning(*PRODUCT_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        updated = db.execute(statement).mappings().first()
+        db.commit()
+    except exc.IntegrityError:
+        db.rollback()
+        raise
+    return dict(updated) if updated else None
 
 
 def delete_product(db: Session, product: entities.Product) -> NoReturn:
@@ -139,3 +343,84 @@ def delete_product(db: Session, product: entities.Product) -> NoReturn:
     """
     db.delete(product)
     db.commit()
+
+
+def import_products(db: Session, products: List[schemas.ProductImport]) -> int:
+    """
+    Insert a batch of products, ignoring the codes already registered.
+
+    The products are copied (`COPY`) to a temporary table and inserted
+    from there when the connection uses psycopg2, otherwise they are
+    inserted with multi-row `INSERT`s, as few as the parameters limit of
+    Postgres allows (see `MAX_PARAMETERS`). In both cases, the products
+    with codes already in use are skipped by `ON CONFLICT DO NOTHING`.
+    The transaction is not committed, so a whole upload can be inserted
+    in a single transaction.
+
+    Args:
+        - db: the database session.
+        - products: the products to be inserted, with unique codes.
+
+    Returns:
+        - the number of products inserted.
+    """
+    connection = db.connection()
+
+    if connection.dialect.driver == "psycopg2":
+        return copy_products(db, products)
+
+    rows = [product.dict() for product in products]
+    size = MAX_PARAMETERS // len(entities.Product.__table__.columns)
+    inserted = 0
+
+    while rows:
+        batch, rows = rows[:size], rows[size:]
+        statement = (
+            insert(entities.Product)
+            .values(batch)
+            .on_conflict_do_nothing(index_elements=[entities.Product.code])
+        )
+        inserted += db.execute(statement).rowcount
+
+    return inserted
+
+
+def copy_products(db: Session, products: List[schemas.ProductImport]) -> int:
+    """
+    Insert a batch of products through `COPY`.
+
+    Args:
+        - db: the database session, connected with psycopg2.
+        - products: the products to be inserted, with unique codes.
+
+    Returns:
+        - the number of products inserted.
+    """
+    db.execute(
+        text(
+            "CREATE TEMPORARY TABLE IF NOT EXISTS product_import "
+            "(uuid uuid, code varchar, summary varchar) ON COMMIT DROP"
+        )
+    )
+
+    rows = StringIO()
+    writer(rows, quoting=QUOTE_ALL).writerows(
+        (uuid4(), product.code, product.summary) for product in products
+    )
+
+    with db.connection().connection.cursor() as cursor:
+        cursor.copy_expert(
+            "COPY product_import (uuid, code, summary) "
+            "FROM STDIN (FORMAT csv, ENCODING 'UTF8')",
+            BytesIO(rows.getvalue().encode("utf-8")),
+        )
+
+    inserted = db.execute(
+        text(
+            "INSERT INTO product (uuid, code, summary, taken) "
+            "SELECT uuid, code, summary, false FROM product_import "
+            "ON CONFLICT (code) DO NOTHING"
+        )
+    ).rowcount
+    db.execute(text("TRUNCATE product_import"))
+    return inserted
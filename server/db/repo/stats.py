@@ -0,0 +1,103 @@
+from typing import List, NoReturn
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from server.db import entities
+from server.models import schemas
+
+
+def record_order(db: Session, order: schemas.OrderCreation) -> NoReturn:
+    """
+    Count a new order in the moderator and owner statistics.
+
+    The statistics are upserted in the transaction of the order, so they
+    are committed (or rolled back) with it. The last order time is the
+    `now()` of the transaction, the same the order is requested at.
+
+    Args:
+        - db: the database session, with the order not committed yet.
+        - order: the order schema.
+    """
+    moderator = insert(entities.ModeratorStats).values(
+        mod_id=order.mod_id,
+        mod_display_name=order.mod_display_name,
+        orders=1,
+        last_order_at=func.now(),
+    )
+    db.execute(
+        moderator.on_conflict_do_update(
+            index_elements=[entities.ModeratorStats.mod_id],
+            set_={
+                "mod_display_name": moderator.excluded.mod_display_name,
+                "orders": entities.ModeratorStats.orders + 1,
+                "last_order_at": func.greatest(
+                    entities.ModeratorStats.last_order_at,
+                    moderator.excluded.last_order_at,
+                ),
+            },
+        )
+    )
+
+    owner = insert(entities.OwnerStats).values(
+        owner_display_name=order.owner_display_name,
+        orders=1,
+        last_order_at=func.now(),
+    )
+    db.execute(
+        owner.on_conflict_do_update(
+            index_elements=[entities.OwnerStats.owner_display_name],
+            set_={
+                "orders": entities.OwnerStats.orders + 1,
+                "last_order_at": func.greatest(
+                    entities.OwnerStats.last_order_at,
+                    owner.excluded.last_order_at,
+                ),
+            },
+        )
+    )
+
+
+def get_top_moderators(
+    db: Session, limit: int = 10
+) -> List[entities.ModeratorStats]:
+    """
+    Get the moderators that created the most orders.
+
+    Args:
+        - db: the database session.
+        - limit: the size of the leaderboard.
+
+    Returns:
+        - the moderator statistics, the most orders (and then the latest
+        order) first.
+    """
+    stats = entities.ModeratorStats
+    return (
+        db.query(stats)
+        .order_by(stats.orders.desc(), stats.last_order_at.desc(), stats.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def get_top_owners(db: Session, limit: int = 10) -> List[entities.OwnerStats]:
+    """
+    Get the owners (the viewers) that received the most orders.
+
+    Args:
+        - db: the database session.
+        - limit: the size of the leaderboard.
+
+    Returns:
+        - the owner statistics, the most orders (and then the latest order)
+        first.
+    """
+    stats = entities.OwnerStats
+    return (
+        db.query(stats)
+        .order_by(stats.orders.desc(), stats.last_order_at.desc(), stats.id)
+        .limit(limit)
+        .all()
+    )
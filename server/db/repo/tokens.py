@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from server.db import entities
+from server.env import env
+from server.models.security import generate_token, hash_token
+
+
+def create_refresh_token(db: Session, app: entities.Application) -> str:
+    """
+    Issue a new refresh token for an application.
+
+    The expired and revoked tokens of the application are purged first, and
+    so are the oldest ones beyond `REFRESH_TOKEN_LIMIT` (with the new one).
+
+    Args:
+        - db: the database session.
+        - app: the application that owns the token.
+
+    Returns:
+        - the plain refresh token, it's the only time it is available.
+    """
+    purge_refresh_tokens(db=db, app=app)
+    token = generate_token()
+    db.add(
+        entities.RefreshToken(
+            token_hash=hash_token(token),
+            application=app,
+            expires_at=datetime.utcnow()
+            + timedelta(days=env.REFRESH_TOKEN_EXPIRATION),
+        )
+    )
+    db.commit()
+    return token
+
+
+def purge_refresh_tokens(db: Session, app: entities.Application) -> int:
+    """
+    Delete the tokens of an application that are useless or in excess.
+
+    Args:
+        - db: the database session.
+        - app: the application that owns the tokens.
+
+    Returns:
+        - the number of tokens deleted.
+    """
+    tokens = db.query(entities.RefreshToken).filter(
+        entities.RefreshToken.application_id == app.id
+    )
+    kept = (
+        tokens.filter(
+            entities.RefreshToken.revoked.is_(False),
+            entities.RefreshToken.expires_at > datetime.utcnow(),
+        )
+        .order_by(entities.RefreshToken.id.desc())
+        .limit(max(env.REFRESH_TOKEN_LIMIT - 1, 0))
+        .with_entities(entities.RefreshToken.id)
+    )
+    return tokens.filter(
+        entities.RefreshToken.id.notin_(kept.scalar_subquery())
+    ).delete(synchronize_session=False)
+
+
+def get_app_by_refresh_token(
+    db: Session, token: str
+) -> Optional[entities.Application]:
+    """
+    Get the application that owns a valid refresh token.
+
+    Args:
+        - db: the database session.
+        - token: the plain refresh token.
+
+    Returns:
+        - None if the token is unknown, revoked or expired, otherwise the
+        application object is returned.
+    """
+    return (
+        db.query(entities.Application)
+        .join(entities.RefreshToken)
+        .filter(
+            entities.RefreshToken.token_hash == hash_token(token),
+            entities.RefreshToken.revoked.is_(False),
+            entities.RefreshToken.expires_at > datetime.utcnow(),
+        )
+        .first()
+    )
+
+
+def revoke_refresh_token(db: Session, token: str, uname: str) -> bool:
+    """
+    Revoke a refresh token of an application.
+
+    Only the application that owns the token can revoke it (RFC 7009), the
+    tokens of the others are left as they are.
+
+    Args:
+        - db: the database session.
+        - token: the plain refresh token.
+        - uname: the username of the application revoking the token.
+
+    Returns:
+        - `True` if the token was revoked, `False` if it was not found.
+    """
+    revoked = (
+        db.query(entities.RefreshToken)
+        .filter_by(token_hash=hash_token(token), revoked=False)
+        .filter(entities.RefreshToken.application.has(username=uname))
+        .update({"revoked": True}, synchronize_session=False)
+    )
+    db.commit()
+    return bool(revoked)
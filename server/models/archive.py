@@ -0,0 +1,126 @@
+from datetime import datetime, timezone
+from gzip import GzipFile
+from gzip import open as open_gzip
+from os import fsync, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from uuid import uuid4
+
+import orjson
+from pydantic import BaseModel
+
+from server.models import schemas
+from server.models.serialization import dump
+
+# The schema of the records of every kind of archive, and the datetime
+# field that orders them.
+archives: Dict[str, Tuple[Type[BaseModel], str]] = {
+    "orders": (schemas.Order, "requested_at"),
+    "products": (schemas.Product, "updated_at"),
+}
+
+# The format of the datetimes in the file names, that sorts the files.
+STAMP = "%Y%m%dT%H%M%S%f"
+
+
+def write_archive(directory: Path, kind: str, entities: List[Any]) -> Path:
+    """
+    Write the entities to a new compressed NDJSON file.
+
+    The file is named after the kind and the period of its records, like
+    `orders-<first>-<last>-<suffix>.ndjson.gz`, so the reads only open the
+    files of the period asked. It's written under a temporary name and
+    synced to the disk before it's renamed: a file with the final name is
+    always complete.
+
+    Args:
+        - directory: the archive directory, created if it doesn't exist.
+        - kind: the kind of the entities, one of the `archives` keys.
+        - entities: the entities archived, at least one.
+
+    Returns:
+        - the path of the file written.
+    """
+    schema, field = archives[kind]
+    stamps = [getattr(entity, field) for entity in entities]
+    name = (
+        f"{kind}-{min(stamps):{STAMP}}-{max(stamps):{STAMP}}-"
+        f"{uuid4().hex[:8]}.ndjson.gz"
+    )
+
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / name
+    temporary = directory / f".{name}.tmp"
+    with open(temporary, "wb") as file:
+        with GzipFile(fileobj=file, mode="wb") as compressed:
+            for entity in entities:
+                compressed.write(orjson.dumps(dump(entity, schema)) + b"\n")
+        file.flush()
+        fsync(file.fileno())
+    replace(temporary, path)
+    return path
+
+
+def read_archive(
+    directory: Path,
+    kind: str,
+    match: Callable[[Dict[str, Any]], bool] = lambda record: True,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """
+    Read the archived records of a kind, the oldest first.
+
+    The files out of the period are skipped without being opened (the
+    datetimes are stored in UTC, without the timezone). The same record
+    may be archived twice (when the deletion failed after the file was
+    written), only its first copy is returned.
+
+    Args:
+        - directory: the archive directory.
+        - kind: the kind of the records, one of the `archives` keys.
+        - match: the filter of the records.
+        - since: only the records at or after this datetime.
+        - until: only the records before this datetime.
+        - limit: the maximum number of records.
+
+    Returns:
+        - the records, as they were written.
+    """
+    _, field = archives[kind]
+    since, until = (
+        value.astimezone(timezone.utc).replace(tzinfo=None)
+        if value and value.tzinfo
+        else value
+        for value in (since, until)
+    )
+    records: List[Dict[str, Any]] = []
+    seen = set()
+
+    for path in sorted(directory.glob(f"{kind}-*.ndjson.gz")):
+        first, last = (
+            datetime.strptime(stamp, STAMP)
+            for stamp in path.name.split("-")[1:3]
+        )
+        if (since and last < since) or (until and first >= until):
+            continue
+
+        with open_gzip(path, "rb") as file:
+            for line in file:
+                record = orjson.loads(line)
+                stamp = datetime.fromisoformat(record[field])
+                if (
+                    (since and stamp < since)
+                    or (until and stamp >= until)
+                    or record["uuid"] in seen
+                    or not match(record)
+                ):
+                    continue
+
+                seen.add(record["uuid"])
+                records.append(record)
+                if len(records) >= limit:
+                    return records
+
+    return records
@@ -0,0 +1,246 @@
+from codecs import getincrementaldecoder
+from collections import deque
+from csv import Error as CsvError
+from csv import reader
+from json import JSONDecodeError, JSONDecoder, loads
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from server.models import schemas
+
+Chunks = AsyncIterator[bytes]
+
+decoder = JSONDecoder()
+
+
+class MalformedBody(ValueError):
+    """Raised when the upload isn't valid in its format (JSON, CSV...)."""
+
+
+# The punctuation accepted while reading a JSON array, in each state, and
+# the state it leads to. The items are only accepted after "[" and ",".
+ARRAY_STATES = {
+    "start": {"[": "open"},
+    "open": {"]": "end"},
+    "item": {",": "comma", "]": "end"},
+    "comma": {},
+    "end": {},
+}
+ITEM_STATES = {"open", "comma"}
+ARRAY_ERROR = "The JSON array is incomplete or malformed."
+ARRAY_ERRORS = {
+    "start": "The body must be a JSON array.",
+    "item": "The JSON array items must be separated by commas.",
+    "end": "Unexpected content after the JSON array.",
+}
+
+
+async def read_text(chunks: Chunks) -> AsyncIterator[str]:
+    """
+    Decode the uploaded chunks as UTF-8.
+
+    A character may be split between two chunks, so the decoding is
+    incremental.
+
+    Args:
+        - chunks: the request body chunks.
+
+    Returns:
+        - an iterator with the decoded text.
+    """
+    utf8 = getincrementaldecoder("utf-8")()
+    async for chunk in chunks:
+        yield utf8.decode(chunk)
+    yield utf8.decode(b"", final=True)
+
+
+async def read_lines(chunks: Chunks) -> AsyncIterator[str]:
+    """
+    Split the uploaded chunks in lines, as soon as they are received.
+
+    Args:
+        - chunks: the request body chunks.
+
+    Returns:
+        - an iterator with the lines (without the line break).
+    """
+    pending = ""
+    async for text in read_text(chunks):
+        pending += text
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def read_json(chunks: Chunks) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Read the items of a JSON array, as soon as they are received.
+
+    The whole array is never kept in memory, only the item being received.
+
+    Args:
+        - chunks: the request body chunks.
+
+    Returns:
+        - an iterator with the array items.
+
+    Raises:
+        - MalformedBody: if the body isn't a JSON array.
+    """
+    pending, state = "", "start"
+
+    async for text in read_text(chunks):
+        pending += text
+
+        while pending := pending.lstrip():
+            if after := ARRAY_STATES[state].get(pending[0]):
+                pending, state = pending[1:], after
+                continue
+
+            if state not in ITEM_STATES or pending[0] in ",]":
+                raise MalformedBody(ARRAY_ERRORS.get(state, ARRAY_ERROR))
+
+            try:
+                item, end = decoder.raw_decode(pending)
+            except JSONDecodeError:
+                break  # the item is incomplete, wait for the next chunk.
+
+            pending, state = pending[end:], "item"
+            yield item
+
+    if pending or state != "end":
+        raise MalformedBody(ARRAY_ERROR)
+
+
+async def read_ndjson(chunks: Chunks) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Read the objects of a newline delimited JSON, one per line.
+
+    Args:
+        - chunks: the request body chunks.
+
+    Returns:
+        - an iterator with the objects.
+
+    Raises:
+        - MalformedBody: if a line isn't a valid JSON.
+    """
+    number = 0
+    async for line in read_lines(chunks):
+        number += 1
+        if line.strip():
+            try:
+                yield loads(line)
+            except JSONDecodeError:
+                raise MalformedBody(f"Invalid JSON on line {number}.")
+
+
+async def read_rows(chunks: Chunks) -> AsyncIterator[List[str]]:
+    """
+    Read the rows of a CSV, as soon as they are received.
+
+    The whole upload is parsed by a single CSV reader, given the lines as
+    they are received: once their quotes are balanced, so a quoted field
+    may span many lines.
+
+    Args:
+        - chunks: the request body chunks.
+
+    Returns:
+        - an iterator with the rows, as lists of fields.
+
+    Raises:
+        - MalformedBody: if the CSV is malformed, e.g. a quote isn't closed.
+    """
+    lines: Deque[str] = deque()
+    rows = reader(
+        iter(lambda: lines.popleft() if lines else None, None), strict=True
+    )
+    quotes = 0
+    try:
+        async for line in read_lines(chunks):
+            lines.append(line + "\n")
+            quotes += line.count('"')
+            while lines and quotes % 2 == 0:
+                yield next(rows)
+
+        while lines:
+            yield next(rows)
+    except CsvError:
+        raise MalformedBody(f"Invalid CSV on line {rows.line_num}.")
+
+
+async def read_csv(chunks: Chunks) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Read the rows of a CSV, the first row is the header.
+
+    Args:
+        - chunks: the request body chunks.
+
+    Returns:
+        - an iterator with the rows, mapped by the header columns.
+
+    Raises:
+        - MalformedBody: if the CSV is malformed.
+        - ValueError: if there is no `code` column in the header.
+    """
+    header: Optional[List[str]] = None
+    async for row in read_rows(chunks):
+        if not any(field.strip() for field in row):
+            continue
+
+        if header is None:
+            header = row
+            if "code" not in header:
+                raise ValueError("The CSV header must have a code column.")
+            continue
+
+        yield dict(zip(header, row))
+
+
+readers: Dict[str, Callable[[Chunks], AsyncIterator[Dict[str, Any]]]] = {
+    "application/json": read_json,
+    "application/x-ndjson": read_ndjson,
+    "text/csv": read_csv,
+}
+
+
+async def read_products(
+    chunks: Chunks, media_type: str, size: int
+) -> AsyncIterator[List[schemas.ProductImport]]:
+    """
+    Read the products uploaded in batches.
+
+    Args:
+        - chunks: the request body chunks.
+        - media_type: the upload format, one of the `readers` keys.
+        - size: the maximum number of products in a batch.
+
+    Returns:
+        - an iterator with the batches of products.
+
+    Raises:
+        - ValueError: if the upload or one of the products are invalid.
+    """
+    batch = []
+    number = 0
+    async for item in readers[media_type](chunks):
+        number += 1
+        try:
+            batch.append(schemas.ProductImport.parse_obj(item))
+        except ValidationError as error:
+            fields = ", ".join(
+                ".".join(map(str, e["loc"])) for e in error.errors()
+            )
+            raise ValueError(f"Invalid product #{number}: {fields}.")
+
+        if len(batch) >= size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from threading import Lock
+from time import time
+from typing import Any, Callable, Dict, Hashable, NoReturn, Optional
+
+
+class TTLCache:
+    """
+    A thread safe LRU cache where every entry has its own expiration.
+
+    Entries are evicted when they expire or when the cache is full, in this
+    case the least recently used entry is removed. The cache also keeps the
+    number of hits and misses, so we can verify how effective it is.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        Create a new cache.
+
+        Args:
+            - maxsize: the maximum number of entries to keep.
+            - ttl: the default time to live (in seconds) for the entries,
+            `None` means that the entries never expires by default.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get the value for a key.
+
+        Args:
+            - key: the entry key.
+
+        Returns:
+            - the cached value or `None` if there is no valid entry for
+            the key specified.
+        """
+        with self._lock:
+            if entry := self._entries.get(key):
+                value, expires_at = entry
+                if expires_at is None or expires_at > time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def set(
+        self, key: Hashable, value: Any, expires_at: Optional[float] = None
+    ) -> NoReturn:
+        """
+        Store a value in the cache.
+
+        Args:
+            - key: the entry key.
+            - value: the value to be cached.
+            - expires_at: the timestamp when the entry expires. The entry
+            expires at the earliest between this value and the default ttl.
+        """
+        if self.ttl is not None:
+            default = time() + self.ttl
+            expires_at = min(expires_at or default, default)
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, predicate: Callable[[Any], bool]) -> int:
+        """
+        Remove the entries with values that match the predicate.
+
+        Args:
+            - predicate: a function that receives the cached value and
+            returns `True` if the entry must be removed.
+
+        Returns:
+            - the number of entries removed.
+        """
+        with self._lock:
+            keys = [k for k, (v, _) in self._entries.items() if predicate(v)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self) -> NoReturn:
+        """Remove all the entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from hashlib import sha1
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from fastapi import Request, Response, status
+
+
+def validators(
+    request: Request,
+    version: Tuple[Any, ...],
+    last_modified: Optional[datetime],
+) -> Dict[str, str]:
+    """
+    Get the validator headers of a listing.
+
+    The `ETag` identifies the version of the data and the query parameters
+    (the filters and the page), so each combination has its own tag.
+
+    Args:
+        - request: the listing request.
+        - version: the values that change whenever the listing changes.
+        - last_modified: the last time the listing changed, in UTC.
+
+    Returns:
+        - the `ETag`, `Last-Modified` and `Cache-Control` headers.
+    """
+    identity = (
+        request.url.path,
+        sorted(request.query_params.multi_items()),
+        version,
+    )
+    headers = {
+        "ETag": f'W/"{sha1(repr(identity).encode()).hexdigest()}"',
+        "Cache-Control": "no-cache",
+    }
+
+    if last_modified:
+        if not last_modified.tzinfo:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    return headers
+
+
+def is_not_modified(request: Request, headers: Mapping[str, str]) -> bool:
+    """
+    Tell if the client already has the current version of the listing.
+
+    Only the `If-None-Match` header is compared: `If-Modified-Since` is
+    ignored, since the `Last-Modified` has a resolution of one second (a
+    change within the same second as the previous response would be
+    missed) and the deletions don't change it. The `ETag` includes the
+    counters and the last id, so it changes with every write.
+
+    Args:
+        - request: the listing request.
+        - headers: the validators of the current version.
+
+    Returns:
+        - `True` if the response can be a `304 Not Modified`.
+    """
+    if (if_none_match := request.headers.get("if-none-match")) is None:
+        return False
+
+    etag = headers["ETag"][2:]  # weak comparison, without the "W/".
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in tags or any(
+        tag[2:] == etag if tag.startswith("W/") else tag == etag
+        for tag in tags
+    )
+
+
+def not_modified(headers: Mapping[str, str]) -> Response:
+    """Get the `304 Not Modified` response, with the validators."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
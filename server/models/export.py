@@ -0,0 +1,125 @@
+from csv import writer
+from datetime import datetime
+from io import StringIO
+from typing import Any, AsyncIterator, Dict, List, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+Partitions = AsyncIterator[List[Any]]
+
+media_types = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def columns(schema: Type[BaseModel], prefix: str = "") -> List[str]:
+    """
+    Get the CSV columns for a schema.
+
+    The fields of nested schemas are flattened, as `product.code`.
+
+    Args:
+        - schema: the schema exported.
+        - prefix: the prefix of the nested schema fields.
+
+    Returns:
+        - the list of column names.
+    """
+    names = []
+    for name, field in schema.__fields__.items():
+        if isinstance(field.type_, type) and issubclass(
+            field.type_, BaseModel
+        ):
+            names.extend(columns(field.type_, f"{prefix}{name}."))
+        else:
+            names.append(f"{prefix}{name}")
+    return names
+
+
+def flatten(values: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Flatten the nested values, just like the `columns`."""
+    flat = {}
+    for name, value in values.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{name}."))
+        elif isinstance(value, datetime):
+            flat[f"{prefix}{name}"] = value.isoformat()
+        else:
+            flat[f"{prefix}{name}"] = value
+    return flat
+
+
+async def render_csv(
+    partitions: Partitions, schema: Type[BaseModel]
+) -> AsyncIterator[str]:
+    """
+    Render the entities as CSV, with a header.
+
+    Args:
+        - partitions: the lists of entities to be rendered.
+        - schema: the schema used to export the entities.
+
+    Returns:
+        - an iterator with the CSV text, a chunk per list of entities.
+    """
+    header = columns(schema)
+
+    chunk = StringIO()
+    writer(chunk).writerow(header)
+    yield chunk.getvalue()
+
+    async for partition in partitions:
+        chunk = StringIO()
+        writer(chunk).writerows(
+            [
+                flatten(schema.from_orm(entity).dict()).get(column)
+                for column in header
+            ]
+            for entity in partition
+        )
+        yield chunk.getvalue()
+
+
+async def render_ndjson(
+    partitions: Partitions, schema: Type[BaseModel]
+) -> AsyncIterator[str]:
+    """
+    Render the entities as newline delimited JSON.
+
+    Args:
+        - partitions: the lists of entities to be rendered.
+        - schema: the schema used to export the entities.
+
+    Returns:
+        - an iterator with the JSON lines, a chunk per list of entities.
+    """
+    async for partition in partitions:
+        yield "".join(
+            f"{schema.from_orm(entity).json()}\n" for entity in partition
+        )
+
+
+renderers = {"csv": render_csv, "ndjson": render_ndjson}
+
+
+def export_response(
+    partitions: Partitions, schema: Type[BaseModel], format: str, name: str
+) -> StreamingResponse:
+    """
+    Stream the entities exported as a file.
+
+    Args:
+        - partitions: the lists of entities to be exported.
+        - schema: the schema used to export the entities.
+        - format: the file format, one of the `renderers` keys.
+        - name: the file name, without the extension.
+
+    Returns:
+        - the response streaming the file while the entities are fetched.
+    """
+    return StreamingResponse(
+        renderers[format](partitions, schema),
+        media_type=media_types[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{format}"'
+        },
+    )
@@ -0,0 +1,201 @@
+from asyncio import sleep
+from hashlib import sha256
+from logging import getLogger
+from time import monotonic
+from typing import Any, Awaitable, Callable, NoReturn, Optional, Type
+
+import orjson
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import exc
+from sqlalchemy.orm import Session
+
+from server.db import execute
+from server.db.entities import IdempotencyKey
+from server.db.repo import idempotency as repo
+from server.env import env
+from server.models.serialization import render
+
+logger = getLogger(__name__)
+
+# The error code of PostgreSQL when the lock timeout is reached.
+LOCK_NOT_AVAILABLE = "55P03"
+
+# The number of seconds a duplicate waits for the lock of a key at a time.
+POLL_INTERVAL = 0.1
+
+
+def fingerprint(request: Request, payload: BaseModel) -> str:
+    """
+    Get the fingerprint of a request, to tell apart the reuses of a key.
+
+    Args:
+        - request: the request received.
+        - payload: the body of the request, already validated.
+
+    Returns:
+        - the SHA-256 of the method, the path and the body.
+    """
+    content = f"{request.method} {request.url.path} {payload.json()}"
+    return sha256(content.encode()).hexdigest()
+
+
+async def idempotent(
+    db: Session,
+    key: Optional[str],
+    uname: str,
+    request_hash: str,
+    schema: Type[BaseModel],
+    status_code: int,
+    call: Callable[[], Awaitable[Any]],
+) -> Any:
+    """
+    Run a request once per idempotency key, and replay its response.
+
+    The key is claimed in the session of the route, so it's committed in
+    the same transaction as the changes of the request, and it stays
+    locked until then: the duplicates sent meanwhile wait for it (see
+    `claim`), and they get the response stored, without touching the other
+    tables. The client errors are stored as well, but not the server
+    errors (nor the other exceptions): the key is released, so the request
+    can be retried, unless the request already committed its changes.
+
+    Args:
+        - db: the database session of the route (sync or async).
+        - key: the `Idempotency-Key` header, if any.
+        - uname: the username of the application, the keys of each
+        application are apart.
+        - request_hash: the fingerprint of the request.
+        - schema: the schema of the response.
+        - status_code: the status code of the response.
+        - call: the coroutine function that handles the request.
+
+    Returns:
+        - the result of the call, as is when there is no key, or the
+        response rendered.
+
+    Raises:
+        - HTTPException: if the key is still in progress, or it was used
+        by a different request.
+    """
+    if not key:
+        return await call()
+
+    stored = await claim(db, key, uname, request_hash)
+
+    if stored:
+        if stored.request_hash != request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="The Idempotency-Key was already used by a "
+                "different request.",
+            )
+        return Response(
+            stored.body,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    try:
+        response = render(await call(), schema, status_code=status_code)
+    except HTTPException as error:
+        if error.status_code < status.HTTP_500_INTERNAL_SERVER_ERROR:
+            body = orjson.dumps({"detail": error.detail})
+            await save_response(db, key, uname, error.status_code, body)
+        else:
+            await execute(db, repo.release_key)
+        raise
+    except Exception:
+        await execute(db, repo.release_key)
+        raise
+
+    await save_response(db, key, uname, response.status_code, response.body)
+    return response
+
+
+async def claim(
+    db: Session, key: str, uname: str, request_hash: str
+) -> Optional[IdempotencyKey]:
+    """
+    Claim a key, waiting for the request in progress with the same key.
+
+    The lock of the key is awaited for a short while at a time, so the
+    duplicates don't hold the threads of the threadpool (the request in
+    progress may need one of them to finish) while they wait. A key
+    committed without a response yet is still in progress too: its
+    request committed, but didn't store the response (or couldn't).
+
+    Args:
+        - db: the database session of the route.
+        - key: the idempotency key.
+        - uname: the username of the application.
+        - request_hash: the fingerprint of the request.
+
+    Returns:
+        - `None` if the key was claimed, or the key stored.
+
+    Raises:
+        - HTTPException: if the request in progress didn't finish within
+        the `IDEMPOTENCY_WAIT`.
+    """
+    deadline = monotonic() + env.IDEMPOTENCY_WAIT
+    while True:
+        try:
+            stored = await execute(
+                db,
+                repo.claim_key,
+                key=key,
+                uname=uname,
+                request_hash=request_hash,
+                ttl=env.IDEMPOTENCY_TTL,
+                wait=POLL_INTERVAL,
+            )
+            if not stored or stored.status_code is not None:
+                return stored
+        except exc.DBAPIError as error:
+            if getattr(error.orig, "pgcode", None) != LOCK_NOT_AVAILABLE:
+                await execute(db, repo.release_key)
+                raise
+
+        await execute(db, repo.release_key)
+        if monotonic() >= deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with the same Idempotency-Key is still "
+                "in progress.",
+            )
+        await sleep(POLL_INTERVAL)
+
+
+async def save_response(
+    db: Session, key: str, uname: str, status_code: int, body: bytes
+) -> NoReturn:
+    """
+    Store the response of a key claimed.
+
+    The request is already done by then, so a failure to store it doesn't
+    fail the request: it's logged instead. If the request committed its
+    changes, the key was committed with them, so it's kept (without the
+    response) and the retries are refused rather than run again.
+
+    Args:
+        - db: the database session of the route, with the key claimed.
+        - key: the idempotency key.
+        - uname: the username of the application.
+        - status_code: the status code of the response.
+        - body: the body of the response.
+    """
+    try:
+        await execute(
+            db,
+            repo.save_response,
+            key=key,
+            uname=uname,
+            status_code=status_code,
+            body=body,
+        )
+    except exc.SQLAlchemyError as error:
+        logger.warning("Couldn't store the idempotency key: %s", error)
+        await execute(db, repo.release_key)
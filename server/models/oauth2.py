@@ -1,13 +1,16 @@
 from datetime import datetime, timedelta
-from typing import Dict
+from typing import Dict, NoReturn
 
-from fastapi import Depends, HTTPException, security, status
+from fastapi import Depends, Form, HTTPException, security, status
 from jwt import PyJWTError, decode, encode
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, UOWTransaction
 
 from server import env
-from server.db import open_session
+from server.db import execute, get_db, get_read_db
+from server.db.entities import Application
 from server.db.repo.apps import get_app_by_uname
+from server.models.cache import TTLCache
 
 oauth_schema = security.OAuth2PasswordBearer(tokenUrl="/auth")
 
@@ -17,14 +20,95 @@ auth_exception = HTTPException(
 )
 
 
+class TokenRequestForm:
+    """
+    The form used to request an access token.
+
+    It's the same form from `OAuth2PasswordRequestForm` but it also
+    accepts the `refresh_token` grant, where the username and password are
+    replaced by a refresh token previously issued.
+    """
+
+    def __init__(
+        self,
+        grant_type: str = Form("password", regex="^(password|refresh_token)$"),
+        username: str = Form(None),
+        password: str = Form(None),
+        refresh_token: str = Form(None),
+        scope: str = Form(""),
+    ):
+        self.grant_type = grant_type
+        self.username = username
+        self.password = password
+        self.refresh_token = refresh_token
+        self.scopes = scope.split()
+
+
+# Verified tokens mapped to the application username (the principal).
+# The entries never outlive the token itself. This process drops them once
+# a change of their application is committed, the other workers keep them
+# until they expire: a changed or removed application may still be
+# authorized by them for up to `AUTH_CACHE_TTL` seconds.
+principals = TTLCache(maxsize=env.AUTH_CACHE_SIZE, ttl=env.AUTH_CACHE_TTL)
+
+
 async def auth(
-    token: str = Depends(oauth_schema), db: Session = Depends(open_session)
+    token: str = Depends(oauth_schema), db: Session = Depends(get_db)
 ):
     """Authorize the application to use our API."""
+    await authorize(token, db)
+    return db
+
+
+async def read_auth(
+    token: str = Depends(oauth_schema), db: Session = Depends(get_read_db)
+):
+    """
+    Authorize the application to use our API, for read only requests.
+
+    Just like `auth`, but the session returned may be connected to the
+    read replica, so it must not be used to write nor to read data just
+    written by the client.
+    """
+    await authorize(token, db)
+    return db
+
+
+async def principal(
+    token: str = Depends(oauth_schema), db: Session = Depends(get_db)
+) -> str:
+    """
+    Authorize the application and get its username.
+
+    Just like `auth`, for the routes that need to know which application
+    is making the request.
+    """
+    return await authorize(token, db)
+
+
+async def authorize(token: str, db: Session) -> str:
+    """
+    Verify the token and the application it was issued to.
+
+    Args:
+        - token: the access token.
+        - db: the database session.
+
+    Returns:
+        - the username of the application.
+
+    Raises:
+        - HTTPException: if the token or the application are invalid.
+    """
+    uname = principals.get(token)
+    if uname:
+        return uname
+
     try:
-        uname = decode(
+        claims = decode(
             token, env.SECRET_KEY, algorithms=[env.TOKEN_ALGORITHM]
-        ).get("sub")
+        )
+        uname = claims.get("sub")
 
         if not uname:
             raise auth_exception
@@ -32,17 +116,52 @@ async def auth(
     except PyJWTError:
         raise auth_exception
 
-    app = get_app_by_uname(db=db, uname=uname)
+    app = await execute(db, get_app_by_uname, uname=uname)
     if not app:
         raise auth_exception
 
-    return db
+    principals.set(token, app.username, expires_at=claims.get("exp"))
+    return app.username
+
+
+# The key of `Session.info` with the usernames of the applications changed
+# in the current transaction.
+PRINCIPALS_CHANGED = "principals_changed"
+
+
+@event.listens_for(Session, "after_flush")
+def track_changed_principals(session: Session, _: UOWTransaction) -> NoReturn:
+    """Remember the applications changed or deleted, until the commit."""
+    for app in (*session.dirty, *session.deleted):
+        if isinstance(app, Application):
+            history = inspect(app).attrs.username.history
+            session.info.setdefault(PRINCIPALS_CHANGED, set()).update(
+                {app.username, *history.deleted}
+            )
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_principals(session: Session) -> NoReturn:
+    """
+    Remove the cached tokens of the applications changed, once committed.
+
+    Not on the flush: a request authorized meanwhile would cache the
+    application from before the commit again.
+    """
+    if unames := session.info.pop(PRINCIPALS_CHANGED, None):
+        principals.discard(lambda uname: uname in unames)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_principals(session: Session) -> NoReturn:
+    """Forget the applications changed, they were rolled back."""
+    session.info.pop(PRINCIPALS_CHANGED, None)
 
 
 def create_access_token(
     *,
     data: Dict,
-    expires_delta: timedelta = timedelta(minutes=env.TOKEN_EXPIRATION)
+    expires_delta: timedelta = timedelta(minutes=env.TOKEN_EXPIRATION),
 ):
     """
     Create an access token.
@@ -0,0 +1,89 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from json import dumps, loads
+from typing import Any, List, Mapping, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+Position = Tuple[datetime, int]
+
+
+def encode_cursor(position: Position) -> str:
+    """
+    Encode a position of a listing as an opaque cursor.
+
+    Args:
+        - position: the sorting value and the id of the last entity seen.
+
+    Returns:
+        - the url safe cursor.
+    """
+    value, id = position
+    payload = dumps([value.isoformat(), id]).encode()
+    return urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Position:
+    """
+    Decode a cursor created by `encode_cursor`.
+
+    Args:
+        - cursor: the opaque cursor.
+
+    Raises:
+        - ValueError: if the cursor is malformed.
+
+    Returns:
+        - the sorting value and the id of the last entity seen.
+    """
+    try:
+        payload = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, id = loads(payload)
+        return datetime.fromisoformat(value), int(id)
+    except (TypeError, ValueError) as error:
+        raise ValueError("Invalid cursor.") from error
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[Position]:
+    """
+    Decode the cursor received by a listing route.
+
+    Args:
+        - cursor: the opaque cursor, if any.
+
+    Raises:
+        - HTTPException: (400) if the cursor is malformed.
+
+    Returns:
+        - the decoded position or `None` if no cursor was provided.
+    """
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor.",
+        )
+
+
+def next_cursor(entities: List[Any], limit: int, key: str) -> Optional[str]:
+    """
+    Get the cursor for the page after the entities.
+
+    Args:
+        - entities: the entities (or the rows, as dicts) of the current
+        page.
+        - limit: the page size requested.
+        - key: the attribute used to sort the entities (besides the id).
+
+    Returns:
+        - the cursor or `None` if this is the last page.
+    """
+    if not entities or len(entities) < limit:
+        return None
+    last = entities[-1]
+    if isinstance(last, Mapping):
+        return encode_cursor((last[key], last["id"]))
+    return encode_cursor((getattr(last, key), last.id))
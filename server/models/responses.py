@@ -0,0 +1,248 @@
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, NoReturn, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import ORMExecuteState, Session, UOWTransaction
+from starlette.datastructures import Headers
+
+from server.db.entities import Order, Product
+from server.db.listener import Listener
+from server.env import env
+from server.models.cache import TTLCache
+from server.models.conditional import is_not_modified, not_modified
+
+# The channel notified by the database triggers when the listings change
+# (see the `010` migration), by the connections of the app while the
+# responses are cached (see `db.connect_args`).
+CHANNEL = "listings_changed"
+
+# The payload notified on the same channel by the archive, once the orders
+# it deleted are committed.
+ARCHIVED = "archived"
+
+# The backends available for the response cache. A backend only needs the
+# `get`, `set`, `clear` and `stats` methods of the `TTLCache`.
+backends: Dict[str, Callable[[], Any]] = {
+    "memory": lambda: TTLCache(
+        maxsize=env.RESPONSE_CACHE_SIZE, ttl=env.RESPONSE_CACHE_TTL
+    )
+}
+
+
+class ResponseCache:
+    """
+    Cache the rendered responses of the listings.
+
+    The entries are keyed by the route and the query parameters, and they
+    are all dropped whenever a product or an order changes: by the session
+    events in this process, once the change is committed, and by the
+    database notifications for the other workers (and for the changes made
+    outside of the ORM). While the notifications aren't being received,
+    nothing is cached.
+
+    A response is only stored if nothing was invalidated since the request
+    got its `generation`, before reading the database: otherwise it may
+    have been rendered from the data just changed.
+    """
+
+    def __init__(self, backend: Any, enabled: bool):
+        """
+        Create a new response cache.
+
+        Args:
+            - backend: the storage of the responses, see `backends`.
+            - enabled: if the responses must be cached at all.
+        """
+        self.backend = backend
+        self.enabled = enabled
+        self.invalidations = 0
+        self.listener = None
+        self._lock = Lock()
+
+    @property
+    def active(self) -> bool:
+        """Tell if the responses can be cached right now."""
+        return self.enabled and (
+            self.listener is None or self.listener.listening
+        )
+
+    @staticmethod
+    def key(request: Request) -> Hashable:
+        """Get the cache key of a request."""
+        return (
+            request.url.path,
+            tuple(sorted(request.query_params.multi_items())),
+        )
+
+    def get(self, request: Request) -> Optional[Response]:
+        """
+        Get the cached response for a request.
+
+        Args:
+            - request: the listing request.
+
+        Returns:
+            - the cached response (or a `304 Not Modified` if the client
+            already has it), `None` when it isn't cached.
+        """
+        if not self.active:
+            return None
+
+        entry: Optional[Tuple[bytes, Dict[str, str], str]]
+        if not (entry := self.backend.get(self.key(request))):
+            return None
+
+        body, raw_headers, media_type = entry
+        headers = Headers(headers=raw_headers)
+        if is_not_modified(request, headers):
+            return not_modified(headers)
+        return Response(body, headers=headers, media_type=media_type)
+
+    @property
+    def generation(self) -> int:
+        """Get the number of invalidations, to be given back to `store`."""
+        return self.invalidations
+
+    def store(
+        self, request: Request, response: Response, generation: int
+    ) -> Response:
+        """
+        Cache the response rendered for a request.
+
+        Args:
+            - request: the listing request.
+            - response: the response rendered.
+            - generation: the `generation` taken before the response was
+            read from the database.
+
+        Returns:
+            - the same response.
+        """
+        if self.active:
+            headers = {
+                name: value
+                for name, value in response.headers.items()
+                if name not in {"content-length", "content-type"}
+            }
+            with self._lock:
+                if generation == self.invalidations:
+                    self.backend.set(
+                        self.key(request),
+                        (response.body, headers, response.media_type),
+                    )
+        return response
+
+    def invalidate(self, *_: Any) -> NoReturn:
+        """Drop all the cached responses."""
+        with self._lock:
+            self.invalidations += 1
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the response cache statistics."""
+        return {
+            **self.backend.stats(),
+            "enabled": self.enabled,
+            "invalidations": self.invalidations,
+            "listener": self.listener.stats() if self.listener else None,
+        }
+
+
+responses = ResponseCache(
+    backends[env.RESPONSE_CACHE_BACKEND](), enabled=env.RESPONSE_CACHE
+)
+
+
+# The orders found by the lookups, keyed by `("uuid", uuid)` and by
+# `("code", product code)`. Neither the orders nor their products (taken)
+# ever change, they are only deleted by the archive: the entries are
+# dropped on its notification (see `invalidate_listings`), or once they
+# expire (`ORDER_CACHE_TTL`) when the notifications aren't received.
+orders = TTLCache(maxsize=env.ORDER_CACHE_SIZE, ttl=env.ORDER_CACHE_TTL)
+
+
+def invalidate_listings(payload: Optional[str]) -> NoReturn:
+    """
+    Drop the cached responses on a notification of the listings changes.
+
+    The cached orders are dropped too when the archive has deleted some,
+    or when the connection was lost (an archive may have been missed).
+
+    Args:
+        - payload: the table changed, `ARCHIVED` or `None`.
+    """
+    responses.invalidate()
+    if payload in (ARCHIVED, None):
+        orders.clear()
+
+
+def listen() -> NoReturn:
+    """
+    Start receiving the notifications of the listings changes.
+
+    Only Postgres (with psycopg2) sends the notifications, with any other
+    database the responses are cached as if there was a single process
+    (and the orders until they expire).
+    """
+    driver = make_url(env.DATABASE_URL).get_driver_name()
+    cached = responses.enabled or orders.maxsize > 0
+    if cached and driver == "psycopg2":
+        responses.listener = Listener(
+            env.DATABASE_URL, CHANNEL, invalidate_listings
+        )
+        responses.listener.start()
+
+
+def unlisten() -> NoReturn:
+    """Stop receiving the notifications of the listings changes."""
+    if responses.listener:
+        responses.listener.stop()
+
+
+# The key of `Session.info` telling the products or orders were written in
+# the current transaction.
+LISTINGS_CHANGED = "listings_changed"
+
+
+@event.listens_for(Session, "after_flush")
+def track_flushed_listings(session: Session, _: UOWTransaction) -> NoReturn:
+    """Remember the products and orders flushed, until the commit."""
+    changed = (*session.new, *session.dirty, *session.deleted)
+    if any(isinstance(entity, (Product, Order)) for entity in changed):
+        session.info[LISTINGS_CHANGED] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def track_written_listings(state: ORMExecuteState) -> NoReturn:
+    """
+    Remember the writes that skip the flush, until the commit.
+
+    Those are the `INSERT`, `UPDATE` and `DELETE` statements executed by
+    the session (like the product writes with `RETURNING`).
+    """
+    if (
+        (state.is_insert or state.is_update or state.is_delete)
+        and state.bind_mapper
+        and state.bind_mapper.class_ in (Product, Order)
+    ):
+        state.session.info[LISTINGS_CHANGED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_responses(session: Session) -> NoReturn:
+    """
+    Drop the cached responses once this process commits a change.
+
+    Not on the flush (nor on the statement): a listing read meanwhile
+    would cache the data from before the commit again.
+    """
+    if session.info.pop(LISTINGS_CHANGED, False) and responses.enabled:
+        responses.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_listings(session: Session) -> NoReturn:
+    """Forget the products and orders written, they were rolled back."""
+    session.info.pop(LISTINGS_CHANGED, None)
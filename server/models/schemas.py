@@ -58,6 +58,28 @@ class ProductWithTotal(BaseModel):
 
     total: ProductCount
     products: List[Product] = []
+    next_cursor: str = None
+
+
+class ProductMatch(BaseModel):
+    """A product found by the search, with its similarity to the query."""
+
+    score: float
+    product: Product
+
+
+class ProductImport(ProductBase):
+    """The properties of a product registered in bulk."""
+
+    summary: str
+
+
+class ProductImportResult(BaseModel):
+    """The summary of a bulk product registration."""
+
+    inserted: int
+    skipped: int
+    conflicting: int
 
 
 class OrderBase(BaseModel):
@@ -85,14 +107,131 @@ class Order(OrderBase):
         orm_mode = True
 
 
+class OrderMatch(BaseModel):
+    """An order found by the search, with its similarity to the query."""
+
+    score: float
+    order: Order
+
+
+class ModeratorStats(BaseModel):
+    """The order statistics of a moderator."""
+
+    mod_id: str
+    mod_display_name: str
+    orders: int
+    last_order_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class OwnerStats(BaseModel):
+    """The order statistics of an owner."""
+
+    owner_display_name: str
+    orders: int
+    last_order_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class Leaderboard(BaseModel):
+    """The moderators and owners with the most orders."""
+
+    moderators: List[ModeratorStats]
+    owners: List[OwnerStats]
+
+
 class OrderWithTotal(BaseModel):
     """The total orders counter with the orders entities."""
 
     total: int
     orders: List[Order]
+    next_cursor: str = None
+
+
+class Token(BaseModel):
+    """The tokens issued to an application."""
+
+    access_token: str
+    token_type: str
+    refresh_token: str = None
+
+
+class TokenRevocation(BaseModel):
+    """The response schema for a refresh token revocation."""
+
+    revoked: bool
 
 
 class HeartBeat(BaseModel):
     """The schema for heartbeat verification."""
 
     valid: bool
+
+
+class CacheStats(BaseModel):
+    """The statistics of an in-process cache."""
+
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    hit_rate: float
+
+
+class ExecutorStats(BaseModel):
+    """The statistics of a bounded executor."""
+
+    workers: int
+    queue: int
+    submitted: int
+    rejected: int
+    cpu_time: float
+
+
+class PoolStats(BaseModel):
+    """The statistics of a database connection pool."""
+
+    size: int
+    checked_out: int
+    overflow: int
+    peak_overflow: int
+    checkouts: int
+    timeouts: int
+    wait_time: float
+    max_wait_time: float
+
+
+class ReplicaStats(BaseModel):
+    """The statistics of the read replica."""
+
+    lag: float = None
+    max_lag: float
+    fresh: bool
+    fallbacks: int
+
+
+class ListenerStats(BaseModel):
+    """The statistics of a database notifications listener."""
+
+    listening: bool
+    notifications: int
+    reconnections: int
+
+
+class ResponseCacheStats(CacheStats):
+    """The statistics of the listings response cache."""
+
+    enabled: bool
+    invalidations: int
+    listener: ListenerStats = None
+
+
+class AuthMetrics(BaseModel):
+    """The metrics of the authentication path."""
+
+    principals: CacheStats
+    verifier: ExecutorStats
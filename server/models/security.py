@@ -1,3 +1,118 @@
+import hmac
+from asyncio import wrap_future
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from hashlib import sha256
+from secrets import token_urlsafe
+from threading import BoundedSemaphore
+from time import thread_time
+from typing import Any, Callable, Dict
+
 from passlib.context import CryptContext
 
+from server.env import env
+
 pw_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def generate_token() -> str:
+    """Generate a random and url safe token."""
+    return token_urlsafe(32)
+
+
+def hash_token(token: str) -> str:
+    """
+    Compute the HMAC of a token using the application secret key.
+
+    Unlike the passwords, tokens are random and long enough, so a single
+    (and cheap) HMAC is safe to store and to use in indexed lookups.
+
+    Args:
+        - token: the plain token.
+
+    Returns:
+        - the hexadecimal digest of the token.
+    """
+    return hmac.new(
+        env.SECRET_KEY.encode(), token.encode(), sha256
+    ).hexdigest()
+
+
+class ExecutorFull(Exception):
+    """Raised when the executor queue cannot accept more tasks."""
+
+
+class BoundedExecutor:
+    """
+    A thread pool with a limited number of pending tasks.
+
+    We use it to run CPU bound work (like password hashing) outside the
+    event loop. When all the workers are busy and the queue is full, new
+    tasks are rejected right away instead of waiting indefinitely.
+    """
+
+    def __init__(self, workers: int, queue: int, name: str):
+        """
+        Create a new executor.
+
+        Args:
+            - workers: the number of threads.
+            - queue: the number of tasks that can wait for a free thread.
+            - name: the prefix for the threads name.
+        """
+        self.workers = workers
+        self.queue = queue
+        self.submitted = 0
+        self.rejected = 0
+        self.cpu_time = 0.0
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=name
+        )
+        self._slots = BoundedSemaphore(workers + queue)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run a function in the executor and wait for the result.
+
+        Args:
+            - fn: the function to be executed.
+            - args/kwargs: the arguments to the function.
+
+        Raises:
+            - ExecutorFull: if there is no room for a new task.
+
+        Returns:
+            - the result of the function.
+        """
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise ExecutorFull()
+
+        self.submitted += 1
+        future = self._executor.submit(
+            partial(self._timed, fn, *args, **kwargs)
+        )
+        future.add_done_callback(lambda _: self._slots.release())
+        return await wrap_future(future)
+
+    def _timed(self, fn: Callable, *args, **kwargs) -> Any:
+        started = thread_time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.cpu_time += thread_time() - started
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the executor statistics."""
+        return {
+            "workers": self.workers,
+            "queue": self.queue,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "cpu_time": self.cpu_time,
+        }
+
+
+verifier = BoundedExecutor(
+    workers=env.AUTH_WORKERS, queue=env.AUTH_QUEUE, name="verifier"
+)
@@ -0,0 +1,124 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Type
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON
+
+from server.env import env
+
+# The name of a field, its nested schema (if any) and if it's a list.
+Field = Tuple[str, Optional[Type[BaseModel]], bool]
+
+
+@lru_cache(maxsize=None)
+def fields(schema: Type[BaseModel]) -> List[Field]:
+    """
+    Get the fields of a schema, as they must be dumped.
+
+    Args:
+        - schema: the schema exposed by the API.
+
+    Returns:
+        - the list of fields, computed once per schema.
+    """
+    plan = []
+    for name, field in schema.__fields__.items():
+        nested = (
+            field.type_
+            if isinstance(field.type_, type)
+            and issubclass(field.type_, BaseModel)
+            else None
+        )
+        plan.append((name, nested, field.shape != SHAPE_SINGLETON))
+    return plan
+
+
+def dump(content: Any, schema: Type[BaseModel]) -> Any:
+    """
+    Pick the values of the schema fields, without validating them.
+
+    It's meant for the content the server built itself (the entities or
+    the rows read from the database), that is already valid. The values
+    are kept as they are (UUIDs and datetimes included) for the JSON
+    serializer.
+
+    Args:
+        - content: a dict, or an object with the fields as attributes.
+        - schema: the schema exposed by the API.
+
+    Returns:
+        - a dict with the fields of the schema, nested schemas included.
+    """
+    if content is None:
+        return None
+
+    mapping = isinstance(content, Mapping)
+    values = {}
+    for name, nested, many in fields(schema):
+        value = content.get(name) if mapping else getattr(content, name, None)
+
+        if nested and value is not None:
+            value = (
+                [dump(item, nested) for item in value]
+                if many
+                else dump(value, nested)
+            )
+        values[name] = value
+    return values
+
+
+def fast_response(
+    content: Any,
+    schema: Type[BaseModel],
+    status_code: int = 200,
+    headers: Dict[str, str] = None,
+) -> ORJSONResponse:
+    """
+    Render the content with orjson, skipping the response validation.
+
+    The wire format is the same of the `schema`, but the content isn't
+    validated again nor converted by the `jsonable_encoder`.
+
+    Args:
+        - content: the content built by the route.
+        - schema: the schema exposed by the API.
+        - status_code: the response status code.
+        - headers: the response headers.
+
+    Returns:
+        - the response rendered.
+    """
+    return ORJSONResponse(
+        dump(content, schema), status_code=status_code, headers=headers
+    )
+
+
+def render(
+    content: Any,
+    schema: Type[BaseModel],
+    headers: Dict[str, str] = None,
+    status_code: int = 200,
+) -> Response:
+    """
+    Render the content just like the route would, so it can be cached.
+
+    Args:
+        - content: the content built by the route.
+        - schema: the schema exposed by the API.
+        - headers: the response headers.
+        - status_code: the response status code.
+
+    Returns:
+        - the response rendered, with orjson when `FAST_JSON` is enabled.
+    """
+    if env.FAST_JSON:
+        return fast_response(
+            content, schema, status_code=status_code, headers=headers
+        )
+    return JSONResponse(
+        jsonable_encoder(schema.parse_obj(dump(content, schema))),
+        status_code=status_code,
+        headers=headers,
+    )
@@ -0,0 +1,84 @@
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from server.env import env
+from server.models import schemas
+from server.models.archive import read_archive
+from server.models.oauth2 import read_auth
+
+router = APIRouter()
+
+
+@router.get(
+    "/orders",
+    summary="Search the archived orders.",
+    status_code=status.HTTP_200_OK,
+    response_model=List[schemas.Order],
+)
+async def get_archived_orders(
+    moderator: str = None,
+    owner: str = None,
+    code: str = None,
+    since: datetime = None,
+    until: datetime = None,
+    limit: int = Query(100, ge=1, le=1000),
+    _: Session = Depends(read_auth),
+):
+    """
+    Search the orders moved to the archive, the oldest first.
+
+    The archive files are read from the disk (only the ones of the period
+    asked), so it's much slower than the listing of the orders.
+    """
+
+    def match(order):
+        return (
+            (not moderator or order["mod_display_name"] == moderator)
+            and (not owner or order["owner_display_name"] == owner)
+            and (not code or order["product"]["code"] == code)
+        )
+
+    return await run_in_threadpool(
+        read_archive,
+        Path(env.ARCHIVE_DIRECTORY),
+        "orders",
+        match=match,
+        since=since,
+        until=until,
+        limit=limit,
+    )
+
+
+@router.get(
+    "/products",
+    summary="Search the archived products.",
+    status_code=status.HTTP_200_OK,
+    response_model=List[schemas.Product],
+)
+async def get_archived_products(
+    code: str = None,
+    since: datetime = None,
+    until: datetime = None,
+    limit: int = Query(100, ge=1, le=1000),
+    _: Session = Depends(read_auth),
+):
+    """
+    Search the products moved to the archive, the oldest update first.
+
+    The archive files are read from the disk (only the ones of the period
+    asked), so it's much slower than the listing of the products.
+    """
+    return await run_in_threadpool(
+        read_archive,
+        Path(env.ARCHIVE_DIRECTORY),
+        "products",
+        match=lambda product: not code or product["code"] == code,
+        since=since,
+        until=until,
+        limit=limit,
+    )
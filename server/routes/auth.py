@@ -1,20 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, security, status
+from fastapi import APIRouter, Depends, Form, HTTPException, status
 from sqlalchemy.orm import Session
 
-from server.db import open_session
-from server.db.repo.apps import auth_application
-from server.models.oauth2 import create_access_token
+from server.db import execute, get_db
+from server.db.repo.apps import get_app_by_uname
+from server.db.repo.tokens import (
+    create_refresh_token,
+    get_app_by_refresh_token,
+    revoke_refresh_token,
+)
+from server.models import schemas
+from server.models.oauth2 import (
+    TokenRequestForm,
+    create_access_token,
+    principal,
+)
+from server.models.security import ExecutorFull, verifier
 
 router = APIRouter()
 
 
-@router.post("/", summary="Authentication")
+@router.post(
+    "/",
+    summary="Authentication",
+    response_model=schemas.Token,
+    response_model_exclude_none=True,
+)
 async def authenticate(
-    form: security.OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(open_session),
+    form: TokenRequestForm = Depends(), db: Session = Depends(get_db),
 ):
-    """Authenticate the application to consume our API."""
-    app = auth_application(db=db, uname=form.username, password=form.password)
+    """
+    Authenticate the application to consume our API.
+
+    Use the `password` grant to get an access token and a refresh token.
+    Then use the `refresh_token` grant to get new access tokens, without
+    sending the password again.
+    """
+    if form.grant_type == "refresh_token":
+        app = await execute(
+            db, get_app_by_refresh_token, token=form.refresh_token or ""
+        )
+
+        if not app:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired refresh token.",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        return {
+            "access_token": create_access_token(data={"sub": app.username}),
+            "token_type": "bearer",
+        }
+
+    app = await execute(db, get_app_by_uname, uname=form.username)
+
+    try:
+        if app and not await verifier.run(
+            app.check_password, plain_password=form.password or ""
+        ):
+            app = None
+    except ExecutorFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again later.",
+            headers={"Retry-After": "1"},
+        )
 
     if not app:
         raise HTTPException(
@@ -26,4 +76,28 @@ async def authenticate(
     return {
         "access_token": create_access_token(data={"sub": app.username}),
         "token_type": "bearer",
+        "refresh_token": await execute(db, create_refresh_token, app=app),
+    }
+
+
+@router.post(
+    "/revoke",
+    summary="Revoke a refresh token.",
+    response_model=schemas.TokenRevocation,
+    status_code=status.HTTP_200_OK,
+)
+async def revoke(
+    token: str = Form(...),
+    db: Session = Depends(get_db),
+    uname: str = Depends(principal),
+):
+    """
+    Revoke a refresh token, so it cannot be used anymore.
+
+    Only the tokens issued to the application itself are revoked.
+    """
+    return {
+        "revoked": await execute(
+            db, revoke_refresh_token, token=token, uname=uname
+        )
     }
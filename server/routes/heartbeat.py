@@ -13,6 +13,6 @@ router = APIRouter()
     status_code=status.HTTP_200_OK,
     response_model=schemas.HeartBeat,
 )
-def heartbeat(_: Session = Depends(auth)):
+async def heartbeat(_: Session = Depends(auth)):
     """Check if code/app is valid."""
     return {"valid": True}
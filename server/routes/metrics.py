@@ -0,0 +1,66 @@
+from typing import Dict
+
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.orm import Session
+
+from server.db import pool_statistics, replica
+from server.models import schemas
+from server.models.oauth2 import auth, principals
+from server.models.responses import responses
+from server.models.security import verifier
+
+router = APIRouter()
+
+
+@router.get(
+    "/auth",
+    summary="Get the authentication metrics.",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.AuthMetrics,
+)
+async def auth_metrics(_: Session = Depends(auth)):
+    """Get the authentication metrics."""
+    return {"principals": principals.stats(), "verifier": verifier.stats()}
+
+
+@router.get(
+    "/pool",
+    summary="Get the database connection pool metrics.",
+    status_code=status.HTTP_200_OK,
+    response_model=Dict[str, schemas.PoolStats],
+)
+async def pool_metrics(_: Session = Depends(auth)):
+    """Get the connection pool statistics for each database engine."""
+    return pool_statistics()
+
+
+@router.get(
+    "/replica",
+    summary="Get the read replica metrics.",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.ReplicaStats,
+)
+async def replica_metrics(_: Session = Depends(auth)):
+    """
+    Get the read replica metrics.
+
+    The `fallbacks` are the read only sessions sent to the primary because
+    the replica was too stale.
+    """
+    return replica.stats()
+
+
+@router.get(
+    "/cache",
+    summary="Get the response cache metrics.",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.ResponseCacheStats,
+)
+async def cache_metrics(_: Session = Depends(auth)):
+    """
+    Get the listings response cache metrics.
+
+    The `invalidations` count the times the cache was dropped, because the
+    products or the orders changed.
+    """
+    return responses.stats()
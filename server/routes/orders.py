@@ -1,10 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import Callable, List, Tuple
+from uuid import UUID
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from server.db import (
+    execute,
+    get_db,
+    open_primary_session,
+    stream,
+    uses_replica,
+)
 from server.db.repo import orders as repo
 from server.db.repo import products as product_repo
+from server.env import env
 from server.models import schemas
-from server.models.oauth2 import auth
+from server.models.conditional import is_not_modified, not_modified, validators
+from server.models.export import export_response
+from server.models.idempotency import fingerprint, idempotent
+from server.models.oauth2 import principal, read_auth
+from server.models.pagination import next_cursor, parse_cursor
+from server.models.responses import orders, responses
+from server.models.serialization import fast_response, render
 
 router = APIRouter()
 
@@ -15,25 +43,236 @@ router = APIRouter()
     status_code=status.HTTP_200_OK,
     response_model=schemas.OrderWithTotal,
 )
-def get_orders(
+async def get_orders(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 50,
     moderator: str = None,
     owner: str = None,
     desc: bool = False,
-    db: Session = Depends(auth),
+    cursor: str = None,
+    since: datetime = None,
+    until: datetime = None,
+    db: Session = Depends(read_auth),
 ):
-    """Get all the orders."""
-    entities = repo.get_orders(
-        db=db,
+    """
+    Get all the orders.
+
+    The `since` and `until` filters limit the orders to a period, only the
+    partitions of that period are read.
+
+    Use the `next_cursor` from the response as the `cursor` of the next
+    request to get the following page, it costs the same for any page.
+
+    Send the `ETag` of the previous response as `If-None-Match` to get a
+    `304 Not Modified`, without the body, while the orders don't change
+    (`If-Modified-Since` is ignored).
+    """
+    if cached := responses.get(request):
+        return cached
+    generation = responses.generation
+
+    position = parse_cursor(cursor)
+    version = await execute(db, repo.get_orders_version)
+    headers = validators(request, version, last_modified=version[-1])
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+    response.headers.update(headers)
+
+    entities = await execute(
+        db,
+        repo.get_orders_rows if env.CORE_READS else repo.get_orders,
         skip=skip,
         limit=limit,
         moderator=moderator,
         owner=owner,
         desc=desc,
+        cursor=position,
+        since=since,
+        until=until,
+    )
+
+    content = {
+        "total": version[0],
+        "orders": entities,
+        "next_cursor": next_cursor(entities, limit, "requested_at"),
+    }
+
+    if env.RESPONSE_CACHE:
+        return responses.store(
+            request,
+            render(content, schemas.OrderWithTotal, headers),
+            generation,
+        )
+    if env.FAST_JSON:
+        return fast_response(content, schemas.OrderWithTotal, headers=headers)
+    return content
+
+
+@router.get(
+    "/export",
+    summary="Export the orders.",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+async def export_orders(
+    format: str = Query("csv", regex="^(csv|ndjson)$"),
+    moderator: str = None,
+    owner: str = None,
+    since: datetime = None,
+    until: datetime = None,
+    db: Session = Depends(read_auth),
+):
+    """
+    Export the orders as CSV or newline delimited JSON.
+
+    The orders are streamed while they are fetched from the database, in
+    the order they were requested, so there is no limit for the export.
+    """
+    statement = repo.select_orders(
+        moderator=moderator, owner=owner, since=since, until=until
+    )
+    return export_response(
+        stream(db, statement), schemas.Order, format, "orders"
+    )
+
+
+@router.get(
+    "/search",
+    summary="Search the orders by participant.",
+    status_code=status.HTTP_200_OK,
+    response_model=List[schemas.OrderMatch],
+)
+async def search_orders(
+    q: str = Query(..., min_length=3, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    participant: str = Query(None, regex="^(owner|moderator)$"),
+    db: Session = Depends(read_auth),
+):
+    """
+    Search the orders by a part of a display name, even misspelled.
+
+    Both the owner and the moderator names are searched, unless only one
+    of them is picked by the `participant`. The orders are ranked by the
+    similarity to the query, the best matches (and then the most recent)
+    first.
+    """
+    matches = await execute(
+        db, repo.search_orders, query=q, limit=limit, participant=participant,
+    )
+    return [{"score": score, "order": order} for order, score in matches]
+
+
+@router.get(
+    "/by-code/{code}",
+    summary="Get the order of a product code.",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.Order,
+)
+async def get_order_by_code(code: str, db: Session = Depends(read_auth)):
+    """Get the order that took the product with the code specified."""
+    return await lookup_order(
+        db, ("code", code), repo.get_order_by_product_code, code=code
     )
 
-    return {"total": repo.get_orders_count(db=db), "orders": entities}
+
+@router.get(
+    "/{uuid}",
+    summary="Get an order.",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.Order,
+)
+async def get_order(uuid: UUID, db: Session = Depends(read_auth)):
+    """Get the order with the unique ID specified."""
+    return await lookup_order(
+        db, ("uuid", str(uuid)), repo.get_order_by_uuid, uuid=str(uuid)
+    )
+
+
+async def lookup_order(
+    db: Session, key: Tuple[str, str], fn: Callable, **kwargs
+) -> schemas.Order:
+    """
+    Find an order, using the cache of the orders already found.
+
+    The replica may not have replayed a recent order yet, so an order not
+    found there is looked up again on the primary before the `404`.
+
+    Args:
+        - db: the database session.
+        - key: the cache key of the lookup.
+        - fn: the repository function used on a cache miss.
+        - kwargs: the arguments of the repository function.
+
+    Returns:
+        - the order found.
+
+    Raises:
+        - HTTPException: if the order isn't found (that's never cached,
+        since the order may be created later).
+    """
+    if order := orders.get(key):
+        return order
+
+    if entity := await execute(db, fn, **kwargs):
+        order = schemas.Order.from_orm(entity)
+    elif uses_replica(db):
+        async with open_primary_session(db) as primary:
+            if entity := await execute(primary, fn, **kwargs):
+                order = schemas.Order.from_orm(entity)
+
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Order not found."
+        )
+
+    orders.set(("uuid", str(order.uuid)), order)
+    orders.set(("code", order.product.code), order)
+    return order
+
+
+@router.post(
+    "/claim",
+    summary="Generate a new order for the next available product.",
+    response_model=schemas.Order,
+    status_code=status.HTTP_201_CREATED,
+)
+async def claim_product(
+    request: Request,
+    order: schemas.OrderCreation,
+    idempotency_key: str = Header(None, max_length=255),
+    db: Session = Depends(get_db),
+    uname: str = Depends(principal),
+):
+    """
+    Generate a new order for the next available product.
+
+    The product is picked and marked as taken in a single transaction, so
+    concurrent requests never receive the same product.
+
+    Send an `Idempotency-Key` to retry the request safely, without taking
+    another product (see `POST /orders/{product_uuid}`).
+    """
+
+    async def claim():
+        if db_order := await execute(db, repo.claim_product, order=order):
+            return db_order
+
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No product available to claim.",
+        )
+
+    return await idempotent(
+        db,
+        idempotency_key,
+        uname,
+        fingerprint(request, order),
+        schemas.Order,
+        status.HTTP_201_CREATED,
+        claim,
+    )
 
 
 @router.post(
@@ -42,23 +281,58 @@ def get_orders(
     response_model=schemas.Order,
     status_code=status.HTTP_201_CREATED,
 )
-def create_order(
+async def create_order(
+    request: Request,
     product_uuid: str,
     order: schemas.OrderCreation,
-    db: Session = Depends(auth),
+    idempotency_key: str = Header(None, max_length=255),
+    db: Session = Depends(get_db),
+    uname: str = Depends(principal),
 ):
-    """Generate a new order for a product."""
-    if product := product_repo.get_product_by_uuid(db=db, uuid=product_uuid):
-        if product.taken:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="The product code is already taken.",
+    """
+    Generate a new order for a product.
+
+    The product is locked until the order is committed, so concurrent
+    requests (and claims) for it wait, then find it taken (`409`).
+
+    Send an `Idempotency-Key` to retry the request safely. The response of
+    the first request with the key is stored (for `IDEMPOTENCY_TTL`) and
+    replayed to the retries, with the `Idempotent-Replayed` header, and
+    the retries sent while it's still in progress wait for it. Reusing a
+    key for a different request is refused. The keys are scoped by the
+    application, the same key sent by another one is a new request.
+    """
+
+    async def order_product():
+        if product := await execute(
+            db,
+            product_repo.get_product_by_uuid,
+            uuid=product_uuid,
+            for_update=True,
+        ):
+            if product.taken:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="The product code is already taken.",
+                )
+            return await execute(
+                db,
+                repo.create_order_for_product,
+                product=product,
+                order=order,
             )
-        return repo.create_order_for_product(
-            db=db, product=product, order=order
+
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No product found for the uuid provided.",
         )
 
-    raise HTTPException(
-        status_code=status.HTTP_404_NOT_FOUND,
-        detail="No product found for the uuid provided.",
+    return await idempotent(
+        db,
+        idempotency_key,
+        uname,
+        fingerprint(request, order),
+        schemas.Order,
+        status.HTTP_201_CREATED,
+        order_product,
     )
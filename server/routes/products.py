@@ -1,9 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import List
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import exc
 from sqlalchemy.orm import Session
 
+from server.db import commit, execute, get_db, stream
 from server.db.repo import products as repo
-from server.models import schemas
-from server.models.oauth2 import auth
+from server.env import env
+from server.models import bulk, schemas
+from server.models.conditional import is_not_modified, not_modified, validators
+from server.models.export import export_response
+from server.models.idempotency import fingerprint, idempotent
+from server.models.oauth2 import auth, principal, read_auth
+from server.models.pagination import next_cursor, parse_cursor
+from server.models.responses import responses
+from server.models.serialization import fast_response, render
 
 router = APIRouter()
 
@@ -14,29 +36,119 @@ router = APIRouter()
     status_code=status.HTTP_200_OK,
     response_model=schemas.ProductWithTotal,
 )
-def get_products(
+async def get_products(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 50,
     taken: bool = False,
     desc: bool = True,
-    db: Session = Depends(auth),
+    cursor: str = None,
+    db: Session = Depends(read_auth),
 ):
-    """Get all the products."""
-    products = repo.get_products(
-        db=db, skip=skip, limit=limit, taken=taken, desc=desc
-    )
+    """
+    Get all the products.
+
+    Use the `next_cursor` from the response as the `cursor` of the next
+    request to get the following page, it costs the same for any page.
 
-    total, total_available, total_taken = repo.get_products_count(db=db)
+    Send the `ETag` of the previous response as `If-None-Match` to get a
+    `304 Not Modified`, without the body, while the products don't change
+    (`If-Modified-Since` is ignored).
+    """
+    if cached := responses.get(request):
+        return cached
+    generation = responses.generation
 
-    return {
+    position = parse_cursor(cursor)
+    version = await execute(db, repo.get_products_version)
+    headers = validators(request, version, last_modified=version[-1])
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+    response.headers.update(headers)
+
+    products = await execute(
+        db,
+        repo.get_products_rows if env.CORE_READS else repo.get_products,
+        skip=skip,
+        limit=limit,
+        taken=taken,
+        desc=desc,
+        cursor=position,
+    )
+
+    total, total_available, total_taken, *_ = version
+    content = {
         "total": {
             "all": total,
             "taken": total_taken,
             "available": total_available,
         },
         "products": products,
+        "next_cursor": next_cursor(products, limit, "created_at"),
     }
 
+    if env.RESPONSE_CACHE:
+        return responses.store(
+            request,
+            render(content, schemas.ProductWithTotal, headers),
+            generation,
+        )
+    if env.FAST_JSON:
+        return fast_response(
+            content, schemas.ProductWithTotal, headers=headers
+        )
+    return content
+
+
+@router.get(
+    "/export",
+    summary="Export the products.",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+async def export_products(
+    format: str = Query("csv", regex="^(csv|ndjson)$"),
+    taken: bool = None,
+    since: datetime = None,
+    until: datetime = None,
+    db: Session = Depends(read_auth),
+):
+    """
+    Export the products as CSV or newline delimited JSON.
+
+    The products are streamed while they are fetched from the database, in
+    the order they were created, so there is no limit for the export.
+    """
+    statement = repo.select_products(taken=taken, since=since, until=until)
+    return export_response(
+        stream(db, statement), schemas.Product, format, "products"
+    )
+
+
+@router.get(
+    "/search",
+    summary="Search the products.",
+    status_code=status.HTTP_200_OK,
+    response_model=List[schemas.ProductMatch],
+)
+async def search_products(
+    q: str = Query(..., min_length=3, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    taken: bool = None,
+    db: Session = Depends(read_auth),
+):
+    """
+    Search the products by a part of their summary, even misspelled.
+
+    The products are ranked by their similarity to the query, the best
+    matches first.
+    """
+    matches = await execute(
+        db, repo.search_products, query=q, limit=limit, taken=taken
+    )
+    return [{"score": score, "product": p} for p, score in matches]
+
 
 @router.post(
     "/",
@@ -44,17 +156,101 @@ def get_products(
     response_model=schemas.Product,
     status_code=status.HTTP_201_CREATED,
 )
-def create_product(
-    product: schemas.ProductCreation, db: Session = Depends(auth)
+async def create_product(
+    request: Request,
+    product: schemas.ProductCreation,
+    idempotency_key: str = Header(None, max_length=255),
+    db: Session = Depends(get_db),
+    uname: str = Depends(principal),
 ):
-    """Register a new product."""
-    if repo.get_product_by_code(db=db, code=product.code):
+    """
+    Register a new product.
+
+    Send an `Idempotency-Key` to retry the request safely: the response of
+    the first request with the key is replayed (see `POST /orders`).
+    """
+
+    async def register():
+        if created := await execute(db, repo.create_product, product=product):
+            return created
+
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="The code is already in use by another product.",
         )
 
-    return repo.create_product(db=db, product=product)
+    return await idempotent(
+        db,
+        idempotency_key,
+        uname,
+        fingerprint(request, product),
+        schemas.Product,
+        status.HTTP_201_CREATED,
+        register,
+    )
+
+
+@router.post(
+    "/bulk",
+    summary="Register products in bulk.",
+    response_model=schemas.ProductImportResult,
+    status_code=status.HTTP_201_CREATED,
+)
+async def import_products(request: Request, db: Session = Depends(auth)):
+    """
+    Register products in bulk.
+
+    The body is a JSON array (`application/json`), a newline delimited
+    JSON (`application/x-ndjson`) or a CSV with a header (`text/csv`), the
+    products must have a `code` and a `summary`. The products are inserted
+    in batches while the body is received, all in a single transaction.
+
+    The codes repeated in the upload are `skipped`, the ones already used
+    by other products are `conflicting`, neither are inserted. A malformed
+    body is answered with a `400`, the invalid products with a `422`.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0]
+    media_type = media_type.strip().lower()
+    if media_type not in bulk.readers:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="The products must be sent as JSON, NDJSON or CSV.",
+        )
+
+    codes = set()
+    result = {"inserted": 0, "skipped": 0, "conflicting": 0}
+
+    try:
+        async for batch in bulk.read_products(
+            request.stream(), media_type, env.BULK_BATCH_SIZE
+        ):
+            products = []
+            for product in batch:
+                if product.code not in codes:
+                    codes.add(product.code)
+                    products.append(product)
+
+            inserted = (
+                await execute(db, repo.import_products, products=products)
+                if products
+                else 0
+            )
+            result["inserted"] += inserted
+            result["skipped"] += len(batch) - len(products)
+            result["conflicting"] += len(products) - inserted
+
+    except bulk.MalformedBody as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+        )
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(error),
+        )
+
+    await execute(db, commit)
+    return result
 
 
 @router.put(
@@ -63,24 +259,30 @@ def create_product(
     response_model=schemas.Product,
     status_code=status.HTTP_200_OK,
 )
-def update_product(
+async def update_product(
     uuid: str, product: schemas.ProductUpdate, db: Session = Depends(auth)
 ):
-    """Update an existing product."""
-    if db_product := repo.get_product_by_uuid(db=db, uuid=uuid):
-        if db_product.taken:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="The product is already taken and cannot be edited.",
-            )
+    """
+    Update an existing product.
 
-        if repo.get_product_by_code(db=db, code=product.code):
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="The code is already in use by another product.",
-            )
-        return repo.update_product(
-            db=db, product=product, db_product=db_product
+    The product is updated by a single statement, the product is only
+    read again when it isn't updated, to tell why.
+    """
+    try:
+        if updated := await execute(
+            db, repo.update_product, uuid=uuid, product=product
+        ):
+            return updated
+    except exc.IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The code is already in use by another product.",
+        )
+
+    if await execute(db, repo.get_product_by_uuid, uuid=uuid):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="The product is already taken and cannot be edited.",
         )
 
     raise HTTPException(
@@ -95,15 +297,15 @@ def update_product(
     response_model=schemas.ProductDelete,
     status_code=status.HTTP_200_OK,
 )
-def delete_product(uuid: str, db: Session = Depends(auth)):
+async def delete_product(uuid: str, db: Session = Depends(auth)):
     """Delete a registered product."""
-    if product := repo.get_product_by_uuid(db=db, uuid=uuid):
+    if product := await execute(db, repo.get_product_by_uuid, uuid=uuid):
         if product.taken:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Cannot delete products already taken.",
             )
-        repo.delete_product(db=db, product=product)
+        await execute(db, repo.delete_product, product=product)
         return {
             "deleted": True,
             "product": product,
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.orm import Session
+
+from server.db import execute
+from server.db.repo import stats as repo
+from server.models import schemas
+from server.models.oauth2 import read_auth
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    summary="Get the leaderboard of moderators and owners.",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.Leaderboard,
+)
+async def get_leaderboard(
+    limit: int = Query(10, ge=1, le=100), db: Session = Depends(read_auth),
+):
+    """
+    Get the moderators and the owners with the most orders.
+
+    The statistics are kept up to date as the orders are created, so only
+    the top of each leaderboard is read, whatever the number of orders.
+    """
+    return {
+        "moderators": await execute(db, repo.get_top_moderators, limit=limit),
+        "owners": await execute(db, repo.get_top_owners, limit=limit),
+    }
@@ -0,0 +1,85 @@
+from datetime import datetime
+from test.unit.factories import OrderFactory, ProductFactory
+from test.unit.fixtures import Test
+from unittest.mock import MagicMock
+
+from server.db.repo.archive import (
+    delete_archived,
+    get_archivable_orders,
+    get_archivable_products,
+    notify_archived,
+)
+
+
+class TestGetArchivable(Test):
+    def test_should_lock_the_oldest_orders_with_their_products(self):
+        db = MagicMock()
+        query = db.query().join().options()
+
+        get_archivable_orders(db=db, before=datetime(2025, 1, 1), limit=10)
+
+        where = query.filter.call_args[0][0]
+        self.assertIn('"order".requested_at <', str(where))
+        query.filter().order_by().limit.assert_called_with(10)
+        self.assertTrue(
+            query.filter()
+            .order_by()
+            .limit()
+            .with_for_update.call_args.kwargs["skip_locked"]
+        )
+
+    def test_should_select_the_taken_products_without_orders(self):
+        db = MagicMock()
+
+        get_archivable_products(db=db, before=datetime(2025, 1, 1), limit=10)
+
+        where = " ".join(
+            str(clause) for clause in db.query().filter.call_args[0]
+        )
+        self.assertIn("product.taken IS", where)
+        self.assertIn("product.updated_at <", where)
+        self.assertIn("NOT (EXISTS", where)
+
+
+class TestDeleteArchived(Test):
+    def test_should_delete_the_orders_and_products_without_committing(self):
+        db = MagicMock()
+        orders = [OrderFactory(), OrderFactory()]
+
+        delete_archived(
+            db=db, orders=orders, products=[o.product for o in orders]
+        )
+
+        orders, products = [
+            str(call[0][0]) for call in db.execute.call_args_list
+        ]
+        self.assertIn('DELETE FROM "order" WHERE "order".id IN', orders)
+        self.assertIn("DELETE FROM product WHERE product.id IN", products)
+        self.assertIn("NOT (EXISTS", products)
+        self.assertIn("RETURNING product.id", products)
+        db.commit.assert_not_called()
+
+    def test_should_not_execute_anything_for_empty_batches(self):
+        db = MagicMock()
+
+        delete_archived(db=db, orders=[], products=[ProductFactory()])
+
+        self.assertEqual(1, db.execute.call_count)
+
+
+class TestNotifyArchived(Test):
+    def test_should_notify_the_workers_on_postgres(self):
+        db = MagicMock()
+        db.get_bind().dialect.name = "postgresql"
+
+        notify_archived(db=db)
+
+        self.assertIn("pg_notify", str(db.execute.call_args[0][0]))
+
+    def test_should_not_notify_with_other_databases(self):
+        db = MagicMock()
+        db.get_bind().dialect.name = "sqlite"
+
+        notify_archived(db=db)
+
+        db.execute.assert_not_called()
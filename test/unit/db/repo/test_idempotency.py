@@ -0,0 +1,92 @@
+from test.unit.fixtures import Test
+from unittest.mock import MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from server.db.repo.idempotency import claim_key, release_key, save_response
+
+
+def compile(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class TestClaimKey(Test):
+    def setUp(self) -> None:
+        self.db = MagicMock()
+        self.key = self.faker.uuid4()
+
+    def test_should_claim_the_key_when_it_is_inserted(self):
+        self.db.execute().scalar.return_value = 1
+        self.db.execute.reset_mock()
+
+        stored = claim_key(
+            db=self.db,
+            key=self.key,
+            uname="app",
+            request_hash="hash",
+            ttl=60,
+            wait=0.1,
+        )
+
+        self.assertIsNone(stored)
+        timeout, upsert, default = self.db.execute.call_args_list
+        self.assertEqual({"timeout": "100ms"}, timeout[0][1])
+        statement = compile(upsert[0][0])
+        self.assertIn("INSERT INTO idempotency_key", statement)
+        self.assertIn("(application_id, key, ", statement)
+        self.assertIn("SELECT application.id", statement)
+        self.assertIn(
+            "ON CONFLICT (application_id, key) DO UPDATE", statement
+        )
+        self.assertIn("WHERE idempotency_key.expires_at < now()", statement)
+        self.assertIn("RETURNING idempotency_key.id", statement)
+        self.assertEqual(
+            "SET LOCAL lock_timeout TO DEFAULT", str(default[0][0])
+        )
+        self.db.commit.assert_not_called()
+
+    def test_should_return_the_key_stored_when_it_is_not_expired(self):
+        self.db.execute().scalar.return_value = None
+        self.db.execute.reset_mock()
+
+        stored = claim_key(
+            db=self.db,
+            key=self.key,
+            uname="app",
+            request_hash="hash",
+            ttl=60,
+            wait=0.1,
+        )
+
+        self.assertEqual(self.db.execute().scalar_one(), stored)
+        select = compile(self.db.execute.call_args_list[2][0][0])
+        self.assertIn("FROM idempotency_key", select)
+        self.assertIn("WHERE idempotency_key.application_id = (", select)
+        self.assertIn("AND idempotency_key.key =", select)
+
+
+class TestSaveResponse(Test):
+    def test_should_store_the_response_and_purge_the_expired_keys(self):
+        db = MagicMock()
+
+        save_response(
+            db=db, key="key", uname="app", status_code=201, body=b"{}"
+        )
+
+        db.query().filter().update.assert_called_with(
+            {"status_code": 201, "body": b"{}"}, synchronize_session=False
+        )
+        purge = compile(db.execute.call_args[0][0])
+        self.assertIn("DELETE FROM idempotency_key", purge)
+        self.assertIn("LIMIT", purge)
+        self.assertIn("FOR UPDATE SKIP LOCKED", purge)
+        db.commit.assert_called_once()
+
+
+class TestReleaseKey(Test):
+    def test_should_rollback_the_claim(self):
+        db = MagicMock()
+
+        release_key(db=db)
+
+        db.rollback.assert_called_once()
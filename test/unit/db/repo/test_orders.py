@@ -4,10 +4,15 @@ from unittest.mock import MagicMock, patch
 
 from server.db import entities
 from server.db.repo.orders import (
+    claim_product,
     create_order_for_product,
     get_order_by_product_code,
+    get_order_by_uuid,
     get_orders,
-    get_orders_count,
+    get_orders_rows,
+    get_orders_version,
+    search_orders,
+    select_orders,
 )
 from server.models import schemas
 
@@ -48,7 +53,9 @@ class TestGetOrders(Test):
         get_orders(db=db)
 
         db.query.assert_called_with(entities.Order)
-        db.query().order_by.assert_called_with(desc_request_at)
+        db.query().order_by.assert_called_with(
+            desc_request_at, order_instance.id.desc()
+        )
         db_query.order_by().offset.assert_called_with(0)
         db_query.order_by().offset().limit.assert_called_with(50)
         db_query.order_by().offset().limit().all.assert_called_once()
@@ -76,7 +83,9 @@ class TestGetOrders(Test):
         get_orders(db=db, skip=skip, limit=limit, desc=False)
 
         db.query.assert_called_with(entities.Order)
-        db.query().order_by.assert_called_with(asc_request_at)
+        db.query().order_by.assert_called_with(
+            asc_request_at, order_instance.id.asc()
+        )
         db_query.order_by().offset.assert_called_with(skip)
         db_query.order_by().offset().limit.assert_called_with(limit)
         db_query.order_by().offset().limit().all.assert_called_once()
@@ -84,15 +93,157 @@ class TestGetOrders(Test):
         order_instance.requested_at.asc.assert_called_once()
         order_instance.requested_at.desc.assert_not_called()
 
+    def test_should_filter_the_orders_after_the_cursor(self):
+        db = MagicMock()
+        cursor = (self.faker.date_time(), self.faker.pyint())
+
+        get_orders(db=db, cursor=cursor)
+
+        db.query().order_by().filter.assert_called_once()
+        db.query().order_by().filter().offset().limit().all.assert_called_once()  # noqa
 
-class TestGetOrdersCount(Test):
-    def test_should_count_the_orders_entities(self):
+
+class TestGetOrdersRows(Test):
+    def test_should_select_the_order_and_product_columns_joined(self):
         db = MagicMock()
 
-        get_orders_count(db=db)
+        get_orders_rows(db=db, moderator=self.faker.user_name())
 
-        db.query.assert_called_with(entities.Order)
-        db.query().count.assert_called_once()
+        statement = str(db.execute.call_args[0][0])
+        self.assertIn("product.code AS product_code", statement)
+        self.assertIn("JOIN product", statement)
+        self.assertIn('WHERE "order".mod_display_name =', statement)
+        self.assertIn('ORDER BY "order".requested_at DESC', statement)
+
+    def test_should_apply_the_period_filter_when_specified(self):
+        db = MagicMock()
+
+        get_orders_rows(
+            db=db,
+            since=self.faker.date_time(),
+            until=self.faker.date_time(),
+        )
+
+        statement = str(db.execute.call_args[0][0])
+        self.assertIn('"order".requested_at >=', statement)
+        self.assertIn('"order".requested_at <', statement)
+
+    def test_should_nest_the_product_columns(self):
+        db = MagicMock()
+        row = {
+            "id": 1,
+            "uuid": self.faker.uuid4(),
+            "mod_id": "1",
+            "mod_display_name": "mod",
+            "owner_display_name": "owner",
+            "requested_at": self.faker.date_time(),
+            "product_id": 2,
+            "product_code": "code",
+            "product_summary": "summary",
+            "product_uuid": self.faker.uuid4(),
+            "product_taken": True,
+            "product_created_at": self.faker.date_time(),
+            "product_updated_at": None,
+        }
+        db.execute().mappings.return_value = [row]
+
+        orders = get_orders_rows(db=db)
+
+        self.assertEqual(1, orders[0]["id"])
+        self.assertEqual("owner", orders[0]["owner_display_name"])
+        self.assertEqual(
+            {
+                "id",
+                "code",
+                "summary",
+                "uuid",
+                "taken",
+                "created_at",
+                "updated_at",
+            },
+            set(orders[0]["product"]),
+        )
+        self.assertEqual("code", orders[0]["product"]["code"])
+        self.assertNotIn("product_code", orders[0])
+
+
+class TestSelectOrders(Test):
+    def test_should_select_the_orders_with_their_products_in_order(self):
+        statement = str(select_orders())
+
+        self.assertIn("JOIN product", statement)
+        self.assertNotIn("WHERE", statement)
+        self.assertTrue(
+            statement.endswith('ORDER BY "order".requested_at, "order".id')
+        )
+
+    def test_should_apply_the_filters_when_specified(self):
+        statement = str(
+            select_orders(
+                moderator=self.faker.user_name(),
+                owner=self.faker.user_name(),
+                since=self.faker.date_time(),
+                until=self.faker.date_time(),
+            )
+        )
+
+        for condition in [
+            '"order".mod_display_name =',
+            '"order".owner_display_name =',
+            '"order".requested_at >=',
+            '"order".requested_at <',
+        ]:
+            self.assertIn(condition, statement)
+
+
+class TestSearchOrders(Test):
+    def test_should_search_both_participants_by_default(self):
+        db = MagicMock()
+
+        search_orders(db=db, query="mouse", limit=5)
+
+        score = str(db.query.call_args[0][1])
+        where = str(db.query().options().filter.call_args[0][0])
+        self.assertIn("greatest(word_similarity(", score)
+        self.assertIn('"order".owner_display_name %>', where)
+        self.assertIn('"order".mod_display_name %>', where)
+        db.query().options().filter().order_by().limit.assert_called_with(5)
+
+    def test_should_search_a_single_participant_when_specified(self):
+        db = MagicMock()
+
+        search_orders(db=db, query="mouse", participant="moderator")
+
+        score = str(db.query.call_args[0][1])
+        where = str(db.query().options().filter.call_args[0][0])
+        self.assertNotIn("greatest", score)
+        self.assertIn('"order".mod_display_name %>', where)
+        self.assertNotIn("owner_display_name", where)
+
+
+class TestGetOrdersVersion(Test):
+    def test_should_return_the_latest_order_or_product_change(self):
+        db = MagicMock()
+        requested_at = self.faker.date_time()
+        updated_at = self.faker.date_time()
+        db.query().select_from().one.return_value = (
+            10,
+            12,
+            requested_at,
+            updated_at,
+        )
+
+        self.assertEqual(
+            (10, 12, max(requested_at, updated_at)),
+            get_orders_version(db=db),
+        )
+        db.query().select_from.assert_called_with(entities.Order)
+
+    def test_should_return_no_change_without_orders(self):
+        db = MagicMock()
+        db.query().select_from().one.return_value = (0, None, None, None)
+
+        self.assertEqual((0, None, None), get_orders_version(db=db))
 
 
 class TestGetOrderByProductCode(Test):
@@ -105,12 +256,28 @@ class TestGetOrderByProductCode(Test):
         db.query.assert_called_with(entities.Order)
         db.query().join.assert_called_with(entities.Product)
         db.query().join().filter.assert_called_once()
-        db.query().join().filter().first.assert_called_once()
+        db.query().join().filter().options().first.assert_called_once()
+
+
+class TestGetOrderByUUID(Test):
+    def test_should_query_using_correct_parameters(self):
+        db = MagicMock()
+        uuid = self.faker.uuid4()
+
+        get_order_by_uuid(db=db, uuid=uuid)
+
+        db.query.assert_called_with(entities.Order)
+        db.query().filter_by.assert_called_with(uuid=uuid)
+        db.query().filter_by().first.assert_called_once()
 
 
 class TestCreateOrderForProduct(Test):
+    @patch("server.db.repo.orders.env")
     @patch("server.db.repo.orders.entities.Order")
-    def test_should_persist_and_mark_product_as_taken(self, order_instance):
+    def test_should_persist_and_mark_product_as_taken(
+        self, order_instance, env
+    ):
+        env.EAGER_DEFAULTS = False
         db = MagicMock()
         db_order = OrderFactory(product__taken=False)
         order_instance.return_value = db_order
@@ -127,5 +294,63 @@ class TestCreateOrderForProduct(Test):
         self.assertTrue(db_order.product.taken)
 
         db.add.assert_called_with(db_order)
+        self.assertEqual(2, db.execute.call_count)  # the stats upserts.
         db.commit.assert_called_once()
         db.refresh.assert_called_with(db_order)
+
+    @patch("server.db.repo.orders.env")
+    @patch("server.db.repo.orders.entities.Order")
+    def test_should_not_refresh_the_order_with_eager_defaults(
+        self, order_instance, env
+    ):
+        env.EAGER_DEFAULTS = True
+        db = MagicMock()
+        db_order = OrderFactory(product__taken=False)
+        order_instance.return_value = db_order
+
+        order = schemas.OrderCreation(
+            mod_id=db_order.mod_id,
+            mod_display_name=db_order.mod_display_name,
+            owner_display_name=db_order.owner_display_name,
+        )
+
+        create_order_for_product(db=db, product=db_order.product, order=order)
+
+        db.commit.assert_called_once()
+        db.refresh.assert_not_called()
+
+
+class TestClaimProduct(Test):
+    def setUp(self):
+        self.order = schemas.OrderCreation(
+            mod_id=self.faker.md5(),
+            mod_display_name=self.faker.user_name(),
+            owner_display_name=self.faker.user_name(),
+        )
+
+    def test_should_lock_the_product_skipping_the_locked_ones(self):
+        db = MagicMock()
+        query = db.query().filter().order_by().limit()
+        query.with_for_update().first.return_value = None
+
+        self.assertIsNone(claim_product(db=db, order=self.order))
+
+        db.query.assert_called_with(entities.Product)
+        query.with_for_update.assert_called_with(skip_locked=True)
+        db.add.assert_not_called()
+
+    @patch("server.db.repo.orders.create_order_for_product")
+    def test_should_create_the_order_for_the_locked_product(
+        self, create_order_for_product
+    ):
+        db = MagicMock()
+        product = MagicMock()
+        query = db.query().filter().order_by().limit()
+        query.with_for_update().first.return_value = product
+
+        order = claim_product(db=db, order=self.order)
+
+        self.assertEqual(create_order_for_product.return_value, order)
+        create_order_for_product.assert_called_with(
+            db=db, product=product, order=self.order
+        )
@@ -2,6 +2,9 @@ from test.unit.factories import ProductFactory
 from test.unit.fixtures import Test
 from unittest.mock import MagicMock, patch
 
+from sqlalchemy import exc
+from sqlalchemy.dialects import postgresql
+
 from server.db import entities
 from server.db.repo.products import (
     create_product,
@@ -9,7 +12,11 @@ from server.db.repo.products import (
     get_product_by_code,
     get_product_by_uuid,
     get_products,
-    get_products_count,
+    get_products_rows,
+    get_products_version,
+    import_products,
+    search_products,
+    select_products,
     update_product,
 )
 from server.models import schemas
@@ -45,17 +52,107 @@ class TestGetProducts(Test):
         )
         db.query().order_by().filter_by().offset().limit().all.assert_called_once()  # noqa
 
+    def test_should_filter_the_products_after_the_cursor(self):
+        db = MagicMock()
+        cursor = (self.faker.date_time(), self.faker.pyint())
+
+        get_products(db=db, cursor=cursor)
+
+        db.query().order_by().filter_by().filter.assert_called_once()
+        db.query().order_by().filter_by().filter().offset().limit().all.assert_called_once()  # noqa
+
+
+class TestGetProductsRows(Test):
+    def test_should_select_only_the_product_columns_in_order(self):
+        db = MagicMock()
+
+        get_products_rows(db=db, taken=True, desc=False)
+
+        statement = str(db.execute.call_args[0][0])
+        self.assertTrue(
+            statement.startswith("SELECT product.id, product.code")
+        )
+        self.assertIn("WHERE product.taken =", statement)
+        self.assertIn("ORDER BY product.created_at ASC", statement)
+        self.assertIn("LIMIT", statement)
 
-class TestGetProductsCount(Test):
-    def test_should_query_product_count_for_all_taken_and_available(self):
+    def test_should_return_the_rows_as_dicts(self):
         db = MagicMock()
+        product = {"id": self.faker.pyint(), "code": self.faker.pystr()}
+        db.execute().mappings.return_value = [product]
 
-        get_products_count(db=db)
+        self.assertEqual([product], get_products_rows(db=db))
 
-        db.query().count.assert_called_once()
-        db.query().filter_by.assert_any_call(taken=False)
-        db.query().filter_by.assert_any_call(taken=True)
-        self.assertEqual(2, db.query().filter_by().count.call_count)
+
+class TestSelectProducts(Test):
+    def test_should_select_all_the_products_in_order(self):
+        statement = str(select_products())
+
+        self.assertNotIn("WHERE", statement)
+        self.assertTrue(
+            statement.endswith("ORDER BY product.created_at, product.id")
+        )
+
+    def test_should_apply_the_filters_when_specified(self):
+        statement = str(
+            select_products(
+                taken=False,
+                since=self.faker.date_time(),
+                until=self.faker.date_time(),
+            )
+        )
+
+        for condition in [
+            "product.taken =",
+            "product.created_at >=",
+            "product.created_at <",
+        ]:
+            self.assertIn(condition, statement)
+
+
+class TestSearchProducts(Test):
+    def test_should_rank_the_similar_summaries(self):
+        db = MagicMock()
+
+        search_products(db=db, query="legend", limit=5)
+
+        score = db.query.call_args[0][1]
+        where = db.query().filter.call_args[0][0]
+        self.assertIn("word_similarity(", str(score))
+        self.assertIn("product.summary %>", str(where))
+        db.query().filter().order_by().limit.assert_called_with(5)
+
+    def test_should_apply_taken_filter_when_specified(self):
+        db = MagicMock()
+
+        search_products(db=db, query="legend", taken=True)
+
+        where = db.query().filter().filter.call_args[0][0]
+        self.assertIn("product.taken IS", str(where))
+
+
+class TestGetProductsVersion(Test):
+    def test_should_query_the_counters_and_the_last_change(self):
+        db = MagicMock()
+        updated_at = self.faker.date_time()
+        db.query().select_from().one.return_value = (10, 7, 3, 12, updated_at)
+
+        self.assertEqual(
+            (10, 7, 3, 12, updated_at), get_products_version(db=db)
+        )
+        db.query().select_from.assert_called_with(entities.Product)
+
+    @patch("server.db.repo.products.env")
+    def test_should_read_the_counter_table_when_it_is_enabled(self, env):
+        env.PRODUCT_COUNTER = True
+        db = MagicMock()
+        updated_at = self.faker.date_time()
+        db.query().one.return_value = (10, 3, 12, updated_at)
+
+        self.assertEqual(
+            (10, 7, 3, 12, updated_at), get_products_version(db=db)
+        )
+        db.query().select_from.assert_not_called()
 
 
 class TestGetProductByUUID(Test):
@@ -68,6 +165,14 @@ class TestGetProductByUUID(Test):
         db.query.assert_called_with(entities.Product)
         db.query().filter_by.assert_called_with(uuid=uuid)
         db.query().filter_by().first.assert_called_once()
+        db.query().filter_by().with_for_update.assert_not_called()
+
+    def test_should_lock_the_product_for_update(self):
+        db = MagicMock()
+
+        get_product_by_uuid(db=db, uuid=self.faker.uuid4(), for_update=True)
+
+        db.query().filter_by().with_for_update().first.assert_called_once()
 
 
 class TestGetProductByCode(Test):
@@ -83,55 +188,102 @@ class TestGetProductByCode(Test):
 
 
 class TestCreateProduct(Test):
-    @patch("server.db.repo.products.entities.Product")
-    def test_should_add_commit_and_refresh_the_created_object(
-        self, product_instance
-    ):
-        creation_schema = schemas.ProductCreation(
+    def setUp(self) -> None:
+        self.schema = schemas.ProductCreation(
             code=self.faker.md5(), summary=self.faker.word()
         )
-        product_instance.return_value = ProductFactory(
-            code=creation_schema.code, summary=creation_schema.summary
+        self.db = MagicMock()
+
+    def test_should_insert_and_return_the_product_in_one_statement(self):
+        row = {"code": self.schema.code, "summary": self.schema.summary}
+        self.db.execute().mappings().first.return_value = row
+        self.db.execute.reset_mock()
+
+        product = create_product(db=self.db, product=self.schema)
+
+        self.assertEqual(row, product)
+        self.db.execute.assert_called_once()
+        statement = str(
+            self.db.execute.call_args[0][0].compile(
+                dialect=postgresql.dialect()
+            )
         )
-        db = MagicMock()
+        self.assertIn("INSERT INTO product", statement)
+        self.assertIn("ON CONFLICT (code) DO NOTHING", statement)
+        self.assertIn("RETURNING product.id, product.code", statement)
+        self.db.commit.assert_called_once()
+        self.db.refresh.assert_not_called()
 
-        product = create_product(db=db, product=creation_schema)
-        db.add.assert_called_with(product_instance())
-        db.commit.assert_called_once()
-        db.refresh.assert_called_with(product_instance())
-        self.assertEqual(product_instance(), product)
+    def test_should_return_none_when_the_code_is_in_use(self):
+        self.db.execute().mappings().first.return_value = None
+
+        self.assertIsNone(create_product(db=self.db, product=self.schema))
 
 
 class TestUpdateProduct(Test):
-    def test_should_change_the_product_code_and_commit(self):
-        product = schemas.ProductUpdate(code=self.faker.md5())
-        db_product = ProductFactory()
-        db = MagicMock()
+    def setUp(self) -> None:
+        self.uuid = self.faker.uuid4()
+        self.db = MagicMock()
+
+    def statement(self) -> str:
+        return str(
+            self.db.execute.call_args[0][0].compile(
+                dialect=postgresql.dialect()
+            )
+        )
+
+    def test_should_change_the_product_code_in_one_statement(self):
+        row = {"code": "code"}
+        self.db.execute().mappings().first.return_value = row
+        self.db.execute.reset_mock()
 
         updated_product = update_product(
-            db=db, product=product, db_product=db_product
+            db=self.db,
+            uuid=self.uuid,
+            product=schemas.ProductUpdate(code="code"),
         )
 
-        self.assertEqual(updated_product.code, product.code)
-        self.assertEqual(updated_product.summary, db_product.summary)
-        db.commit.assert_called_once()
-
-    def test_should_change_the_product_summary_when_it_is_specified_and_commit(
-        self,
-    ):
-        product = schemas.ProductUpdate(
-            code=self.faker.md5(), summary=self.faker.word()
+        self.assertEqual(row, updated_product)
+        self.db.execute.assert_called_once()
+        statement = self.statement()
+        self.assertIn("UPDATE product SET code=", statement)
+        self.assertNotIn("summary=", statement)
+        self.assertIn("product.taken IS false", statement)
+        self.assertIn("RETURNING product.id", statement)
+        self.db.commit.assert_called_once()
+
+    def test_should_change_the_product_summary_when_it_is_specified(self):
+        update_product(
+            db=self.db,
+            uuid=self.uuid,
+            product=schemas.ProductUpdate(code="code", summary="summary"),
         )
-        db_product = ProductFactory()
-        db = MagicMock()
 
-        updated_product = update_product(
-            db=db, product=product, db_product=db_product
+        self.assertIn("summary=", self.statement())
+
+    def test_should_return_none_when_no_product_is_updated(self):
+        self.db.execute().mappings().first.return_value = None
+
+        self.assertIsNone(
+            update_product(
+                db=self.db,
+                uuid=self.uuid,
+                product=schemas.ProductUpdate(code="code"),
+            )
         )
 
-        self.assertEqual(updated_product.code, product.code)
-        self.assertEqual(updated_product.summary, product.summary)
-        db.commit.assert_called_once()
+    def test_should_rollback_when_the_code_is_in_use(self):
+        self.db.execute.side_effect = exc.IntegrityError("UPDATE", {}, None)
+
+        with self.assertRaises(exc.IntegrityError):
+            update_product(
+                db=self.db,
+                uuid=self.uuid,
+                product=schemas.ProductUpdate(code="code"),
+            )
+
+        self.db.rollback.assert_called_once()
+        self.db.commit.assert_not_called()
 
 
 class TestDeleteProduct(Test):
@@ -143,3 +295,46 @@ class TestDeleteProduct(Test):
 
         db.delete.assert_called_with(product)
         db.commit.assert_called_once()
+
+
+class TestImportProducts(Test):
+    def setUp(self):
+        self.products = [
+            schemas.ProductImport(
+                code=self.faker.md5(), summary=self.faker.word()
+            )
+            for _ in range(3)
+        ]
+
+    def test_should_insert_all_the_products_in_a_single_statement(self):
+        db = MagicMock()
+        db.connection().dialect.driver = "asyncpg"
+        db.execute().rowcount = 2
+
+        self.assertEqual(2, import_products(db=db, products=self.products))
+
+        statement = db.execute.call_args.args[0]
+        self.assertIn("ON CONFLICT (code) DO NOTHING", str(statement))
+        db.commit.assert_not_called()
+
+    @patch("server.db.repo.products.MAX_PARAMETERS", 14)
+    def test_should_split_the_insert_by_the_parameters_limit(self):
+        db = MagicMock()
+        db.connection().dialect.driver = "asyncpg"
+        db.execute.return_value.rowcount = 1
+
+        # 7 columns per product, so 2 products per statement.
+        self.assertEqual(2, import_products(db=db, products=self.products))
+        self.assertEqual(2, db.execute.call_count)
+
+    @patch("server.db.repo.products.copy_products")
+    def test_should_copy_the_products_when_the_driver_is_psycopg2(
+        self, copy_products
+    ):
+        db = MagicMock()
+        db.connection().dialect.driver = "psycopg2"
+
+        inserted = import_products(db=db, products=self.products)
+
+        self.assertEqual(copy_products.return_value, inserted)
+        copy_products.assert_called_with(db, self.products)
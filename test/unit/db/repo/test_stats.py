@@ -0,0 +1,47 @@
+from test.unit.fixtures import Test
+from unittest.mock import MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from server.db.repo.stats import (
+    get_top_moderators,
+    get_top_owners,
+    record_order,
+)
+from server.models import schemas
+
+
+class TestRecordOrder(Test):
+    def test_should_upsert_the_moderator_and_owner_stats(self):
+        db = MagicMock()
+        order = schemas.OrderCreation(
+            mod_id=self.faker.md5(),
+            mod_display_name=self.faker.user_name(),
+            owner_display_name=self.faker.user_name(),
+        )
+
+        record_order(db=db, order=order)
+
+        moderator, owner = [
+            str(call[0][0].compile(dialect=postgresql.dialect()))
+            for call in db.execute.call_args_list
+        ]
+        self.assertIn("INSERT INTO moderator_stats", moderator)
+        self.assertIn("ON CONFLICT (mod_id) DO UPDATE", moderator)
+        self.assertIn("orders = (moderator_stats.orders +", moderator)
+        self.assertIn("INSERT INTO owner_stats", owner)
+        self.assertIn("ON CONFLICT (owner_display_name) DO UPDATE", owner)
+        db.commit.assert_not_called()
+
+
+class TestGetTop(Test):
+    def test_should_read_the_most_orders_first(self):
+        for get_top in [get_top_moderators, get_top_owners]:
+            db = MagicMock()
+
+            get_top(db=db, limit=5)
+
+            order_by = db.query().order_by.call_args[0]
+            self.assertIn("orders DESC", str(order_by[0]))
+            self.assertIn("last_order_at DESC", str(order_by[1]))
+            db.query().order_by().limit.assert_called_with(5)
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+from test.unit.factories import ApplicationFactory
+from test.unit.fixtures import Test, TestDatabase
+from unittest.mock import MagicMock, patch
+
+from server.db import entities
+from server.db.repo.tokens import (
+    create_refresh_token,
+    get_app_by_refresh_token,
+    purge_refresh_tokens,
+    revoke_refresh_token,
+)
+from server.models.security import hash_token
+
+
+class TestCreateRefreshToken(Test):
+    @patch("server.db.repo.tokens.purge_refresh_tokens")
+    @patch("server.db.repo.tokens.entities.RefreshToken")
+    def test_should_persist_only_the_token_hash(self, refresh_token, purge):
+        db = MagicMock()
+        app = ApplicationFactory()
+
+        token = create_refresh_token(db=db, app=app)
+
+        purge.assert_called_with(db=db, app=app)
+        kwargs = refresh_token.call_args.kwargs
+        self.assertEqual(hash_token(token), kwargs["token_hash"])
+        self.assertEqual(app, kwargs["application"])
+        db.add.assert_called_with(refresh_token())
+        db.commit.assert_called_once()
+
+
+class TestPurgeRefreshTokens(TestDatabase):
+    def setUp(self):
+        super().setUp()
+        self.persist(ApplicationFactory(id=1), ApplicationFactory(id=2))
+        self.app = entities.Application(id=1)
+
+    def token(self, app_id: int = 1, **kwargs) -> entities.RefreshToken:
+        kwargs.setdefault("expires_at", datetime.utcnow() + timedelta(1))
+        return entities.RefreshToken(
+            token_hash=self.faker.sha256(), application_id=app_id, **kwargs
+        )
+
+    def hashes(self):
+        return {
+            token.token_hash
+            for token in self.db.query(entities.RefreshToken).all()
+        }
+
+    def test_should_delete_the_expired_and_revoked_tokens(self):
+        kept = [self.token(), self.token(2, revoked=True)]
+        hashes = {token.token_hash for token in kept}
+        self.persist(
+            *kept,
+            self.token(revoked=True),
+            self.token(expires_at=datetime.utcnow()),
+        )
+
+        self.assertEqual(2, purge_refresh_tokens(db=self.db, app=self.app))
+        self.assertEqual(hashes, self.hashes())
+
+    @patch("server.db.repo.tokens.env")
+    def test_should_keep_room_for_a_new_token_under_the_limit(self, env):
+        env.REFRESH_TOKEN_LIMIT = 3
+        tokens = [self.token() for _ in range(4)]
+        hashes = {token.token_hash for token in tokens[2:]}
+        self.persist(*tokens)
+
+        self.assertEqual(2, purge_refresh_tokens(db=self.db, app=self.app))
+        self.assertEqual(hashes, self.hashes())
+
+
+class TestGetAppByRefreshToken(Test):
+    def test_should_query_the_application_joined_with_the_token(self):
+        db = MagicMock()
+
+        get_app_by_refresh_token(db=db, token=self.faker.sha256())
+
+        db.query.assert_called_with(entities.Application)
+        db.query().join.assert_called_with(entities.RefreshToken)
+        db.query().join().filter.assert_called_once()
+        db.query().join().filter().first.assert_called_once()
+
+
+class TestRevokeRefreshToken(Test):
+    def test_should_mark_the_token_as_revoked_and_commit(self):
+        db = MagicMock()
+        token = self.faker.sha256()
+        db.query().filter_by().filter().update.return_value = 1
+
+        self.assertTrue(revoke_refresh_token(db=db, token=token, uname="a"))
+
+        db.query.assert_called_with(entities.RefreshToken)
+        db.query().filter_by.assert_called_with(
+            token_hash=hash_token(token), revoked=False
+        )
+        db.commit.assert_called_once()
+
+    def test_should_return_false_when_no_token_was_revoked(self):
+        db = MagicMock()
+        db.query().filter_by().filter().update.return_value = 0
+
+        self.assertFalse(
+            revoke_refresh_token(db=db, token="unknown", uname="a")
+        )
+
+
+class TestRevokeRefreshTokenOwner(TestDatabase):
+    def test_should_not_revoke_the_tokens_of_other_applications(self):
+        app, other = ApplicationFactory(id=1), ApplicationFactory(id=2)
+        unames = app.username, other.username
+        token = self.faker.sha256()
+        self.persist(
+            app,
+            other,
+            entities.RefreshToken(
+                token_hash=hash_token(token),
+                application_id=1,
+                expires_at=datetime.utcnow() + timedelta(1),
+            ),
+        )
+
+        self.assertFalse(
+            revoke_refresh_token(db=self.db, token=token, uname=unames[1])
+        )
+        self.assertTrue(
+            revoke_refresh_token(db=self.db, token=token, uname=unames[0])
+        )
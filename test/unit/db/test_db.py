@@ -1,7 +1,42 @@
-from test.unit.fixtures import Test
-from unittest.mock import patch
+from test.unit.fixtures import Test, TestAsync
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from server.db import open_session
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.db import (
+    NOTIFY_LISTINGS,
+    check_replica,
+    connect_args,
+    execute,
+    open_primary_session,
+    open_read_session,
+    open_session,
+    stream,
+    uses_replica,
+)
+
+
+class TestConnectArgs(Test):
+    @patch("server.db.env")
+    def test_should_enable_the_notifications_when_caching(self, env):
+        env.RESPONSE_CACHE = True
+
+        self.assertEqual(
+            {"options": f"-c {NOTIFY_LISTINGS}=on"},
+            connect_args("postgresql://localhost/micebot"),
+        )
+        self.assertEqual(
+            {"server_settings": {NOTIFY_LISTINGS: "on"}},
+            connect_args("postgresql+asyncpg://localhost/micebot"),
+        )
+        self.assertEqual({}, connect_args("sqlite://"))
+
+    @patch("server.db.env")
+    def test_should_not_notify_without_caching(self, env):
+        env.RESPONSE_CACHE = False
+
+        self.assertEqual({}, connect_args("postgresql://localhost/micebot"))
 
 
 class TestSession(Test):
@@ -12,3 +47,149 @@ class TestSession(Test):
     ):
         db = next(open_session())
         db.close.assert_called_once()
+
+
+class TestReadSession(Test):
+    @patch("server.db.ReplicaSessionLocal", None)
+    @patch("server.db.SessionLocal")
+    def test_should_use_the_primary_when_there_is_no_replica(
+        self, session_local
+    ):
+        self.assertEqual(session_local(), next(open_read_session()))
+
+    @patch("server.db.check_replica", return_value=True)
+    @patch("server.db.ReplicaSessionLocal")
+    def test_should_use_the_replica_when_it_is_fresh(
+        self, replica_session_local, _
+    ):
+        self.assertEqual(replica_session_local(), next(open_read_session()))
+
+    @patch("server.db.check_replica", return_value=False)
+    @patch("server.db.ReplicaSessionLocal")
+    @patch("server.db.SessionLocal")
+    def test_should_use_the_primary_when_the_replica_is_stale(
+        self, session_local, replica_session_local, _
+    ):
+        self.assertEqual(session_local(), next(open_read_session()))
+        replica_session_local.assert_not_called()
+
+
+class TestCheckReplica(Test):
+    @patch("server.db.replica")
+    @patch("server.db.replica_engine", create=True)
+    def test_should_update_the_guard_with_the_replica_lag(
+        self, replica_engine, replica
+    ):
+        replica.should_check.return_value = True
+        connection = replica_engine.connect().__enter__()
+        connection.execute().scalar.return_value = 0.5
+
+        self.assertEqual(replica.use_replica(), check_replica())
+        replica.update.assert_called_with(0.5)
+
+    @patch("server.db.replica")
+    @patch("server.db.replica_engine", create=True)
+    def test_should_mark_the_replica_unreachable_on_errors(
+        self, replica_engine, replica
+    ):
+        replica.should_check.return_value = True
+        replica_engine.connect.side_effect = exc.OperationalError("", {}, "")
+
+        check_replica()
+
+        replica.update.assert_called_with(None, reachable=False)
+
+    @patch("server.db.replica")
+    @patch("server.db.replica_engine", create=True)
+    def test_should_not_query_the_replica_until_the_next_check(
+        self, replica_engine, replica
+    ):
+        replica.should_check.return_value = False
+
+        check_replica()
+
+        replica_engine.connect.assert_not_called()
+        replica.update.assert_not_called()
+
+
+class TestUsesReplica(Test):
+    @patch("server.db.engines", {"primary": "p", "replica": "r"})
+    def test_should_tell_the_sessions_connected_to_the_replica(self):
+        self.assertTrue(uses_replica(MagicMock(bind="r")))
+        self.assertFalse(uses_replica(MagicMock(bind="p")))
+
+    @patch("server.db.engines", {"replica_async": "r"})
+    def test_should_compare_the_sync_engine_of_async_sessions(self):
+        db = MagicMock(spec=AsyncSession)
+        db.bind = MagicMock(sync_engine="r")
+
+        self.assertTrue(uses_replica(db))
+
+
+class TestOpenPrimarySession(TestAsync):
+    @patch("server.db.SessionLocal")
+    async def test_should_open_and_close_a_sync_session(self, session_local):
+        async with open_primary_session(MagicMock()) as primary:
+            self.assertEqual(session_local(), primary)
+
+        primary.close.assert_called_once()
+
+    @patch("server.db.AsyncSessionLocal", create=True)
+    async def test_should_open_an_async_session(self, session_local):
+        async with open_primary_session(MagicMock(spec=AsyncSession)) as db:
+            self.assertEqual(session_local().__aenter__.return_value, db)
+
+
+class TestExecute(TestAsync):
+    async def test_should_call_the_function_with_the_sync_session(self):
+        db = MagicMock()
+        fn = MagicMock()
+
+        result = await execute(db, fn, code="code")
+
+        fn.assert_called_with(db=db, code="code")
+        self.assertEqual(fn(), result)
+
+    async def test_should_call_the_function_through_run_sync_for_async_sessions(  # noqa
+        self,
+    ):
+        db = MagicMock(spec=AsyncSession)
+        sync_db = MagicMock()
+        db.run_sync = AsyncMock(side_effect=lambda call: call(sync_db))
+        fn = MagicMock()
+
+        result = await execute(db, fn, code="code")
+
+        db.run_sync.assert_awaited_once()
+        fn.assert_called_with(db=sync_db, code="code")
+        self.assertEqual(fn(), result)
+
+
+class TestStream(TestAsync):
+    async def test_should_fetch_the_partitions_from_the_sync_session(self):
+        db = MagicMock()
+        statement = MagicMock()
+        partitions = [[1, 2], [3]]
+        db.execute().scalars().partitions.return_value = iter(partitions)
+
+        result = [p async for p in stream(db, statement, size=2)]
+
+        self.assertEqual(partitions, result)
+        statement.execution_options.assert_called_with(yield_per=2)
+        db.execute.assert_called_with(statement.execution_options())
+
+    async def test_should_fetch_the_partitions_from_the_async_session(self):
+        async def fetch():
+            yield [1, 2]
+            yield [3]
+
+        db = MagicMock(spec=AsyncSession)
+        statement = MagicMock()
+        result = MagicMock()
+        result.scalars().partitions.return_value = fetch()
+        db.stream = AsyncMock(return_value=result)
+
+        result = [p async for p in stream(db, statement, size=2)]
+
+        self.assertEqual([[1, 2], [3]], result)
+        db.stream.assert_awaited_with(statement.execution_options())
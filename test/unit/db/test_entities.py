@@ -2,6 +2,11 @@ from test.unit.factories import ApplicationFactory
 from test.unit.fixtures import Test
 from unittest.mock import patch
 
+from sqlalchemy import FetchedValue, inspect
+
+from server.db.entities import Order, Product
+from server.env import env
+
 
 class TestApplication(Test):
     @patch("server.db.entities.pw_context.hash")
@@ -28,3 +33,15 @@ class TestApplication(Test):
 
         self.assertFalse(app.check_password(plain_password))
         verifiy.assert_called_with(plain_password, app.pass_hash)
+
+
+class TestEagerDefaults(Test):
+    def test_should_fetch_the_generated_columns_with_the_writes(self):
+        self.assertEqual(env.EAGER_DEFAULTS, inspect(Order).eager_defaults)
+        self.assertEqual(env.EAGER_DEFAULTS, inspect(Product).eager_defaults)
+        self.assertIsInstance(
+            Order.__table__.c.requested_at.server_default, FetchedValue
+        )
+        self.assertIsInstance(
+            Product.__table__.c.updated_at.server_onupdate, FetchedValue
+        )
@@ -0,0 +1,30 @@
+from test.unit.fixtures import TestPostgres
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from server.db.repo.idempotency import claim_key
+
+
+class TestIdempotencyKeyApplication(TestPostgres):
+    def claim(self, uname: str):
+        return claim_key(
+            db=Session(bind=self.connection),
+            key="key",
+            uname=uname,
+            request_hash=uname,
+            ttl=60,
+            wait=0.1,
+        )
+
+    def test_should_claim_the_same_key_for_each_application(self):
+        self.connection.execute(
+            text(
+                "INSERT INTO application (username, pass_hash) "
+                "VALUES ('first', 'hash'), ('second', 'hash')"
+            )
+        )
+
+        self.assertIsNone(self.claim("first"))
+        self.assertIsNone(self.claim("second"))
+        self.assertEqual("first", self.claim("first").request_hash)
@@ -0,0 +1,72 @@
+from test.unit.fixtures import Test
+from types import SimpleNamespace
+from typing import NoReturn
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import exc
+
+from server.db.listener import Listener
+
+
+class TestListener(Test):
+    def setUp(self) -> NoReturn:
+        self.payloads = []
+        self.listener = Listener(
+            "postgresql://localhost/micebot",
+            "channel",
+            self.payloads.append,
+            timeout=0.01,
+        )
+        self.listener.engine = MagicMock()
+        self.dbapi = self.listener.engine.raw_connection().connection
+
+    @patch("server.db.listener.select")
+    def test_should_call_back_with_every_notification(self, select):
+        select.return_value = ([self.dbapi], [], [])
+
+        def poll():
+            self.dbapi.notifies = [
+                SimpleNamespace(payload="product"),
+                SimpleNamespace(payload="order"),
+            ]
+            self.listener._stopped.set()
+
+        self.dbapi.notifies = []
+        self.dbapi.poll.side_effect = poll
+
+        self.listener._run()
+
+        self.assertEqual(["product", "order"], self.payloads)
+        self.assertEqual(2, self.listener.notifications)
+        self.dbapi.cursor().__enter__().execute.assert_called_with(
+            'LISTEN "channel"'
+        )
+        self.listener.engine.raw_connection().close.assert_called_once()
+
+    @patch("server.db.listener.select")
+    def test_should_call_back_with_none_when_the_connection_is_lost(
+        self, select
+    ):
+        def lose(*_):
+            self.listener._stopped.set()
+            raise exc.OperationalError("LISTEN", {}, Exception())
+
+        select.side_effect = lose
+
+        self.listener._run()
+
+        self.assertEqual([None], self.payloads)
+        self.assertFalse(self.listener.listening)
+        self.assertEqual(
+            {"listening": False, "notifications": 0, "reconnections": 1},
+            self.listener.stats(),
+        )
+
+    def test_should_stop_the_thread(self):
+        self.listener.engine.raw_connection.side_effect = OSError()
+
+        self.listener.start()
+        self.listener.stop()
+
+        self.assertIsNone(self.listener._thread)
+        self.assertEqual([], self.payloads)
@@ -0,0 +1,29 @@
+from test.unit.fixtures import TestPostgres
+from uuid import uuid4
+
+from sqlalchemy import exc, text
+
+INSERT_ORDER = text(
+    'INSERT INTO "order" '
+    "(uuid, mod_id, mod_display_name, owner_display_name, requested_at, "
+    "product_id) VALUES (:uuid, 'mod', 'mod', 'owner', now(), :product_id)"
+)
+
+
+class TestOrderProductUnique(TestPostgres):
+    def test_should_refuse_a_second_order_for_the_product(self):
+        product_id = self.connection.execute(
+            text(
+                "INSERT INTO product (uuid, code, summary, taken) "
+                "VALUES (:uuid, :code, 'summary', true) RETURNING id"
+            ),
+            {"uuid": uuid4(), "code": uuid4().hex},
+        ).scalar()
+        self.connection.execute(
+            INSERT_ORDER, {"uuid": uuid4(), "product_id": product_id}
+        )
+
+        with self.assertRaisesRegex(exc.IntegrityError, "already has"):
+            self.connection.execute(
+                INSERT_ORDER, {"uuid": uuid4(), "product_id": product_id}
+            )
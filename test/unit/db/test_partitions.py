@@ -0,0 +1,54 @@
+from test.unit.fixtures import Test
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import exc
+
+from server.db.partitions import create_order_partitions, prepare_partitions
+
+
+class TestCreateOrderPartitions(Test):
+    def test_should_create_the_partitions_ahead_and_commit(self):
+        db = MagicMock()
+        db.execute().scalar.return_value = 2
+
+        self.assertEqual(2, create_order_partitions(db=db, months=3))
+
+        statement, params = db.execute.call_args[0]
+        self.assertIn("create_order_partitions(", str(statement))
+        self.assertEqual({"months": 3}, params)
+        db.commit.assert_called_once()
+
+
+class TestPreparePartitions(Test):
+    @patch("server.db.partitions.create_order_partitions")
+    @patch("server.db.partitions.SessionLocal")
+    def test_should_create_the_partitions_with_postgres(
+        self, session_local, create_order_partitions
+    ):
+        prepare_partitions()
+
+        create_order_partitions.assert_called_with(session_local(), 3)
+        session_local().close.assert_called_once()
+
+    @patch("server.db.partitions.create_order_partitions")
+    @patch("server.db.partitions.SessionLocal")
+    def test_should_not_fail_the_startup_on_database_errors(
+        self, session_local, create_order_partitions
+    ):
+        create_order_partitions.side_effect = exc.ProgrammingError(
+            "SELECT create_order_partitions()", {}, Exception()
+        )
+
+        with self.assertLogs("server.db.partitions", "WARNING"):
+            prepare_partitions()
+
+        session_local().close.assert_called_once()
+
+    @patch("server.db.partitions.SessionLocal")
+    def test_should_skip_the_other_databases(self, session_local):
+        with patch(
+            "server.db.partitions.env.DATABASE_URL", "sqlite:///micebot.db"
+        ):
+            prepare_partitions()
+
+        session_local.assert_not_called()
@@ -0,0 +1,58 @@
+from test.unit.fixtures import Test
+from typing import NoReturn
+
+from sqlalchemy import create_engine, exc
+
+from server.db.pool import InstrumentedQueuePool
+
+
+class TestInstrumentedQueuePool(Test):
+    def setUp(self) -> NoReturn:
+        self.engine = create_engine(
+            "sqlite://",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=1,
+            pool_timeout=0.01,
+        )
+
+    def tearDown(self) -> NoReturn:
+        self.engine.dispose()
+
+    def test_should_count_the_checkouts_and_the_overflow(self):
+        first = self.engine.connect()
+        second = self.engine.connect()
+
+        stats = self.engine.pool.statistics()
+        self.assertEqual(2, stats["checkouts"])
+        self.assertEqual(2, stats["checked_out"])
+        self.assertEqual(1, stats["overflow"])
+        self.assertEqual(1, stats["peak_overflow"])
+        self.assertEqual(0, stats["timeouts"])
+
+        first.close()
+        second.close()
+        self.assertEqual(0, self.engine.pool.statistics()["checked_out"])
+
+    def test_should_count_the_timeouts_and_the_wait_time(self):
+        connections = [self.engine.connect(), self.engine.connect()]
+
+        with self.assertRaises(exc.TimeoutError):
+            self.engine.connect()
+
+        stats = self.engine.pool.statistics()
+        self.assertEqual(3, stats["checkouts"])
+        self.assertEqual(1, stats["timeouts"])
+        self.assertGreaterEqual(stats["max_wait_time"], 0.01)
+        self.assertGreaterEqual(stats["wait_time"], stats["max_wait_time"])
+
+        for connection in connections:
+            connection.close()
+
+    def test_should_keep_the_statistics_when_the_pool_is_recreated(self):
+        self.engine.connect().close()
+        stats = self.engine.pool.stats
+
+        self.engine.dispose()
+
+        self.assertIs(stats, self.engine.pool.stats)
@@ -0,0 +1,48 @@
+from importlib.util import module_from_spec, spec_from_file_location
+from pathlib import Path
+from test.unit.fixtures import TestPostgres
+from uuid import uuid4
+
+from sqlalchemy import text
+
+import server
+
+
+def load_migration(name: str):
+    path = Path(server.__file__).parent / "db/migrations/versions" / name
+    spec = spec_from_file_location(path.stem, path)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestProductCounterSlots(TestPostgres):
+    def counters(self):
+        return self.connection.execute(
+            text(
+                "SELECT count(*), coalesce(sum(total), 0), "
+                "coalesce(sum(taken), 0) FROM product_counter"
+            )
+        ).one()
+
+    def test_should_keep_the_rows_bounded_by_the_slots(self):
+        slots = load_migration("018_product_counter_slots.py").SLOTS
+        _, total, taken = self.counters()
+
+        for _ in range(100):
+            code = uuid4().hex
+            self.connection.execute(
+                text(
+                    "INSERT INTO product (uuid, code, summary, taken) "
+                    "VALUES (:uuid, :code, 'summary', false)"
+                ),
+                {"uuid": uuid4(), "code": code},
+            )
+            self.connection.execute(
+                text("UPDATE product SET taken = true WHERE code = :code"),
+                {"code": code},
+            )
+
+        rows, *counters = self.counters()
+        self.assertLessEqual(rows, slots)
+        self.assertEqual([total + 100, taken + 100], counters)
@@ -0,0 +1,40 @@
+from test.unit.fixtures import Test
+from typing import NoReturn
+from unittest.mock import patch
+
+from server.db.replica import ReplicaGuard
+
+
+class TestReplicaGuard(Test):
+    def setUp(self) -> NoReturn:
+        self.guard = ReplicaGuard(max_lag=5, interval=1)
+
+    @patch("server.db.replica.monotonic")
+    def test_should_check_the_lag_once_per_interval(self, monotonic):
+        monotonic.return_value = 100
+
+        self.assertTrue(self.guard.should_check())
+        self.assertFalse(self.guard.should_check())
+
+        monotonic.return_value = 101
+        self.assertTrue(self.guard.should_check())
+
+    def test_should_use_the_replica_while_the_lag_is_tolerated(self):
+        for lag in [0, 5, None]:
+            self.guard.update(lag)
+            self.assertTrue(self.guard.use_replica())
+
+        self.assertEqual(0, self.guard.fallbacks)
+
+    def test_should_fall_back_when_the_replica_is_stale_or_unreachable(self):
+        self.guard.update(5.1)
+        self.assertFalse(self.guard.use_replica())
+
+        self.guard.update(None, reachable=False)
+        self.assertFalse(self.guard.use_replica())
+
+        self.assertEqual(2, self.guard.fallbacks)
+        self.assertEqual(
+            {"lag": None, "max_lag": 5, "fresh": False, "fallbacks": 2},
+            self.guard.stats(),
+        )
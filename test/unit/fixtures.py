@@ -1,15 +1,30 @@
+from contextlib import contextmanager
 from datetime import datetime
-from typing import NoReturn, Optional
+from os import environ
+from typing import Any, AsyncIterator, Iterator, List, NoReturn, Optional
 from unittest.async_case import IsolatedAsyncioTestCase
-from unittest.case import TestCase
+from unittest.case import TestCase, skipUnless
 from unittest.mock import MagicMock
 
 from faker import Faker
 from fastapi.testclient import TestClient
+from sqlalchemy import (
+    PrimaryKeyConstraint,
+    Table,
+    create_engine,
+    event,
+    inspect,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateColumn
 
 from server import app
-from server.db import open_session
-from server.models.oauth2 import auth, oauth_schema
+from server.db import get_db, get_read_db, open_session
+from server.db.entities import Base
+from server.models.oauth2 import auth, oauth_schema, principal, read_auth
 
 
 class Test(TestCase):
@@ -28,18 +43,166 @@ class TestRoute(Test):
     def setUp(self) -> NoReturn:
         self.db = MagicMock()
         self.app.dependency_overrides[oauth_schema] = lambda: "token"
-        self.app.dependency_overrides[open_session] = lambda: self.db
+        # `get_db` and `get_read_db` are the async sessions with
+        # `DATABASE_ASYNC`, the same as `open_session` otherwise.
+        for dependency in (open_session, get_db, get_read_db):
+            self.app.dependency_overrides[dependency] = lambda: self.db
         self.app.dependency_overrides[auth] = lambda: self.db
+        self.app.dependency_overrides[read_auth] = lambda: self.db
+        self.app.dependency_overrides[principal] = lambda: "app"
 
     def tearDown(self) -> NoReturn:
         self.app.dependency_overrides = {}
 
 
+@compiles(UUID, "sqlite")
+def compile_uuid_for_sqlite(type_, compiler, **kw):
+    return "CHAR(36)"
+
+
+def has_composite_key(table: Table) -> bool:
+    """Tell if the table has an autoincrement column in a composite key."""
+    return (
+        len(table.primary_key.columns) > 1
+        and table._autoincrement_column is not None
+    )
+
+
+@compiles(CreateColumn, "sqlite")
+def compile_column_for_sqlite(create, compiler, **kw):
+    # sqlite only generates the ids of a `INTEGER PRIMARY KEY` (the rowid),
+    # so the composite keys of the partitioned tables are reduced to it.
+    column = create.element
+    if (
+        column.table is not None
+        and has_composite_key(column.table)
+        and column is column.table._autoincrement_column
+    ):
+        name = compiler.preparer.format_column(column)
+        return f"{name} INTEGER NOT NULL PRIMARY KEY"
+    return compiler.visit_create_column(create, **kw)
+
+
+@compiles(PrimaryKeyConstraint, "sqlite")
+def compile_primary_key_for_sqlite(constraint, compiler, **kw):
+    if has_composite_key(constraint.table):
+        return None
+    return compiler.visit_primary_key_constraint(constraint, **kw)
+
+
+class TestDatabase(TestRoute):
+    """
+    Use it for tests that need a real database.
+
+    The entities are created on an in-memory sqlite database, so we can
+    verify the statements emitted by a route, e.g., with
+    `assert_max_queries`.
+    """
+
+    @classmethod
+    def setUpClass(cls) -> NoReturn:
+        super().setUpClass()
+        cls.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        event.listen(cls.engine, "connect", cls.create_functions)
+
+    @staticmethod
+    def create_functions(connection, _) -> NoReturn:
+        """Create the Postgres functions used by the repository."""
+        connection.create_function(
+            "now", 0, lambda: datetime.utcnow().isoformat(" ")
+        )
+        connection.create_function("greatest", -1, max)
+
+    @classmethod
+    def tearDownClass(cls) -> NoReturn:
+        cls.engine.dispose()
+
+    def setUp(self) -> NoReturn:
+        super().setUp()
+        Base.metadata.create_all(self.engine)
+        self.db = Session(bind=self.engine)
+        for dependency in (open_session, get_db, get_read_db):
+            self.app.dependency_overrides[dependency] = lambda: self.db
+        self.app.dependency_overrides[auth] = lambda: self.db
+        self.app.dependency_overrides[read_auth] = lambda: self.db
+
+    def tearDown(self) -> NoReturn:
+        super().tearDown()
+        self.db.close()
+        Base.metadata.drop_all(self.engine)
+
+    def persist(self, *entities) -> NoReturn:
+        self.db.add_all(entities)
+        self.db.commit()
+        self.db.expunge_all()
+
+    @contextmanager
+    def assert_max_queries(self, count: int) -> Iterator[List[str]]:
+        """Fail if the block emits more than `count` SQL statements."""
+        statements = []
+
+        def collect(connection, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(self.engine, "before_cursor_execute", collect)
+        try:
+            yield statements
+        finally:
+            event.remove(self.engine, "before_cursor_execute", collect)
+
+        self.assertLessEqual(
+            len(statements),
+            count,
+            f"Expected at most {count} statements, got {len(statements)}:\n"
+            + "\n".join(statements),
+        )
+
+    def fetched_defaults(self, *entities: Any) -> int:
+        """
+        Count the statements reading back the defaults of the entities.
+
+        With `EAGER_DEFAULTS`, sqlite can't use `RETURNING`, so the
+        defaults generated on the updates are read with another `SELECT`.
+        """
+        if self.engine.dialect.full_returning:
+            return 0
+        return sum(inspect(entity).eager_defaults for entity in entities)
+
+
+@skipUnless(environ.get("TEST_DATABASE_URL"), "TEST_DATABASE_URL isn't set.")
+class TestPostgres(Test):
+    """
+    Use it for tests of the Postgres triggers and functions.
+
+    They run on the database of `TEST_DATABASE_URL` (migrated to the head
+    revision), in a transaction rolled back at the end of each test.
+    """
+
+    def setUp(self) -> NoReturn:
+        self.engine = create_engine(environ["TEST_DATABASE_URL"])
+        self.connection = self.engine.connect()
+        self.transaction = self.connection.begin()
+
+    def tearDown(self) -> NoReturn:
+        self.transaction.rollback()
+        self.connection.close()
+        self.engine.dispose()
+
+
 class TestAsync(IsolatedAsyncioTestCase, Test):
     """Use it for test 'async' functions."""
 
 
 class TestHelpers:
+    @staticmethod
+    async def iterate(*items: Any) -> AsyncIterator[Any]:
+        for item in items:
+            yield item
+
     @staticmethod
     def datetime_to_str(dt: datetime) -> Optional[str]:
         if not dt:
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from test.unit.factories import OrderFactory
+from test.unit.fixtures import Test
+from typing import NoReturn
+
+from server.models.archive import read_archive, write_archive
+
+
+class TestArchive(Test):
+    def setUp(self) -> NoReturn:
+        temporary = TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.directory = Path(temporary.name) / "archive"
+
+    def orders(self, start: datetime, count: int):
+        return [
+            OrderFactory(requested_at=start + timedelta(hours=hour))
+            for hour in range(count)
+        ]
+
+    def test_should_read_the_orders_written_with_their_products(self):
+        orders = self.orders(datetime(2025, 1, 1), 3)
+
+        path = write_archive(self.directory, "orders", orders)
+
+        self.assertTrue(path.name.startswith("orders-20250101T0000"))
+        self.assertTrue(path.name.endswith(".ndjson.gz"))
+        self.assertEqual([path], list(self.directory.iterdir()))
+        records = read_archive(self.directory, "orders")
+        self.assertEqual(
+            [str(order.uuid) for order in orders],
+            [record["uuid"] for record in records],
+        )
+        self.assertEqual(orders[0].product.code, records[0]["product"]["code"])
+        self.assertNotIn("id", records[0])
+
+    def test_should_filter_by_the_period_skipping_the_other_files(self):
+        january = self.orders(datetime(2025, 1, 1), 2)
+        march = self.orders(datetime(2025, 3, 1), 2)
+        february = self.orders(datetime(2025, 2, 1), 2)
+        write_archive(self.directory, "orders", january)
+        write_archive(self.directory, "orders", february)
+        path = write_archive(self.directory, "orders", march)
+        path.write_bytes(b"not even gzip")  # never opened.
+
+        records = read_archive(
+            self.directory,
+            "orders",
+            since=datetime(2025, 1, 1, 1, tzinfo=timezone.utc),
+            until=datetime(2025, 3, 1),
+        )
+
+        self.assertEqual(
+            [str(order.uuid) for order in january[1:] + february],
+            [record["uuid"] for record in records],
+        )
+
+    def test_should_match_and_limit_skipping_the_duplicates(self):
+        orders = self.orders(datetime(2025, 1, 1), 4)
+        write_archive(self.directory, "orders", orders)
+        write_archive(self.directory, "orders", orders[:2])
+
+        records = read_archive(
+            self.directory,
+            "orders",
+            match=lambda order: order["uuid"] != str(orders[0].uuid),
+            limit=2,
+        )
+
+        self.assertEqual(
+            [str(order.uuid) for order in orders[1:3]],
+            [record["uuid"] for record in records],
+        )
+
+    def test_should_read_nothing_without_an_archive(self):
+        self.assertEqual([], read_archive(self.directory, "products"))
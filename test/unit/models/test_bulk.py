@@ -0,0 +1,127 @@
+from test.unit.fixtures import TestAsync
+from typing import AsyncIterator, List
+
+from server.models.bulk import (
+    MalformedBody,
+    read_csv,
+    read_json,
+    read_lines,
+    read_ndjson,
+    read_products,
+)
+
+
+async def stream(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(iterator: AsyncIterator) -> List:
+    return [item async for item in iterator]
+
+
+class TestReadLines(TestAsync):
+    async def test_should_split_the_lines_across_the_chunks(self):
+        chunks = stream(b"first\r\nsec", "ond\nçã".encode()[:-1], b"\xa3o")
+
+        self.assertEqual(
+            ["first", "second", "ção"], await collect(read_lines(chunks))
+        )
+
+
+class TestReadJson(TestAsync):
+    async def test_should_read_the_items_split_across_the_chunks(self):
+        chunks = stream(b' [{"code": "a"', b'}, {"co', b'de": "b"} ]\n')
+
+        self.assertEqual(
+            [{"code": "a"}, {"code": "b"}], await collect(read_json(chunks))
+        )
+
+    async def test_should_accept_an_empty_array(self):
+        self.assertEqual([], await collect(read_json(stream(b"[]"))))
+
+    async def test_should_raise_value_error_for_invalid_bodies(self):
+        for body in [b'{"code": "a"}', b'[{"code": "a"}', b"[1] 2", b""]:
+            with self.assertRaises(ValueError):
+                await collect(read_json(stream(body)))
+
+    async def test_should_raise_malformed_body_for_misplaced_commas(self):
+        for body in [
+            b'[{"code": "a"} {"code": "b"}]',
+            b'[{"code": "a"}{"code": "b"}]',
+            b'[{"code": "a"},]',
+            b'[, {"code": "a"}]',
+            b'[{"code": "a"},, {"code": "b"}]',
+        ]:
+            with self.assertRaises(MalformedBody):
+                await collect(read_json(stream(body)))
+
+
+class TestReadNdjson(TestAsync):
+    async def test_should_read_an_object_per_line(self):
+        chunks = stream(b'{"code": "a"}\n\n{"code"', b': "b"}')
+
+        self.assertEqual(
+            [{"code": "a"}, {"code": "b"}], await collect(read_ndjson(chunks))
+        )
+
+    async def test_should_raise_value_error_with_the_invalid_line(self):
+        with self.assertRaisesRegex(ValueError, "line 2"):
+            await collect(read_ndjson(stream(b'{"code": "a"}\n{"code"\n')))
+
+
+class TestReadCsv(TestAsync):
+    async def test_should_map_the_rows_by_the_header(self):
+        chunks = stream(b"code,summary\na,", b'"b, c"\n')
+
+        self.assertEqual(
+            [{"code": "a", "summary": "b, c"}],
+            await collect(read_csv(chunks)),
+        )
+
+    async def test_should_read_the_quoted_fields_with_line_breaks(self):
+        chunks = stream(b'code,summary\n\na,"first\r\n', b'second"\nb,c\n')
+
+        self.assertEqual(
+            [
+                {"code": "a", "summary": "first\nsecond"},
+                {"code": "b", "summary": "c"},
+            ],
+            await collect(read_csv(chunks)),
+        )
+
+    async def test_should_raise_malformed_body_with_the_invalid_line(self):
+        for body, line in [
+            (b'code,summary\na,b\nc,"d"e\n', "line 3"),
+            (b'code,summary\na,"b\nc\n', "line 3"),
+        ]:
+            with self.assertRaisesRegex(MalformedBody, line):
+                await collect(read_csv(stream(body)))
+
+    async def test_should_raise_value_error_without_the_code_column(self):
+        with self.assertRaises(ValueError):
+            await collect(read_csv(stream(b"summary\nb\n")))
+
+
+class TestReadProducts(TestAsync):
+    async def test_should_read_the_products_in_batches(self):
+        body = b"".join(
+            b'{"code": "%d", "summary": "s"}\n' % i for i in range(5)
+        )
+
+        batches = await collect(
+            read_products(stream(body), "application/x-ndjson", size=2)
+        )
+
+        self.assertEqual([2, 2, 1], [len(batch) for batch in batches])
+        self.assertEqual("4", batches[-1][0].code)
+
+    async def test_should_raise_value_error_for_invalid_products(self):
+        with self.assertRaisesRegex(ValueError, "#2: summary"):
+            await collect(
+                read_products(
+                    stream(b'[{"code": "a", "summary": "s"}, {"code": "b"}]'),
+                    "application/json",
+                    size=10,
+                )
+            )
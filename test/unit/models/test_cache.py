@@ -0,0 +1,81 @@
+from test.unit.fixtures import Test
+from unittest.mock import patch
+
+from server.models.cache import TTLCache
+
+
+class TestTTLCache(Test):
+    def test_should_count_a_miss_when_the_key_is_not_cached(self):
+        cache = TTLCache()
+
+        self.assertIsNone(cache.get(self.faker.word()))
+        self.assertEqual(0, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_should_count_a_hit_when_the_key_is_cached(self):
+        cache = TTLCache()
+        key, value = self.faker.word(), self.faker.word()
+
+        cache.set(key, value)
+
+        self.assertEqual(value, cache.get(key))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(0, cache.misses)
+
+    @patch("server.models.cache.time", return_value=100)
+    def test_should_expire_entries_after_the_expiration_timestamp(
+        self, time
+    ):
+        cache = TTLCache()
+        cache.set("key", "value", expires_at=110)
+
+        self.assertEqual("value", cache.get("key"))
+
+        time.return_value = 110
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(0, len(cache))
+
+    @patch("server.models.cache.time", return_value=100)
+    def test_should_bound_the_expiration_by_the_default_ttl(self, time):
+        cache = TTLCache(ttl=5)
+        cache.set("key", "value", expires_at=1000)
+
+        time.return_value = 105
+        self.assertIsNone(cache.get("key"))
+
+    def test_should_evict_the_least_recently_used_entry_when_full(self):
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(1, cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(3, cache.get("c"))
+
+    def test_should_discard_the_entries_matching_the_predicate(self):
+        cache = TTLCache()
+        cache.set("a", "app")
+        cache.set("b", "other")
+
+        self.assertEqual(1, cache.discard(lambda value: value == "app"))
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual("other", cache.get("b"))
+
+    def test_should_report_the_statistics(self):
+        cache = TTLCache(maxsize=10)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+
+        self.assertEqual(
+            {
+                "size": 1,
+                "maxsize": 10,
+                "hits": 1,
+                "misses": 1,
+                "hit_rate": 0.5,
+            },
+            cache.stats(),
+        )
@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+from test.unit.fixtures import Test
+from typing import Dict
+
+from starlette.requests import Request
+
+from server.models.conditional import is_not_modified, not_modified, validators
+
+LAST_MODIFIED = datetime(2020, 1, 2, 3, 4, 5)
+
+
+def request(query: str = "", headers: Dict[str, str] = None) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/products/",
+            "query_string": query.encode(),
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in (headers or {}).items()
+            ],
+        }
+    )
+
+
+class TestValidators(Test):
+    def test_should_tag_the_version_and_the_query_parameters(self):
+        headers = validators(request("limit=5"), (1, 2), LAST_MODIFIED)
+
+        self.assertTrue(headers["ETag"].startswith('W/"'))
+        self.assertEqual(
+            "Thu, 02 Jan 2020 03:04:05 GMT", headers["Last-Modified"]
+        )
+        self.assertEqual(
+            headers["ETag"],
+            validators(request("limit=5"), (1, 2), None)["ETag"],
+        )
+        self.assertNotEqual(
+            headers["ETag"],
+            validators(request("limit=6"), (1, 2), None)["ETag"],
+        )
+        self.assertNotEqual(
+            headers["ETag"],
+            validators(request("limit=5"), (1, 3), None)["ETag"],
+        )
+
+    def test_should_skip_the_last_modified_when_it_is_unknown(self):
+        self.assertNotIn(
+            "Last-Modified", validators(request(), (0, None), None)
+        )
+
+
+class TestIsNotModified(Test):
+    def setUp(self):
+        self.headers = validators(request(), (1, 2), LAST_MODIFIED)
+
+    def test_should_match_the_etag(self):
+        etag = self.headers["ETag"]
+
+        for if_none_match in [etag, etag[2:], f'"other", {etag}', "*"]:
+            self.assertTrue(
+                is_not_modified(
+                    request(headers={"If-None-Match": if_none_match}),
+                    self.headers,
+                )
+            )
+
+        self.assertFalse(
+            is_not_modified(
+                request(headers={"If-None-Match": '"other"'}), self.headers
+            )
+        )
+
+    def test_should_ignore_the_modification_time(self):
+        for since in [
+            "Thu, 02 Jan 2020 03:04:05 GMT",
+            "Fri, 03 Jan 2020 00:00:00 GMT",
+        ]:
+            self.assertFalse(
+                is_not_modified(
+                    request(headers={"If-Modified-Since": since}),
+                    self.headers,
+                )
+            )
+
+    def test_should_be_modified_without_conditional_headers(self):
+        self.assertFalse(is_not_modified(request(), self.headers))
+
+
+class TestNotModified(Test):
+    def test_should_return_304_with_the_validators(self):
+        headers = validators(
+            request(), (1,), LAST_MODIFIED.replace(tzinfo=timezone.utc)
+        )
+
+        response = not_modified(headers)
+
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b"", response.body)
+        self.assertEqual(headers["ETag"], response.headers["ETag"])
@@ -0,0 +1,86 @@
+from test.unit.factories import OrderFactory, ProductFactory
+from test.unit.fixtures import Test, TestAsync, TestHelpers
+from typing import AsyncIterator
+
+from server.models import schemas
+from server.models.export import (
+    columns,
+    export_response,
+    render_csv,
+    render_ndjson,
+)
+
+
+async def collect(iterator: AsyncIterator[str]) -> str:
+    return "".join([chunk async for chunk in iterator])
+
+
+class TestColumns(Test):
+    def test_should_flatten_the_nested_schemas(self):
+        self.assertEqual(
+            [
+                "mod_id",
+                "mod_display_name",
+                "owner_display_name",
+                "uuid",
+                "requested_at",
+                "product.code",
+                "product.summary",
+                "product.uuid",
+                "product.taken",
+                "product.created_at",
+                "product.updated_at",
+            ],
+            columns(schemas.Order),
+        )
+
+
+class TestRender(TestAsync):
+    async def test_should_render_a_csv_row_per_entity_after_the_header(self):
+        order = OrderFactory()
+
+        body = await collect(
+            render_csv(TestHelpers.iterate([order], []), schemas.Order)
+        )
+        lines = body.splitlines()
+
+        self.assertEqual(2, len(lines))
+        self.assertEqual(",".join(columns(schemas.Order)), lines[0])
+        self.assertIn(order.product.code, lines[1])
+        self.assertIn(order.requested_at.isoformat(), lines[1])
+
+    async def test_should_render_only_the_header_without_entities(self):
+        self.assertEqual(
+            "code,summary,uuid,taken,created_at,updated_at\r\n",
+            await collect(render_csv(TestHelpers.iterate(), schemas.Product)),
+        )
+
+    async def test_should_render_a_json_line_per_entity(self):
+        products = [ProductFactory(), ProductFactory()]
+
+        body = await collect(
+            render_ndjson(
+                TestHelpers.iterate(products[:1], products[1:]),
+                schemas.Product,
+            )
+        )
+
+        self.assertEqual(
+            "".join(
+                f"{schemas.Product.from_orm(product).json()}\n"
+                for product in products
+            ),
+            body,
+        )
+
+    async def test_should_stream_the_file_as_an_attachment(self):
+        response = export_response(
+            TestHelpers.iterate(), schemas.Product, "ndjson", "products"
+        )
+
+        self.assertEqual("application/x-ndjson", response.media_type)
+        self.assertEqual(
+            'attachment; filename="products.ndjson"',
+            response.headers["content-disposition"],
+        )
+        self.assertEqual("", await collect(response.body_iterator))
@@ -0,0 +1,160 @@
+from test.unit.factories import ProductFactory
+from test.unit.fixtures import Test, TestAsync
+from typing import NoReturn
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import exc
+from starlette.requests import Request
+
+from server.models import schemas
+from server.models.idempotency import fingerprint, idempotent
+
+
+def request(path: str = "/products/") -> Request:
+    return Request(
+        {"type": "http", "method": "POST", "path": path, "headers": []}
+    )
+
+
+class TestFingerprint(Test):
+    def test_should_tell_apart_the_paths_and_the_bodies(self):
+        payload = schemas.ProductCreation(code="code", summary="summary")
+        other = schemas.ProductCreation(code="other", summary="summary")
+
+        self.assertEqual(
+            fingerprint(request(), payload), fingerprint(request(), payload)
+        )
+        self.assertNotEqual(
+            fingerprint(request(), payload), fingerprint(request(), other)
+        )
+        self.assertNotEqual(
+            fingerprint(request(), payload),
+            fingerprint(request("/orders/claim"), payload),
+        )
+
+
+class TestIdempotent(TestAsync):
+    def setUp(self) -> NoReturn:
+        self.db = MagicMock()
+        self.product = ProductFactory()
+        self.call = AsyncMock(return_value=self.product)
+        patcher = patch("server.models.idempotency.repo")
+        self.repo = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def idempotent(self, key="key"):
+        return await idempotent(
+            self.db, key, "app", "hash", schemas.Product, 201, self.call
+        )
+
+    async def test_should_only_call_without_a_key(self):
+        self.assertEqual(self.product, await self.idempotent(key=None))
+
+        self.repo.claim_key.assert_not_called()
+
+    async def test_should_store_the_response_of_the_key_claimed(self):
+        self.repo.claim_key.return_value = None
+
+        response = await self.idempotent()
+
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(
+            self.product.uuid, orjson.loads(response.body)["uuid"]
+        )
+        self.repo.save_response.assert_called_with(
+            db=self.db,
+            key="key",
+            uname="app",
+            status_code=201,
+            body=response.body,
+        )
+        self.call.assert_awaited_once()
+
+    async def test_should_replay_the_response_stored(self):
+        self.repo.claim_key.return_value = MagicMock(
+            request_hash="hash", status_code=201, body=b'{"uuid":"uuid"}'
+        )
+
+        response = await self.idempotent()
+
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(b'{"uuid":"uuid"}', response.body)
+        self.assertEqual("true", response.headers["Idempotent-Replayed"])
+        self.call.assert_not_awaited()
+
+    async def test_should_refuse_a_key_used_by_another_request(self):
+        self.repo.claim_key.return_value = MagicMock(request_hash="other")
+
+        with self.assertRaises(HTTPException) as context:
+            await self.idempotent()
+
+        self.assertEqual(422, context.exception.status_code)
+        self.call.assert_not_awaited()
+
+    @patch("server.models.idempotency.env")
+    async def test_should_return_409_while_the_key_is_in_progress(self, env):
+        env.IDEMPOTENCY_WAIT = 0
+        self.repo.claim_key.side_effect = exc.OperationalError(
+            "INSERT", {}, MagicMock(pgcode="55P03")
+        )
+
+        with self.assertRaises(HTTPException) as context:
+            await self.idempotent()
+
+        self.assertEqual(409, context.exception.status_code)
+        self.repo.release_key.assert_called_with(db=self.db)
+        self.call.assert_not_awaited()
+
+    @patch("server.models.idempotency.env")
+    async def test_should_wait_for_the_key_committed_without_response(
+        self, env
+    ):
+        env.IDEMPOTENCY_WAIT = 0
+        self.repo.claim_key.return_value = MagicMock(
+            request_hash="hash", status_code=None
+        )
+
+        with self.assertRaises(HTTPException) as context:
+            await self.idempotent()
+
+        self.assertEqual(409, context.exception.status_code)
+        self.call.assert_not_awaited()
+
+    async def test_should_keep_the_key_when_the_response_is_not_stored(self):
+        self.repo.claim_key.return_value = None
+        self.repo.save_response.side_effect = exc.OperationalError(
+            "UPDATE", {}, Exception()
+        )
+
+        response = await self.idempotent()
+
+        self.assertEqual(201, response.status_code)
+        self.repo.release_key.assert_called_with(db=self.db)
+        self.repo.claim_key.assert_called_once()
+
+    async def test_should_store_the_client_errors(self):
+        self.repo.claim_key.return_value = None
+        self.call.side_effect = HTTPException(409, "Conflict.")
+
+        with self.assertRaises(HTTPException):
+            await self.idempotent()
+
+        self.repo.save_response.assert_called_with(
+            db=self.db,
+            key="key",
+            uname="app",
+            status_code=409,
+            body=b'{"detail":"Conflict."}',
+        )
+
+    async def test_should_release_the_key_on_other_errors(self):
+        self.repo.claim_key.return_value = None
+        self.call.side_effect = RuntimeError()
+
+        with self.assertRaises(RuntimeError):
+            await self.idempotent()
+
+        self.repo.release_key.assert_called_with(db=self.db)
+        self.repo.save_response.assert_not_called()
@@ -5,15 +5,25 @@ from test.unit.fixtures import (
     DEFAULT_DATETIME_STR,
     Test,
     TestAsync,
+    TestDatabase,
 )
-from unittest.mock import patch
+from typing import NoReturn
+from unittest.mock import MagicMock, patch
 
 from fastapi import HTTPException
 from fastapi.params import Depends
 from freezegun import freeze_time
 from jwt import PyJWTError
 
-from server.models.oauth2 import auth, create_access_token
+from server.db.entities import Application
+from server.models.cache import TTLCache
+from server.models.oauth2 import (
+    auth,
+    create_access_token,
+    principal,
+    principals,
+    read_auth,
+)
 
 
 class TestCreateAccessToken(Test):
@@ -39,6 +49,9 @@ class TestCreateAccessToken(Test):
 
 
 class TestAuth(TestAsync):
+    def setUp(self) -> NoReturn:
+        principals.clear()
+
     @patch("server.models.oauth2.decode")
     async def test_should_raise_auth_exception_when_decoded_token_does_not_have_sub_key(  # noqa
         self, decode
@@ -94,3 +107,113 @@ class TestAuth(TestAsync):
         get_app_by_uname.return_value = ApplicationFactory()
 
         self.assertIsInstance(await auth(), Depends)
+
+    @patch("server.models.oauth2.decode")
+    @patch("server.models.oauth2.get_app_by_uname")
+    async def test_should_cache_the_principal_until_the_token_expires(
+        self, get_app_by_uname, decode
+    ):
+        token = self.faker.sha256()
+        decode.return_value = {"sub": self.faker.user_name(), "exp": 10 ** 10}
+        get_app_by_uname.return_value = ApplicationFactory()
+
+        await auth(token=token)
+        await auth(token=token)
+
+        decode.assert_called_once()
+        get_app_by_uname.assert_called_once()
+        self.assertEqual(1, principals.hits)
+
+    @patch("server.models.oauth2.decode")
+    async def test_should_not_cache_expired_tokens(self, decode):
+        token = self.faker.sha256()
+        decode.return_value = {"sub": self.faker.user_name(), "exp": 1}
+
+        with patch("server.models.oauth2.get_app_by_uname"):
+            await auth(token=token)
+            await auth(token=token)
+
+        self.assertEqual(2, decode.call_count)
+
+    @patch("server.models.oauth2.decode")
+    @patch("server.models.oauth2.get_app_by_uname")
+    async def test_should_authorize_read_only_requests_with_the_same_token(
+        self, get_app_by_uname, decode
+    ):
+        db = MagicMock()
+        decode.return_value = {"sub": self.faker.user_name(), "exp": 10 ** 10}
+        get_app_by_uname.return_value = ApplicationFactory()
+
+        self.assertEqual(db, await read_auth(token=self.faker.sha256(), db=db))
+        get_app_by_uname.assert_called_once()
+
+    @patch("server.models.oauth2.decode")
+    @patch("server.models.oauth2.get_app_by_uname")
+    async def test_should_return_the_username_of_the_authorized_app(
+        self, get_app_by_uname, decode
+    ):
+        token = self.faker.sha256()
+        username = self.faker.user_name()
+        decode.return_value = {"sub": username, "exp": 10 ** 10}
+        get_app_by_uname.return_value = ApplicationFactory(username=username)
+        hits = principals.hits
+
+        self.assertEqual(
+            username, await principal(token=token, db=MagicMock())
+        )
+        self.assertEqual(
+            username, await principal(token=token, db=MagicMock())
+        )
+        get_app_by_uname.assert_called_once()
+        self.assertEqual(hits + 1, principals.hits)
+
+    @patch("server.models.oauth2.decode")
+    @patch("server.models.oauth2.get_app_by_uname")
+    async def test_should_return_the_username_when_it_is_not_cached(
+        self, get_app_by_uname, decode
+    ):
+        username = self.faker.user_name()
+        decode.return_value = {"sub": username, "exp": 10 ** 10}
+        get_app_by_uname.return_value = ApplicationFactory(username=username)
+
+        with patch("server.models.oauth2.principals", TTLCache(maxsize=0)):
+            self.assertEqual(
+                username,
+                await principal(token=self.faker.sha256(), db=MagicMock()),
+            )
+
+
+class TestInvalidatePrincipals(TestDatabase):
+    def setUp(self) -> NoReturn:
+        super().setUp()
+        principals.clear()
+        self.application = ApplicationFactory(id=None)
+        self.persist(self.application)
+        self.application = self.db.query(Application).one()
+        principals.set("token", self.application.username)
+        principals.set("other", self.faker.user_name())
+
+    def test_should_discard_the_tokens_once_the_change_is_committed(self):
+        self.application.username = self.faker.user_name()
+        self.db.flush()
+
+        self.assertIsNotNone(principals.get("token"))
+
+        self.db.commit()
+
+        self.assertIsNone(principals.get("token"))
+        self.assertIsNotNone(principals.get("other"))
+
+    def test_should_discard_the_tokens_of_the_deleted_application(self):
+        self.db.delete(self.application)
+        self.db.commit()
+
+        self.assertIsNone(principals.get("token"))
+
+    def test_should_keep_the_tokens_when_the_change_is_rolled_back(self):
+        self.db.delete(self.application)
+        self.db.flush()
+        self.db.rollback()
+        self.db.commit()
+
+        self.assertIsNotNone(principals.get("token"))
@@ -0,0 +1,58 @@
+from test.unit.factories import ProductFactory
+from test.unit.fixtures import DEFAULT_DATETIME, Test
+
+from fastapi import HTTPException
+
+from server.models.pagination import (
+    decode_cursor,
+    encode_cursor,
+    next_cursor,
+    parse_cursor,
+)
+
+
+class TestCursor(Test):
+    def test_should_decode_the_encoded_position(self):
+        position = (DEFAULT_DATETIME, self.faker.pyint())
+
+        self.assertEqual(position, decode_cursor(encode_cursor(position)))
+
+    def test_should_raise_value_error_for_malformed_cursors(self):
+        truncated = encode_cursor((DEFAULT_DATETIME, 1))[2:]
+
+        for cursor in ["", "invalid", truncated]:
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+
+class TestParseCursor(Test):
+    def test_should_return_none_when_no_cursor_is_provided(self):
+        self.assertIsNone(parse_cursor(None))
+
+    def test_should_raise_400_for_malformed_cursors(self):
+        with self.assertRaises(HTTPException) as context:
+            parse_cursor("invalid")
+
+        self.assertEqual(400, context.exception.status_code)
+
+
+class TestNextCursor(Test):
+    def test_should_return_none_when_the_page_is_not_full(self):
+        self.assertIsNone(next_cursor([ProductFactory()], 2, "created_at"))
+        self.assertIsNone(next_cursor([], 0, "created_at"))
+
+    def test_should_encode_the_position_of_the_last_entity(self):
+        products = [ProductFactory(), ProductFactory()]
+
+        self.assertEqual(
+            encode_cursor((products[1].created_at, products[1].id)),
+            next_cursor(products, 2, "created_at"),
+        )
+
+    def test_should_encode_the_position_of_the_last_row(self):
+        rows = [{"created_at": DEFAULT_DATETIME, "id": 1}] * 2
+
+        self.assertEqual(
+            encode_cursor((DEFAULT_DATETIME, 1)),
+            next_cursor(rows, 2, "created_at"),
+        )
@@ -0,0 +1,203 @@
+from test.unit.fixtures import Test
+from typing import NoReturn
+from unittest.mock import MagicMock, patch
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import inspect
+from starlette.requests import Request
+
+from server.db.entities import Application, Product
+from server.models.cache import TTLCache
+from server.models.responses import (
+    ARCHIVED,
+    LISTINGS_CHANGED,
+    ResponseCache,
+    forget_listings,
+    invalidate_listings,
+    invalidate_responses,
+    listen,
+    track_flushed_listings,
+    track_written_listings,
+)
+
+
+def request(query: str = "", headers=()) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/products/",
+            "query_string": query.encode(),
+            "headers": [(k.encode(), v.encode()) for k, v in headers],
+        }
+    )
+
+
+class TestResponseCache(Test):
+    def setUp(self) -> NoReturn:
+        self.cache = ResponseCache(TTLCache(maxsize=2), enabled=True)
+        self.response = JSONResponse(
+            {"products": []}, headers={"ETag": 'W/"tag"'}
+        )
+
+    def test_should_return_the_response_stored_for_the_same_query(self):
+        self.cache.store(request("limit=5&desc=true"), self.response, 0)
+
+        cached = self.cache.get(request("desc=true&limit=5"))
+
+        self.assertEqual(200, cached.status_code)
+        self.assertEqual(self.response.body, cached.body)
+        self.assertEqual('W/"tag"', cached.headers["ETag"])
+        self.assertEqual("application/json", cached.media_type)
+        self.assertIsNone(self.cache.get(request("limit=6")))
+
+    def test_should_return_304_when_the_client_has_the_response(self):
+        self.cache.store(request(), self.response, 0)
+
+        cached = self.cache.get(
+            request(headers=[("if-none-match", 'W/"tag"')])
+        )
+
+        self.assertEqual(304, cached.status_code)
+
+    def test_should_drop_the_responses_when_invalidated(self):
+        self.cache.store(request(), self.response, 0)
+
+        self.cache.invalidate("product")
+
+        self.assertIsNone(self.cache.get(request()))
+        self.assertEqual(1, self.cache.stats()["invalidations"])
+
+    def test_should_skip_the_responses_read_before_an_invalidation(self):
+        generation = self.cache.generation
+
+        self.cache.invalidate("product")
+        self.cache.store(request(), self.response, generation)
+
+        self.assertIsNone(self.cache.get(request()))
+        self.cache.store(request(), self.response, self.cache.generation)
+        self.assertIsNotNone(self.cache.get(request()))
+
+    def test_should_not_cache_while_it_is_not_listening(self):
+        self.cache.listener = MagicMock(listening=False)
+
+        self.assertIs(
+            self.response, self.cache.store(request(), self.response, 0)
+        )
+
+        self.cache.listener.listening = True
+        self.assertIsNone(self.cache.get(request()))
+
+    def test_should_not_cache_when_it_is_disabled(self):
+        self.cache.enabled = False
+        self.cache.store(request(), self.response, 0)
+
+        self.assertIsNone(self.cache.get(request()))
+        self.assertEqual(0, len(self.cache.backend))
+
+
+class TestInvalidateResponses(Test):
+    @patch("server.models.responses.responses")
+    def test_should_invalidate_on_the_commit_of_the_listings(self, responses):
+        responses.enabled = True
+        session = MagicMock(new=[Product()], dirty=[], deleted=[], info={})
+
+        track_flushed_listings(session, None)
+        responses.invalidate.assert_not_called()
+
+        invalidate_responses(session)
+        invalidate_responses(session)
+        responses.invalidate.assert_called_once()
+
+    @patch("server.models.responses.responses")
+    def test_should_not_invalidate_on_other_commits(self, responses):
+        responses.enabled = True
+        session = MagicMock(new=[Application()], dirty=[], deleted=[], info={})
+
+        track_flushed_listings(session, None)
+        invalidate_responses(session)
+
+        responses.invalidate.assert_not_called()
+
+    @patch("server.models.responses.responses")
+    def test_should_not_invalidate_after_a_rollback(self, responses):
+        responses.enabled = True
+        session = MagicMock(info={LISTINGS_CHANGED: True})
+
+        forget_listings(session)
+        invalidate_responses(session)
+
+        responses.invalidate.assert_not_called()
+
+    def test_should_track_the_product_and_order_writes(self):
+        product = inspect(Product)
+        states = [
+            MagicMock(is_insert=False, is_update=True, bind_mapper=product),
+            MagicMock(
+                is_insert=False,
+                is_update=False,
+                is_delete=False,
+                bind_mapper=product,
+            ),
+            MagicMock(is_insert=True, bind_mapper=inspect(Application)),
+        ]
+        for state in states:
+            state.session.info = {}
+            track_written_listings(state)
+
+        self.assertEqual(
+            [{LISTINGS_CHANGED: True}, {}, {}],
+            [state.session.info for state in states],
+        )
+
+
+class TestListen(Test):
+    @patch("server.models.responses.env")
+    @patch("server.models.responses.Listener")
+    @patch("server.models.responses.responses")
+    def test_should_listen_only_to_postgres(self, responses, listener, env):
+        responses.enabled = True
+
+        env.DATABASE_URL = "sqlite://"
+        listen()
+        listener.assert_not_called()
+
+        env.DATABASE_URL = "postgresql://localhost/micebot"
+        listen()
+        listener().start.assert_called_once()
+
+    @patch("server.models.responses.env")
+    @patch("server.models.responses.Listener")
+    @patch("server.models.responses.responses")
+    def test_should_listen_while_the_orders_are_cached(
+        self, responses, listener, env
+    ):
+        responses.enabled = False
+        env.DATABASE_URL = "postgresql://localhost/micebot"
+
+        with patch("server.models.responses.orders", TTLCache(maxsize=0)):
+            listen()
+        listener.assert_not_called()
+
+        listen()
+        listener.assert_called_with(
+            env.DATABASE_URL, "listings_changed", invalidate_listings
+        )
+
+
+class TestInvalidateListings(Test):
+    @patch("server.models.responses.orders")
+    @patch("server.models.responses.responses")
+    def test_should_drop_the_orders_only_when_they_are_archived(
+        self, responses, orders
+    ):
+        invalidate_listings("order")
+
+        responses.invalidate.assert_called_once()
+        orders.clear.assert_not_called()
+
+        invalidate_listings(ARCHIVED)
+        invalidate_listings(None)
+
+        self.assertEqual(3, responses.invalidate.call_count)
+        self.assertEqual(2, orders.clear.call_count)
@@ -0,0 +1,42 @@
+from asyncio import ensure_future, sleep
+from test.unit.fixtures import Test, TestAsync
+from threading import Event
+
+from server.models.security import (
+    BoundedExecutor,
+    ExecutorFull,
+    generate_token,
+    hash_token,
+)
+
+
+class TestBoundedExecutor(TestAsync):
+    async def test_should_run_the_function_and_return_its_result(self):
+        executor = BoundedExecutor(workers=1, queue=0, name="test")
+
+        self.assertEqual(3, await executor.run(sum, [1, 2]))
+        self.assertEqual(1, executor.submitted)
+
+    async def test_should_reject_tasks_when_the_queue_is_full(self):
+        executor = BoundedExecutor(workers=1, queue=0, name="test")
+        release = Event()
+
+        pending = ensure_future(executor.run(release.wait))
+        await sleep(0)
+
+        with self.assertRaises(ExecutorFull):
+            await executor.run(sum, [1, 2])
+
+        release.set()
+        await pending
+        self.assertEqual(1, executor.rejected)
+        self.assertEqual(3, await executor.run(sum, [1, 2]))
+
+
+class TestHashToken(Test):
+    def test_should_be_deterministic_and_not_expose_the_token(self):
+        token = generate_token()
+
+        self.assertEqual(hash_token(token), hash_token(token))
+        self.assertNotEqual(token, hash_token(token))
+        self.assertNotEqual(hash_token(token), hash_token(generate_token()))
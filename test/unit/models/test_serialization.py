@@ -0,0 +1,65 @@
+from json import loads
+from test.unit.factories import OrderFactory, ProductFactory
+from test.unit.fixtures import Test
+from unittest.mock import patch
+
+from server.models import schemas
+from server.models.serialization import dump, fast_response, render
+
+
+class TestDump(Test):
+    def test_should_pick_the_schema_fields_of_an_entity(self):
+        product = ProductFactory()
+
+        self.assertEqual(
+            {
+                "code": product.code,
+                "summary": product.summary,
+                "uuid": product.uuid,
+                "taken": product.taken,
+                "created_at": product.created_at,
+                "updated_at": product.updated_at,
+            },
+            dump(product, schemas.Product),
+        )
+
+    def test_should_dump_the_nested_schemas_of_dicts_and_entities(self):
+        order = OrderFactory()
+        content = {"total": 1, "orders": [order], "next_cursor": None}
+
+        orders = dump(content, schemas.OrderWithTotal)["orders"]
+
+        self.assertEqual(order.product.code, orders[0]["product"]["code"])
+        self.assertNotIn("id", orders[0])
+        self.assertNotIn("id", orders[0]["product"])
+
+
+class TestFastResponse(Test):
+    def test_should_render_the_same_json_of_the_schema(self):
+        content = {
+            "total": 2,
+            "orders": [OrderFactory(), OrderFactory()],
+            "next_cursor": "cursor",
+        }
+
+        response = fast_response(content, schemas.OrderWithTotal)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            loads(schemas.OrderWithTotal.parse_obj(content).json()),
+            loads(response.body),
+        )
+
+
+class TestRender(Test):
+    def test_should_render_the_same_json_with_or_without_orjson(self):
+        content = {"total": 1, "orders": [OrderFactory()]}
+        headers = {"ETag": 'W/"tag"'}
+
+        with patch("server.models.serialization.env.FAST_JSON", True):
+            fast = render(content, schemas.OrderWithTotal, headers)
+        default = render(content, schemas.OrderWithTotal, headers)
+
+        self.assertEqual(loads(fast.body), loads(default.body))
+        self.assertEqual('W/"tag"', default.headers["ETag"])
+        self.assertEqual("application/json", default.media_type)
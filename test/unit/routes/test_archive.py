@@ -0,0 +1,45 @@
+from test.unit.fixtures import TestRoute
+from unittest.mock import patch
+
+
+class TestArchivedOrders(TestRoute):
+    @patch("server.routes.archive.read_archive")
+    def test_should_read_the_archive_with_the_filters(self, read_archive):
+        order = {"mod_display_name": "mod", "owner_display_name": "owner"}
+        read_archive.return_value = []
+
+        response = self.client.get(
+            "/archive/orders",
+            params={
+                "moderator": "mod",
+                "since": "2025-01-01T00:00:00",
+                "limit": 10,
+            },
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([], response.json())
+        args, kwargs = read_archive.call_args
+        self.assertEqual("orders", args[1])
+        self.assertEqual(10, kwargs["limit"])
+        self.assertEqual(2025, kwargs["since"].year)
+        self.assertTrue(kwargs["match"](order))
+        self.assertFalse(
+            kwargs["match"]({**order, "mod_display_name": "other"})
+        )
+
+    def test_should_return_422_for_invalid_limits(self):
+        response = self.client.get("/archive/orders", params={"limit": 0})
+
+        self.assertEqual(422, response.status_code)
+
+
+class TestArchivedProducts(TestRoute):
+    @patch("server.routes.archive.read_archive", return_value=[])
+    def test_should_match_the_product_code(self, read_archive):
+        response = self.client.get("/archive/products", params={"code": "c"})
+
+        self.assertEqual(200, response.status_code)
+        match = read_archive.call_args.kwargs["match"]
+        self.assertTrue(match({"code": "c"}))
+        self.assertFalse(match({"code": "d"}))
@@ -1,12 +1,15 @@
 from test.unit.factories import ApplicationFactory
 from test.unit.fixtures import TestRoute
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
+
+from server.models.oauth2 import principal
+from server.models.security import ExecutorFull
 
 
 class TestPost(TestRoute):
-    @patch("server.routes.auth.auth_application", return_value=None)
+    @patch("server.routes.auth.get_app_by_uname", return_value=None)
     def test_should_return_401_when_the_authencation_fails(
-        self, auth_application
+        self, get_app_by_uname
     ):
 
         username = self.faker.user_name()
@@ -24,20 +27,40 @@ class TestPost(TestRoute):
             {"detail": "Invalid or unknown client application."},
             response.json(),
         )
-        auth_application.assert_called_with(
-            db=self.db, uname=username, password=password
+        get_app_by_uname.assert_called_with(db=self.db, uname=username)
+
+    @patch("server.routes.auth.get_app_by_uname")
+    def test_should_return_401_when_the_password_is_incorrect(
+        self, get_app_by_uname
+    ):
+        app = MagicMock()
+        app.check_password.return_value = False
+        get_app_by_uname.return_value = app
+
+        password = self.faker.password()
+
+        response = self.client.post(
+            "/auth/",
+            data={"username": self.faker.user_name(), "password": password},
         )
 
-    @patch("server.routes.auth.auth_application")
+        self.assertEqual(401, response.status_code)
+        app.check_password.assert_called_with(plain_password=password)
+
+    @patch("server.db.entities.pw_context.verify", return_value=True)
+    @patch("server.routes.auth.create_refresh_token")
+    @patch("server.routes.auth.get_app_by_uname")
     @patch("server.routes.auth.create_access_token")
     def test_should_create_the_access_token_when_authenticate_successfully(
-        self, create_access_token, auth_application
+        self, create_access_token, get_app_by_uname, create_refresh_token, _
     ):
         app = ApplicationFactory()
         access_token = self.faker.sha256()
+        refresh_token = self.faker.sha256()
 
-        auth_application.return_value = app
+        get_app_by_uname.return_value = app
         create_access_token.return_value = access_token
+        create_refresh_token.return_value = refresh_token
 
         username = self.faker.user_name()
         password = self.faker.password()
@@ -49,10 +72,109 @@ class TestPost(TestRoute):
         self.assertEqual(200, response.status_code)
         self.assertEqual({
             'access_token': access_token,
-            'token_type': 'bearer'
+            'token_type': 'bearer',
+            'refresh_token': refresh_token,
         }, response.json())
 
-        auth_application.assert_called_with(
-            db=self.db, uname=username, password=password
+        get_app_by_uname.assert_called_with(db=self.db, uname=username)
+        create_access_token.assert_called_with(data={"sub": app.username})
+        create_refresh_token.assert_called_with(db=self.db, app=app)
+
+    @patch("server.routes.auth.get_app_by_uname")
+    @patch("server.routes.auth.verifier.run")
+    def test_should_return_503_when_the_verifier_queue_is_full(
+        self, run, get_app_by_uname
+    ):
+        get_app_by_uname.return_value = ApplicationFactory()
+        run.side_effect = ExecutorFull()
+
+        response = self.client.post(
+            "/auth/",
+            data={
+                "username": self.faker.user_name(),
+                "password": self.faker.password(),
+            },
+        )
+
+        self.assertEqual(503, response.status_code)
+        self.assertEqual("1", response.headers["Retry-After"])
+        self.assertEqual(
+            {"detail": "Too many authentication requests, try again later."},
+            response.json(),
+        )
+
+
+class TestRefreshTokenGrant(TestRoute):
+    @patch("server.routes.auth.get_app_by_refresh_token", return_value=None)
+    def test_should_return_401_when_the_refresh_token_is_invalid(
+        self, get_app_by_refresh_token
+    ):
+        refresh_token = self.faker.sha256()
+
+        response = self.client.post(
+            "/auth/",
+            data={
+                "grant_type": "refresh_token",
+                "refresh_token": refresh_token,
+            },
+        )
+
+        self.assertEqual(401, response.status_code)
+        self.assertEqual(
+            {"detail": "Invalid or expired refresh token."}, response.json()
+        )
+        get_app_by_refresh_token.assert_called_with(
+            db=self.db, token=refresh_token
+        )
+
+    @patch("server.routes.auth.get_app_by_uname")
+    @patch("server.routes.auth.create_access_token")
+    @patch("server.routes.auth.get_app_by_refresh_token")
+    def test_should_create_the_access_token_without_checking_the_password(
+        self, get_app_by_refresh_token, create_access_token, get_app_by_uname
+    ):
+        app = ApplicationFactory()
+        access_token = self.faker.sha256()
+        get_app_by_refresh_token.return_value = app
+        create_access_token.return_value = access_token
+
+        response = self.client.post(
+            "/auth/",
+            data={
+                "grant_type": "refresh_token",
+                "refresh_token": self.faker.sha256(),
+            },
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            {"access_token": access_token, "token_type": "bearer"},
+            response.json(),
         )
         create_access_token.assert_called_with(data={"sub": app.username})
+        get_app_by_uname.assert_not_called()
+
+    def test_should_return_422_for_unsupported_grant_types(self):
+        response = self.client.post(
+            "/auth/", data={"grant_type": "client_credentials"}
+        )
+
+        self.assertEqual(422, response.status_code)
+
+
+class TestRevoke(TestRoute):
+    @patch("server.routes.auth.revoke_refresh_token", return_value=True)
+    def test_should_revoke_the_refresh_token(self, revoke_refresh_token):
+        refresh_token = self.faker.sha256()
+
+        self.app.dependency_overrides[principal] = lambda: "app"
+
+        response = self.client.post(
+            "/auth/revoke", data={"token": refresh_token}
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({"revoked": True}, response.json())
+        revoke_refresh_token.assert_called_with(
+            db=self.db, token=refresh_token, uname="app"
+        )
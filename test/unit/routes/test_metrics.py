@@ -0,0 +1,94 @@
+from test.unit.fixtures import TestRoute
+from unittest.mock import patch
+
+
+class TestAuthMetrics(TestRoute):
+    @patch("server.routes.metrics.verifier")
+    @patch("server.routes.metrics.principals")
+    def test_should_return_the_principals_cache_and_verifier_statistics(
+        self, principals, verifier
+    ):
+        principals_stats = {
+            "size": 1,
+            "maxsize": 1024,
+            "hits": 9,
+            "misses": 1,
+            "hit_rate": 0.9,
+        }
+        verifier_stats = {
+            "workers": 2,
+            "queue": 32,
+            "submitted": 10,
+            "rejected": 1,
+            "cpu_time": 0.5,
+        }
+        principals.stats.return_value = principals_stats
+        verifier.stats.return_value = verifier_stats
+
+        response = self.client.get("/metrics/auth")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            {"principals": principals_stats, "verifier": verifier_stats},
+            response.json(),
+        )
+
+
+class TestPoolMetrics(TestRoute):
+    @patch("server.routes.metrics.pool_statistics")
+    def test_should_return_the_statistics_for_each_engine(
+        self, pool_statistics
+    ):
+        stats = {
+            "size": 5,
+            "checked_out": 2,
+            "overflow": 0,
+            "peak_overflow": 3,
+            "checkouts": 120,
+            "timeouts": 1,
+            "wait_time": 1.5,
+            "max_wait_time": 0.5,
+        }
+        pool_statistics.return_value = {"primary": stats}
+
+        response = self.client.get("/metrics/pool")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({"primary": stats}, response.json())
+
+
+class TestReplicaMetrics(TestRoute):
+    @patch("server.routes.metrics.replica")
+    def test_should_return_the_replica_statistics(self, replica):
+        stats = {"lag": 0.5, "max_lag": 5.0, "fresh": True, "fallbacks": 2}
+        replica.stats.return_value = stats
+
+        response = self.client.get("/metrics/replica")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(stats, response.json())
+
+
+class TestCacheMetrics(TestRoute):
+    @patch("server.routes.metrics.responses")
+    def test_should_return_the_response_cache_statistics(self, responses):
+        stats = {
+            "size": 3,
+            "maxsize": 256,
+            "hits": 9,
+            "misses": 3,
+            "hit_rate": 0.75,
+            "enabled": True,
+            "invalidations": 2,
+            "listener": {
+                "listening": True,
+                "notifications": 2,
+                "reconnections": 0,
+            },
+        }
+        responses.stats.return_value = stats
+
+        response = self.client.get("/metrics/cache")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(stats, response.json())
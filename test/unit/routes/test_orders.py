@@ -1,22 +1,35 @@
+from datetime import datetime
 from test.unit.factories import OrderFactory, ProductFactory
-from test.unit.fixtures import TestHelpers, TestRoute
+from test.unit.fixtures import (
+    DEFAULT_DATETIME,
+    TestAsync,
+    TestDatabase,
+    TestHelpers,
+    TestRoute,
+)
 from typing import NoReturn
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
+
+from server.db.entities import Product
+from server.models import schemas
+from server.models.cache import TTLCache
+from server.models.pagination import encode_cursor
+from server.routes.orders import export_orders
 
 
 class TestGetAllOrders(TestRoute):
     def setUp(self) -> NoReturn:
         super().setUp()
         self.skip = self.faker.pyint()
-        self.limit = self.faker.pyint()
+        self.limit = self.faker.pyint(min_value=2)
         self.moderator = self.faker.user_name()
         self.owner = self.faker.user_name()
         self.desc = self.faker.boolean()
 
-    @patch("server.routes.orders.repo.get_orders_count")
+    @patch("server.routes.orders.repo.get_orders_version")
     @patch("server.routes.orders.repo.get_orders")
     def test_should_return_200_with_entities(
-        self, get_orders, get_orders_count
+        self, get_orders, get_orders_version
     ):
         order = OrderFactory()
 
@@ -24,7 +37,11 @@ class TestGetAllOrders(TestRoute):
         orders_count = len(orders_list)
 
         get_orders.return_value = orders_list
-        get_orders_count.return_value = orders_count
+        get_orders_version.return_value = (
+            orders_count,
+            order.id,
+            order.requested_at,
+        )
 
         response = self.client.get(
             "/orders",
@@ -64,11 +81,12 @@ class TestGetAllOrders(TestRoute):
                         },
                     }
                 ],
+                "next_cursor": None,
             },
             response.json(),
         )
 
-        get_orders_count.assert_called_with(db=self.db)
+        get_orders_version.assert_called_with(db=self.db)
         get_orders.assert_called_with(
             db=self.db,
             skip=self.skip,
@@ -76,6 +94,66 @@ class TestGetAllOrders(TestRoute):
             moderator=self.moderator,
             owner=self.owner,
             desc=self.desc,
+            cursor=None,
+            since=None,
+            until=None,
+        )
+
+    @patch(
+        "server.routes.orders.repo.get_orders_version",
+        return_value=(2, 2, None),
+    )
+    @patch("server.routes.orders.repo.get_orders")
+    def test_should_paginate_using_the_cursor(
+        self, get_orders, get_orders_version
+    ):
+        orders = [OrderFactory(), OrderFactory()]
+        get_orders.return_value = orders
+        cursor = encode_cursor((DEFAULT_DATETIME, 1))
+
+        response = self.client.get(
+            "/orders", params={"limit": 2, "cursor": cursor}
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            encode_cursor((orders[-1].requested_at, orders[-1].id)),
+            response.json()["next_cursor"],
+        )
+        self.assertEqual(
+            (DEFAULT_DATETIME, 1), get_orders.call_args.kwargs["cursor"]
+        )
+
+    @patch(
+        "server.routes.orders.repo.get_orders_version",
+        return_value=(0, None, None),
+    )
+    @patch("server.routes.orders.repo.get_orders", return_value=[])
+    def test_should_filter_by_the_period(self, get_orders, get_orders_version):
+        response = self.client.get(
+            "/orders",
+            params={
+                "since": "2026-09-01T00:00:00",
+                "until": "2026-10-01T00:00:00",
+            },
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            datetime(2026, 9, 1),
+            get_orders.call_args.kwargs["since"],
+        )
+        self.assertEqual(
+            datetime(2026, 10, 1),
+            get_orders.call_args.kwargs["until"],
+        )
+
+    def test_should_return_400_when_the_cursor_is_invalid(self):
+        response = self.client.get("/orders", params={"cursor": "invalid"})
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(
+            {"detail": "Invalid pagination cursor."}, response.json()
         )
 
 
@@ -102,7 +180,9 @@ class TestPost(TestRoute):
             {"detail": "No product found for the uuid provided."},
             response.json(),
         )
-        get_product_by_uuid.assert_called_with(db=self.db, uuid=self.uuid)
+        get_product_by_uuid.assert_called_with(
+            db=self.db, uuid=self.uuid, for_update=True
+        )
 
     @patch("server.routes.orders.product_repo.get_product_by_uuid")
     def test_should_return_409_when_the_product_uuid_already_taken(
@@ -117,7 +197,9 @@ class TestPost(TestRoute):
             {"detail": "The product code is already taken."},
             response.json(),
         )
-        get_product_by_uuid.assert_called_with(db=self.db, uuid=self.uuid)
+        get_product_by_uuid.assert_called_with(
+            db=self.db, uuid=self.uuid, for_update=True
+        )
 
     @patch("server.routes.orders.repo.create_order_for_product")
     @patch("server.routes.orders.product_repo.get_product_by_uuid")
@@ -159,4 +241,388 @@ class TestPost(TestRoute):
             response.json(),
         )
 
-        get_product_by_uuid.assert_called_with(db=self.db, uuid=self.uuid)
+        get_product_by_uuid.assert_called_with(
+            db=self.db, uuid=self.uuid, for_update=True
+        )
+
+    @patch("server.models.idempotency.repo")
+    @patch("server.routes.orders.repo.create_order_for_product")
+    @patch("server.routes.orders.product_repo.get_product_by_uuid")
+    def test_should_replay_the_order_created_with_the_key(
+        self, get_product_by_uuid, create_order_for_product, idempotency
+    ):
+        order = OrderFactory(product__taken=True)
+        get_product_by_uuid.return_value = ProductFactory(taken=False)
+        create_order_for_product.return_value = order
+        idempotency.claim_key.return_value = None
+        headers = {"Idempotency-Key": "key"}
+
+        first = self.client.post(
+            f"/orders/{self.uuid}", json=self.payload, headers=headers
+        )
+        idempotency.claim_key.return_value = MagicMock(
+            request_hash=idempotency.claim_key.call_args.kwargs[
+                "request_hash"
+            ],
+            **idempotency.save_response.call_args.kwargs,
+        )
+        replayed = self.client.post(
+            f"/orders/{self.uuid}", json=self.payload, headers=headers
+        )
+
+        self.assertEqual(201, first.status_code)
+        self.assertEqual(201, replayed.status_code)
+        self.assertEqual(first.json(), replayed.json())
+        self.assertEqual(order.uuid, replayed.json()["uuid"])
+        self.assertEqual("true", replayed.headers["Idempotent-Replayed"])
+        self.assertEqual("app", idempotency.claim_key.call_args.kwargs["uname"])
+        get_product_by_uuid.assert_called_once()
+        create_order_for_product.assert_called_once()
+
+    @patch("server.models.idempotency.repo")
+    @patch("server.routes.orders.product_repo.get_product_by_uuid")
+    def test_should_return_422_when_the_key_was_used_for_another_order(
+        self, get_product_by_uuid, idempotency
+    ):
+        idempotency.claim_key.return_value = MagicMock(request_hash="other")
+
+        response = self.client.post(
+            f"/orders/{self.uuid}",
+            json=self.payload,
+            headers={"Idempotency-Key": "key"},
+        )
+
+        self.assertEqual(422, response.status_code)
+        get_product_by_uuid.assert_not_called()
+
+
+class TestClaim(TestRoute):
+    def setUp(self) -> NoReturn:
+        super().setUp()
+        self.payload = {
+            "mod_id": self.faker.md5(),
+            "mod_display_name": self.faker.user_name(),
+            "owner_display_name": self.faker.user_name(),
+        }
+
+    @patch("server.routes.orders.repo.claim_product")
+    def test_should_return_404_when_there_is_no_product_available(
+        self, claim_product
+    ):
+        claim_product.return_value = None
+
+        response = self.client.post("/orders/claim", json=self.payload)
+
+        self.assertEqual(404, response.status_code)
+        self.assertEqual(
+            {"detail": "No product available to claim."}, response.json()
+        )
+        claim_product.assert_called_once()
+
+    @patch("server.routes.orders.repo.claim_product")
+    def test_should_return_201_with_the_order_created(self, claim_product):
+        order = OrderFactory(product__taken=True)
+        claim_product.return_value = order
+
+        response = self.client.post("/orders/claim", json=self.payload)
+
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(order.uuid, response.json()["uuid"])
+        self.assertTrue(response.json()["product"]["taken"])
+        self.assertEqual(
+            self.payload, claim_product.call_args.kwargs["order"].dict()
+        )
+
+
+class TestLookup(TestRoute):
+    def setUp(self) -> NoReturn:
+        super().setUp()
+        self.cache = TTLCache()
+        patcher = patch("server.routes.orders.orders", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("server.routes.orders.repo.get_order_by_product_code")
+    def test_should_return_the_order_of_the_product_code(
+        self, get_order_by_product_code
+    ):
+        order = OrderFactory()
+        get_order_by_product_code.return_value = order
+
+        response = self.client.get(f"/orders/by-code/{order.product.code}")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(order.uuid, response.json()["uuid"])
+        self.assertEqual(
+            order.product.code, response.json()["product"]["code"]
+        )
+        get_order_by_product_code.assert_called_with(
+            db=self.db, code=order.product.code
+        )
+
+    @patch("server.routes.orders.repo.get_order_by_uuid")
+    @patch("server.routes.orders.repo.get_order_by_product_code")
+    def test_should_cache_the_order_found_by_both_keys(
+        self, get_order_by_product_code, get_order_by_uuid
+    ):
+        order = OrderFactory()
+        get_order_by_product_code.return_value = order
+
+        for path in [
+            f"/orders/by-code/{order.product.code}",
+            f"/orders/by-code/{order.product.code}",
+            f"/orders/{order.uuid}",
+        ]:
+            response = self.client.get(path)
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(order.uuid, response.json()["uuid"])
+
+        get_order_by_product_code.assert_called_once()
+        get_order_by_uuid.assert_not_called()
+
+    @patch("server.routes.orders.repo.get_order_by_uuid", return_value=None)
+    def test_should_return_404_without_caching_when_it_is_not_found(
+        self, get_order_by_uuid
+    ):
+        uuid = self.faker.uuid4()
+
+        for _ in range(2):
+            response = self.client.get(f"/orders/{uuid}")
+            self.assertEqual(404, response.status_code)
+            self.assertEqual({"detail": "Order not found."}, response.json())
+
+        self.assertEqual(2, get_order_by_uuid.call_count)
+        self.assertEqual(0, len(self.cache))
+
+    @patch("server.routes.orders.open_primary_session")
+    @patch("server.routes.orders.uses_replica", return_value=True)
+    @patch("server.routes.orders.repo.get_order_by_uuid")
+    def test_should_look_the_order_up_on_the_primary_after_a_replica_miss(
+        self, get_order_by_uuid, _, open_primary_session
+    ):
+        order = OrderFactory()
+        primary = MagicMock()
+        open_primary_session().__aenter__.return_value = primary
+        get_order_by_uuid.side_effect = lambda db, uuid: (
+            order if db is primary else None
+        )
+
+        response = self.client.get(f"/orders/{order.uuid}")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(order.uuid, response.json()["uuid"])
+        open_primary_session.assert_called_with(self.db)
+        self.assertEqual(2, get_order_by_uuid.call_count)
+
+    def test_should_return_422_for_invalid_uuids(self):
+        self.assertEqual(422, self.client.get("/orders/invalid").status_code)
+
+
+class TestSearch(TestRoute):
+    @patch("server.routes.orders.repo.search_orders")
+    def test_should_return_the_orders_found_with_their_score(
+        self, search_orders
+    ):
+        order = OrderFactory()
+        search_orders.return_value = [(order, 0.75)]
+
+        response = self.client.get(
+            "/orders/search",
+            params={"q": "mouse", "limit": 5, "participant": "owner"},
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(0.75, response.json()[0]["score"])
+        self.assertEqual(order.uuid, response.json()[0]["order"]["uuid"])
+        search_orders.assert_called_with(
+            db=self.db, query="mouse", limit=5, participant="owner"
+        )
+
+    @patch("server.routes.orders.repo.search_orders")
+    def test_should_return_422_for_invalid_parameters(self, search_orders):
+        for params in [
+            {"q": "mo"},
+            {"q": "mouse", "limit": 101},
+            {"q": "mouse", "participant": "product"},
+        ]:
+            response = self.client.get("/orders/search", params=params)
+            self.assertEqual(422, response.status_code)
+
+        search_orders.assert_not_called()
+
+
+class TestOrdersQueries(TestDatabase):
+    def setUp(self) -> NoReturn:
+        super().setUp()
+        self.persist(
+            *[
+                OrderFactory(
+                    id=None,
+                    product_id=None,
+                    product=ProductFactory(id=None, taken=True),
+                )
+                for _ in range(10)
+            ]
+        )
+
+    def test_should_list_the_orders_without_loading_products_one_by_one(
+        self,
+    ):
+        # The listing, the count and (for "selectin") the products query.
+        with self.assert_max_queries(3):
+            response = self.client.get("/orders", params={"limit": 50})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(10, len(response.json()["orders"]))
+        self.assertTrue(
+            all(
+                order["product"]["taken"]
+                for order in response.json()["orders"]
+            )
+        )
+
+    def test_should_list_the_same_orders_with_core_reads(self):
+        params = {"limit": 3, "desc": False}
+
+        expected = self.client.get("/orders", params=params).json()
+        with patch("server.routes.orders.env.CORE_READS", True):
+            with self.assert_max_queries(2):
+                response = self.client.get("/orders", params=params)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(expected, response.json())
+
+    def test_should_return_304_while_the_orders_do_not_change(self):
+        etag = self.client.get("/orders").headers["ETag"]
+
+        with self.assert_max_queries(1):
+            cached = self.client.get(
+                "/orders", headers={"If-None-Match": etag}
+            )
+        self.assertEqual(304, cached.status_code)
+
+        self.persist(
+            OrderFactory(
+                id=None,
+                product_id=None,
+                product=ProductFactory(id=None, taken=True),
+            )
+        )
+        response = self.client.get("/orders", headers={"If-None-Match": etag})
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.headers["ETag"])
+
+    def test_should_list_the_same_orders_with_fast_json(self):
+        params = {"limit": 3, "desc": False}
+
+        expected = self.client.get("/orders", params=params).json()
+        with patch("server.routes.orders.env.FAST_JSON", True):
+            response = self.client.get("/orders", params=params)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(expected, response.json())
+
+    def test_should_look_the_order_up_with_a_single_query(self):
+        cache = TTLCache()
+        product = ProductFactory(id=None, taken=True)
+        code = product.code
+        self.persist(OrderFactory(id=None, product_id=None, product=product))
+
+        with patch("server.routes.orders.orders", cache):
+            with self.assert_max_queries(1):
+                response = self.client.get(f"/orders/by-code/{code}")
+            with self.assert_max_queries(0):
+                cached = self.client.get(f"/orders/{response.json()['uuid']}")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(response.json(), cached.json())
+        self.assertEqual(2, len(cache))
+
+    def test_should_create_the_order_loading_the_product_with_it(self):
+        product = ProductFactory(id=None, taken=False)
+        uuid = product.uuid
+        self.persist(product)
+
+        with self.assert_max_queries(7 + self.fetched_defaults(Product)):
+            response = self.client.post(
+                f"/orders/{uuid}",
+                json={
+                    "mod_id": self.faker.md5(),
+                    "mod_display_name": self.faker.user_name(),
+                    "owner_display_name": self.faker.user_name(),
+                },
+            )
+
+        self.assertEqual(201, response.status_code)
+        self.assertTrue(response.json()["product"]["taken"])
+
+    def test_should_claim_each_available_product_only_once(self):
+        products = [ProductFactory(id=None, taken=False) for _ in range(2)]
+        codes = {product.code for product in products}
+        self.persist(*products)
+
+        claimed = []
+        for _ in range(2):
+            with self.assert_max_queries(7 + self.fetched_defaults(Product)):
+                response = self.client.post(
+                    "/orders/claim",
+                    json={
+                        "mod_id": self.faker.md5(),
+                        "mod_display_name": self.faker.user_name(),
+                        "owner_display_name": self.faker.user_name(),
+                    },
+                )
+            self.assertEqual(201, response.status_code)
+            claimed.append(response.json()["product"]["code"])
+
+        self.assertEqual(codes, set(claimed))
+        response = self.client.post(
+            "/orders/claim",
+            json={
+                "mod_id": self.faker.md5(),
+                "mod_display_name": self.faker.user_name(),
+                "owner_display_name": self.faker.user_name(),
+            },
+        )
+        self.assertEqual(404, response.status_code)
+
+
+class TestExport(TestAsync):
+    def setUp(self) -> NoReturn:
+        self.db = MagicMock()
+
+    @patch("server.routes.orders.stream")
+    @patch("server.routes.orders.repo.select_orders")
+    async def test_should_stream_the_orders_selected(
+        self, select_orders, stream
+    ):
+        order = OrderFactory()
+        moderator = self.faker.user_name()
+        since = self.faker.date_time()
+        stream.return_value = TestHelpers.iterate([order])
+
+        response = await export_orders(
+            format="ndjson",
+            moderator=moderator,
+            owner=None,
+            since=since,
+            until=None,
+            db=self.db,
+        )
+
+        select_orders.assert_called_with(
+            moderator=moderator, owner=None, since=since, until=None
+        )
+        stream.assert_called_with(self.db, select_orders.return_value)
+        self.assertEqual("application/x-ndjson", response.media_type)
+        self.assertEqual(
+            schemas.Order.from_orm(order).json() + "\n",
+            "".join([chunk async for chunk in response.body_iterator]),
+        )
+
+
+class TestExportFormat(TestRoute):
+    def test_should_return_422_for_unsupported_formats(self):
+        response = self.client.get("/orders/export", params={"format": "xml"})
+
+        self.assertEqual(422, response.status_code)
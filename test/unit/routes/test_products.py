@@ -1,23 +1,29 @@
 from test.unit.factories import ProductFactory
-from test.unit.fixtures import TestHelpers, TestRoute
+from test.unit.fixtures import TestAsync, TestDatabase, TestHelpers, TestRoute
 from typing import NoReturn
-from unittest.mock import patch
+from unittest.mock import ANY, MagicMock, patch
+
+from sqlalchemy.exc import IntegrityError
 
 from server.models import schemas
+from server.models.cache import TTLCache
+from server.models.pagination import encode_cursor
+from server.models.responses import ResponseCache
+from server.routes.products import export_products
 
 
 class TestGet(TestRoute):
     def setUp(self) -> NoReturn:
         super().setUp()
         self.skip = self.faker.pyint()
-        self.limit = self.faker.pyint()
+        self.limit = self.faker.pyint(min_value=2)
         self.taken = self.faker.boolean()
         self.desc = self.faker.boolean()
 
-    @patch("server.routes.products.repo.get_products_count")
+    @patch("server.routes.products.repo.get_products_version")
     @patch("server.routes.products.repo.get_products")
     def test_should_return_200_with_entities(
-        self, get_products, get_products_count
+        self, get_products, get_products_version
     ):
         all_products = self.faker.pyint()
         products_taken = self.faker.pyint()
@@ -25,10 +31,12 @@ class TestGet(TestRoute):
 
         product = ProductFactory()
         get_products.return_value = [product]
-        get_products_count.return_value = (
+        get_products_version.return_value = (
             all_products,
             available_products,
             products_taken,
+            product.id,
+            product.updated_at,
         )
 
         response = self.client.get(
@@ -63,28 +71,179 @@ class TestGet(TestRoute):
                         ),
                     }
                 ],
+                "next_cursor": None,
             },
             response.json(),
         )
 
-        get_products_count.assert_called_with(db=self.db)
+        get_products_version.assert_called_with(db=self.db)
         get_products.assert_called_with(
             db=self.db,
             skip=self.skip,
             limit=self.limit,
             taken=self.taken,
             desc=self.desc,
+            cursor=None,
+        )
+
+    @patch("server.routes.products.repo.get_products_version")
+    @patch("server.routes.products.repo.get_products")
+    def test_should_return_the_cursor_for_the_next_page_when_it_is_full(
+        self, get_products, get_products_version
+    ):
+        products = [ProductFactory(), ProductFactory()]
+        get_products.return_value = products
+        get_products_version.return_value = (2, 2, 0, 1, None)
+
+        response = self.client.get("/products", params={"limit": 2})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            encode_cursor((products[-1].created_at, products[-1].id)),
+            response.json()["next_cursor"],
+        )
+
+
+class TestGetQueries(TestDatabase):
+    def test_should_list_the_products_with_the_totals_in_two_queries(self):
+        self.persist(
+            *[ProductFactory(id=None, taken=False) for _ in range(10)],
+            *[ProductFactory(id=None, taken=True) for _ in range(5)],
+        )
+
+        with self.assert_max_queries(2):
+            response = self.client.get("/products", params={"limit": 50})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            {"all": 15, "taken": 5, "available": 10}, response.json()["total"]
+        )
+        self.assertEqual(10, len(response.json()["products"]))
+
+    def test_should_list_the_same_products_with_core_reads(self):
+        self.persist(*[ProductFactory(id=None, taken=True) for _ in range(5)])
+        params = {"limit": 3, "taken": True}
+
+        expected = self.client.get("/products", params=params).json()
+        with patch("server.routes.products.env.CORE_READS", True):
+            response = self.client.get("/products", params=params)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(expected, response.json())
+
+    def test_should_return_304_while_the_products_do_not_change(self):
+        product = ProductFactory(id=None, taken=False)
+        self.persist(product)
+        response = self.client.get("/products")
+        etag = response.headers["ETag"]
+
+        with self.assert_max_queries(1):
+            cached = self.client.get(
+                "/products", headers={"If-None-Match": etag}
+            )
+        self.assertEqual(304, cached.status_code)
+        self.assertEqual(b"", cached.content)
+        self.assertEqual(etag, cached.headers["ETag"])
+
+        self.assertEqual(
+            200,
+            self.client.get(
+                "/products",
+                headers={
+                    "If-Modified-Since": response.headers["Last-Modified"]
+                },
+            ).status_code,
+        )
+        self.assertEqual(
+            200,
+            self.client.get(
+                "/products",
+                params={"taken": True},
+                headers={"If-None-Match": etag},
+            ).status_code,
+        )
+
+        self.persist(ProductFactory(id=None, taken=False))
+        self.assertEqual(
+            200,
+            self.client.get(
+                "/products", headers={"If-None-Match": etag}
+            ).status_code,
         )
 
+    def test_should_serve_the_cached_listing_until_a_product_changes(self):
+        cache = ResponseCache(TTLCache(), enabled=True)
+        self.persist(ProductFactory(id=None, taken=False))
+
+        with patch("server.routes.products.responses", cache), patch(
+            "server.models.responses.responses", cache
+        ), patch("server.routes.products.env.RESPONSE_CACHE", True):
+            expected = self.client.get("/products").json()
+            with self.assert_max_queries(0):
+                response = self.client.get("/products")
+            self.assertEqual(expected, response.json())
+
+            self.persist(ProductFactory(id=None, taken=False))
+            response = self.client.get("/products")
+
+        self.assertEqual(2, len(response.json()["products"]))
+        self.assertEqual(
+            {"hits": 1, "misses": 2, "invalidations": 1},
+            {
+                key: value
+                for key, value in cache.stats().items()
+                if key in {"hits", "misses", "invalidations"}
+            },
+        )
+
+    def test_should_list_the_same_products_with_fast_json(self):
+        self.persist(*[ProductFactory(id=None, taken=True) for _ in range(5)])
+        params = {"limit": 3, "taken": True}
+
+        expected = self.client.get("/products", params=params).json()
+        with patch("server.routes.products.env.FAST_JSON", True):
+            response = self.client.get("/products", params=params)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(expected, response.json())
+
+
+class TestSearch(TestRoute):
+    @patch("server.routes.products.repo.search_products")
+    def test_should_return_the_products_found_with_their_score(
+        self, search_products
+    ):
+        product = ProductFactory()
+        search_products.return_value = [(product, 0.5)]
+
+        response = self.client.get(
+            "/products/search", params={"q": "legend", "taken": False}
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(0.5, response.json()[0]["score"])
+        self.assertEqual(
+            product.code, response.json()[0]["product"]["code"]
+        )
+        search_products.assert_called_with(
+            db=self.db, query="legend", limit=20, taken=False
+        )
+
+    @patch("server.routes.products.repo.search_products")
+    def test_should_return_422_for_short_queries(self, search_products):
+        response = self.client.get("/products/search", params={"q": "le"})
+
+        self.assertEqual(422, response.status_code)
+        search_products.assert_not_called()
+
 
 class TestPost(TestRoute):
     @patch("server.routes.products.repo.create_product")
-    @patch("server.routes.products.repo.get_product_by_code")
     def test_should_return_409_when_the_code_is_already_registed(
-        self, get_product_by_code, create_product
+        self, create_product
     ):
         product = ProductFactory()
-        get_product_by_code.return_value = product
+        create_product.return_value = None
 
         response = self.client.post(
             "/products/",
@@ -96,17 +255,13 @@ class TestPost(TestRoute):
             {"detail": "The code is already in use by another product."},
             response.json(),
         )
-
-        get_product_by_code.assert_called_with(db=self.db, code=product.code)
-        create_product.assert_not_called()
+        create_product.assert_called_once()
 
     @patch("server.routes.products.repo.create_product")
-    @patch("server.routes.products.repo.get_product_by_code")
     def test_should_return_201_when_the_product_is_registered_successfully(
-        self, get_product_by_code, create_product
+        self, create_product
     ):
         product = ProductFactory()
-        get_product_by_code.return_value = None
         create_product.return_value = product
 
         response = self.client.post(
@@ -126,7 +281,129 @@ class TestPost(TestRoute):
             },
             response.json(),
         )
-        get_product_by_code.assert_called_with(db=self.db, code=product.code)
+        create_product.assert_called_with(
+            db=self.db,
+            product=schemas.ProductCreation(
+                code=product.code, summary=product.summary
+            ),
+        )
+
+    @patch("server.models.idempotency.repo")
+    @patch("server.routes.products.repo.create_product")
+    def test_should_store_the_product_registered_with_a_key(
+        self, create_product, idempotency
+    ):
+        product = ProductFactory()
+        create_product.return_value = product
+        idempotency.claim_key.return_value = None
+
+        response = self.client.post(
+            "/products/",
+            json={"code": product.code, "summary": product.summary},
+            headers={"Idempotency-Key": "key"},
+        )
+
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(product.uuid, response.json()["uuid"])
+        idempotency.save_response.assert_called_with(
+            db=self.db,
+            key="key",
+            uname="app",
+            status_code=201,
+            body=response.content,
+        )
+
+    @patch("server.models.idempotency.repo")
+    @patch("server.routes.products.repo.create_product")
+    def test_should_replay_the_product_registered_with_the_key(
+        self, create_product, idempotency
+    ):
+        product = ProductFactory()
+        idempotency.claim_key.return_value = MagicMock(
+            request_hash=ANY, status_code=201, body=b'{"code":"code"}'
+        )
+
+        response = self.client.post(
+            "/products/",
+            json={"code": product.code, "summary": product.summary},
+            headers={"Idempotency-Key": "key"},
+        )
+
+        self.assertEqual(201, response.status_code)
+        self.assertEqual({"code": "code"}, response.json())
+        self.assertEqual("true", response.headers["Idempotent-Replayed"])
+        create_product.assert_not_called()
+
+
+class TestBulk(TestRoute):
+    def payload(self, *codes: str) -> str:
+        return "\n".join(
+            f'{{"code": "{code}", "summary": "summary"}}' for code in codes
+        )
+
+    @patch("server.routes.products.repo.import_products")
+    def test_should_return_the_summary_of_the_products_inserted(
+        self, import_products
+    ):
+        import_products.return_value = 1
+
+        response = self.client.post(
+            "/products/bulk",
+            data=self.payload("a", "b", "a"),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(
+            {"inserted": 1, "skipped": 1, "conflicting": 1}, response.json()
+        )
+        products = import_products.call_args.kwargs["products"]
+        self.assertEqual(["a", "b"], [product.code for product in products])
+        self.db.commit.assert_called_once()
+
+    @patch("server.routes.products.repo.import_products")
+    def test_should_return_422_without_commit_for_invalid_products(
+        self, import_products
+    ):
+        response = self.client.post(
+            "/products/bulk",
+            data="code\na\n",
+            headers={"Content-Type": "text/csv"},
+        )
+
+        self.assertEqual(422, response.status_code)
+        self.assertEqual(
+            {"detail": "Invalid product #1: summary."}, response.json()
+        )
+        import_products.assert_not_called()
+        self.db.commit.assert_not_called()
+
+    @patch("server.routes.products.repo.import_products")
+    def test_should_return_400_without_commit_for_malformed_bodies(
+        self, import_products
+    ):
+        response = self.client.post(
+            "/products/bulk",
+            data=f"[{self.payload('a')} {self.payload('b')}]",
+            headers={"Content-Type": "application/json"},
+        )
+
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(
+            {"detail": "The JSON array items must be separated by commas."},
+            response.json(),
+        )
+        import_products.assert_not_called()
+        self.db.commit.assert_not_called()
+
+    def test_should_return_415_for_unsupported_formats(self):
+        response = self.client.post(
+            "/products/bulk",
+            data=self.payload("a"),
+            headers={"Content-Type": "text/plain"},
+        )
+
+        self.assertEqual(415, response.status_code)
 
 
 class TestPut(TestRoute):
@@ -135,18 +412,21 @@ class TestPut(TestRoute):
         self.uuid = self.faker.uuid4()
         self.product = ProductFactory()
 
+    def put(self):
+        return self.client.put(
+            f"/products/{self.uuid}",
+            json={"code": self.product.code, "summary": self.product.summary},
+        )
+
     @patch("server.routes.products.repo.get_product_by_uuid")
-    @patch("server.routes.products.repo.get_product_by_code")
     @patch("server.routes.products.repo.update_product")
     def test_should_return_404_when_no_product_are_found_for_the_uuid_provided(
-        self, update_product, get_product_by_code, get_product_by_uuid
+        self, update_product, get_product_by_uuid
     ):
+        update_product.return_value = None
         get_product_by_uuid.return_value = None
 
-        response = self.client.put(
-            f"/products/{self.uuid}",
-            json={"code": self.product.code, "summary": self.product.summary},
-        )
+        response = self.put()
 
         self.assertEqual(404, response.status_code)
         self.assertEqual(
@@ -154,22 +434,16 @@ class TestPut(TestRoute):
             response.json(),
         )
         get_product_by_uuid.assert_called_with(db=self.db, uuid=self.uuid)
-        update_product.assert_not_called()
-        get_product_by_code.assert_not_called()
 
     @patch("server.routes.products.repo.get_product_by_uuid")
-    @patch("server.routes.products.repo.get_product_by_code")
     @patch("server.routes.products.repo.update_product")
     def test_should_return_401_when_the_product_is_already_taken(
-        self, update_product, get_product_by_code, get_product_by_uuid
+        self, update_product, get_product_by_uuid
     ):
-        get_product_by_uuid_value = ProductFactory(taken=True)
-        get_product_by_uuid.return_value = get_product_by_uuid_value
+        update_product.return_value = None
+        get_product_by_uuid.return_value = ProductFactory(taken=True)
 
-        response = self.client.put(
-            f"/products/{self.uuid}",
-            json={"code": self.product.code, "summary": self.product.summary},
-        )
+        response = self.put()
 
         self.assertEqual(401, response.status_code)
         self.assertEqual(
@@ -177,54 +451,34 @@ class TestPut(TestRoute):
             response.json(),
         )
         get_product_by_uuid.assert_called_with(db=self.db, uuid=self.uuid)
-        update_product.assert_not_called()
-        get_product_by_code.assert_not_called()
 
     @patch("server.routes.products.repo.get_product_by_uuid")
-    @patch("server.routes.products.repo.get_product_by_code")
     @patch("server.routes.products.repo.update_product")
     def test_should_return_409_when_the_new_code_is_already_in_use_by_another_product(  # noqa
-        self, update_product, get_product_by_code, get_product_by_uuid
+        self, update_product, get_product_by_uuid
     ):
-        get_product_by_uuid_value = ProductFactory(taken=False)
-        get_product_by_uuid.return_value = get_product_by_uuid_value
-        get_product_by_code.return_value = ProductFactory()
+        update_product.side_effect = IntegrityError("UPDATE", {}, None)
 
-        response = self.client.put(
-            f"/products/{self.uuid}",
-            json={"code": self.product.code, "summary": self.product.summary},
-        )
+        response = self.put()
 
         self.assertEqual(409, response.status_code)
         self.assertEqual(
             {"detail": "The code is already in use by another product."},
             response.json(),
         )
-        get_product_by_uuid.assert_called_with(db=self.db, uuid=self.uuid)
-        get_product_by_code.assert_called_with(
-            db=self.db, code=self.product.code
-        )
-        update_product.assert_not_called()
+        get_product_by_uuid.assert_not_called()
 
     @patch("server.routes.products.repo.get_product_by_uuid")
-    @patch("server.routes.products.repo.get_product_by_code")
     @patch("server.routes.products.repo.update_product")
     def test_should_return_200_with_the_updated_product(
-        self, update_product, get_product_by_code, get_product_by_uuid
+        self, update_product, get_product_by_uuid
     ):
-        get_product_by_uuid_value = ProductFactory(taken=False)
         updated_product_value = ProductFactory(
             code=self.product.code, summary=self.product.summary
         )
-
-        get_product_by_uuid.return_value = get_product_by_uuid_value
-        get_product_by_code.return_value = None
         update_product.return_value = updated_product_value
 
-        response = self.client.put(
-            f"/products/{self.uuid}",
-            json={"code": self.product.code, "summary": self.product.summary},
-        )
+        response = self.put()
 
         self.assertEqual(200, response.status_code)
         self.assertEqual(
@@ -243,16 +497,13 @@ class TestPut(TestRoute):
             response.json(),
         )
 
-        get_product_by_uuid.assert_called_with(db=self.db, uuid=self.uuid)
-        get_product_by_code.assert_called_with(
-            db=self.db, code=self.product.code
-        )
+        get_product_by_uuid.assert_not_called()
         update_product.assert_called_with(
             db=self.db,
+            uuid=self.uuid,
             product=schemas.ProductUpdate(
                 code=self.product.code, summary=self.product.summary
             ),
-            db_product=get_product_by_uuid_value,
         )
 
 
@@ -327,3 +578,40 @@ class TestDelete(TestRoute):
 
         get_product_by_uuid.assert_called_with(db=self.db, uuid=self.uuid)
         delete_product.assert_called_with(db=self.db, product=product)
+
+
+class TestExport(TestAsync):
+    def setUp(self) -> NoReturn:
+        self.db = MagicMock()
+
+    @patch("server.routes.products.stream")
+    @patch("server.routes.products.repo.select_products")
+    async def test_should_stream_the_products_selected(
+        self, select_products, stream
+    ):
+        product = ProductFactory()
+        since = self.faker.date_time()
+        stream.return_value = TestHelpers.iterate([product])
+
+        response = await export_products(
+            format="ndjson", taken=False, since=since, until=None, db=self.db
+        )
+
+        select_products.assert_called_with(
+            taken=False, since=since, until=None
+        )
+        stream.assert_called_with(self.db, select_products.return_value)
+        self.assertEqual("application/x-ndjson", response.media_type)
+        self.assertEqual(
+            schemas.Product.from_orm(product).json() + "\n",
+            "".join([chunk async for chunk in response.body_iterator]),
+        )
+
+
+class TestExportFormat(TestRoute):
+    def test_should_return_422_for_unsupported_formats(self):
+        response = self.client.get(
+            "/products/export", params={"format": "xml"}
+        )
+
+        self.assertEqual(422, response.status_code)
@@ -0,0 +1,56 @@
+from test.unit.factories import ProductFactory
+from test.unit.fixtures import TestDatabase, TestRoute
+from unittest.mock import patch
+
+
+class TestLeaderboard(TestRoute):
+    @patch("server.routes.stats.repo.get_top_owners", return_value=[])
+    @patch("server.routes.stats.repo.get_top_moderators", return_value=[])
+    def test_should_read_the_top_of_both_leaderboards(
+        self, get_top_moderators, get_top_owners
+    ):
+        response = self.client.get("/stats/", params={"limit": 3})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({"moderators": [], "owners": []}, response.json())
+        get_top_moderators.assert_called_with(db=self.db, limit=3)
+        get_top_owners.assert_called_with(db=self.db, limit=3)
+
+    def test_should_return_422_for_invalid_limits(self):
+        for limit in [0, 101]:
+            response = self.client.get("/stats/", params={"limit": limit})
+            self.assertEqual(422, response.status_code)
+
+
+class TestLeaderboardQueries(TestDatabase):
+    def claim(self, mod_id: str, mod_display_name: str, owner: str):
+        response = self.client.post(
+            "/orders/claim",
+            json={
+                "mod_id": mod_id,
+                "mod_display_name": mod_display_name,
+                "owner_display_name": owner,
+            },
+        )
+        self.assertEqual(201, response.status_code)
+
+    def test_should_count_the_orders_as_they_are_created(self):
+        self.persist(*[ProductFactory(id=None, taken=False) for _ in range(4)])
+        self.claim("1", "mouse", "alice")
+        self.claim("2", "cat", "alice")
+        self.claim("1", "mouse_renamed", "bob")
+        self.claim("1", "mouse_renamed", "alice")
+
+        with self.assert_max_queries(2):
+            response = self.client.get("/stats/", params={"limit": 1})
+
+        self.assertEqual(200, response.status_code)
+        moderators = response.json()["moderators"]
+        owners = response.json()["owners"]
+        self.assertEqual(1, len(moderators))
+        self.assertEqual("1", moderators[0]["mod_id"])
+        self.assertEqual("mouse_renamed", moderators[0]["mod_display_name"])
+        self.assertEqual(3, moderators[0]["orders"])
+        self.assertEqual(1, len(owners))
+        self.assertEqual("alice", owners[0]["owner_display_name"])
+        self.assertEqual(3, owners[0]["orders"])
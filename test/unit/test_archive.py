@@ -0,0 +1,112 @@
+from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from test.unit.factories import OrderFactory, ProductFactory
+from test.unit.fixtures import Test
+from typing import NoReturn
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import exc
+
+from server.archive import archive, archive_all, archive_orders
+
+
+class TestArchive(Test):
+    def setUp(self) -> NoReturn:
+        temporary = TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.directory = Path(temporary.name)
+        self.orders = [OrderFactory(), OrderFactory()]
+        self.products = [order.product for order in self.orders]
+
+    @patch("server.archive.repo.notify_archived")
+    @patch("server.archive.repo.delete_archived")
+    def test_should_write_the_files_before_committing(
+        self, delete_archived, notify_archived
+    ):
+        db = MagicMock()
+        delete_archived.return_value = {p.id for p in self.products}
+        db.commit.side_effect = lambda: self.assertEqual(
+            2, len(list(self.directory.iterdir()))
+        )
+
+        archive(db, self.directory, self.orders, self.products)
+
+        delete_archived.assert_called_with(
+            db=db, orders=self.orders, products=self.products
+        )
+        notify_archived.assert_called_with(db=db)
+        db.commit.assert_called_once()
+
+    @patch("server.archive.write_archive")
+    @patch("server.archive.repo.notify_archived")
+    @patch("server.archive.repo.delete_archived")
+    def test_should_only_write_the_products_deleted(
+        self, delete_archived, notify_archived, write_archive
+    ):
+        kept, deleted = ProductFactory(id=1), ProductFactory(id=2)
+        delete_archived.return_value = {deleted.id}
+
+        archive(MagicMock(), self.directory, [], [kept, deleted])
+
+        write_archive.assert_called_once_with(
+            self.directory, "products", [deleted]
+        )
+
+    @patch("server.archive.repo.notify_archived")
+    @patch("server.archive.repo.delete_archived")
+    def test_should_not_notify_when_no_order_is_archived(
+        self, delete_archived, notify_archived
+    ):
+        archive(MagicMock(), self.directory, [], self.products)
+
+        notify_archived.assert_not_called()
+
+    @patch("server.archive.repo.notify_archived")
+    @patch("server.archive.repo.delete_archived")
+    def test_should_remove_the_files_when_the_commit_fails(
+        self, delete_archived, notify_archived
+    ):
+        db = MagicMock()
+        delete_archived.return_value = {p.id for p in self.products}
+        db.commit.side_effect = exc.OperationalError(
+            "COMMIT", {}, Exception()
+        )
+
+        with self.assertRaises(exc.OperationalError):
+            archive(db, self.directory, self.orders, self.products)
+
+        db.rollback.assert_called_once()
+        self.assertEqual([], list(self.directory.iterdir()))
+
+    @patch("server.archive.archive")
+    @patch("server.archive.repo.get_archivable_orders")
+    def test_should_archive_the_orders_with_their_products(
+        self, get_archivable_orders, archive
+    ):
+        db = MagicMock()
+        before = datetime(2025, 1, 1)
+        get_archivable_orders.return_value = self.orders
+
+        self.assertEqual(
+            2, archive_orders(db, self.directory, before, size=10)
+        )
+
+        get_archivable_orders.assert_called_with(
+            db=db, before=before, limit=10
+        )
+        archive.assert_called_with(
+            db, self.directory, self.orders, self.products
+        )
+
+
+class TestArchiveAll(Test):
+    @patch("server.archive.SessionLocal")
+    def test_should_archive_batches_until_there_is_none(self, session_local):
+        batch = MagicMock(side_effect=[10, 10, 3, 0])
+
+        archived = archive_all(batch, Path("archive"), datetime.now(), 10)
+
+        self.assertEqual(23, archived)
+        self.assertEqual(4, batch.call_count)
+        self.assertEqual(4, session_local().close.call_count)